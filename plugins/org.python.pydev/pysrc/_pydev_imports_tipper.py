@@ -124,14 +124,205 @@ def Search(data):
         return DoFind(f, parent), foundAs
 
 
-def GenerateTip(data, log=None):
+#Tips already generated in this process: name requested -> (obj, dirComps, (file, mtime), version, tips)
+_tips_cache = {}
+
+#Directories with the standard library and the site-packages (modules there have their tips cached on disk).
+_lib_dirs = None
+
+DISK_CACHE_VERSION = 1
+
+
+def ClearTipsCache():
+    _tips_cache.clear()
+
+
+def _GetDirComps(obj):
+    dirComps = dir(obj)
+    if hasattr(obj, '__dict__'):
+        dirComps.append('__dict__')
+    if hasattr(obj, '__class__'):
+        dirComps.append('__class__')
+    return dirComps
+
+
+def _GetMtime(f):
+    if f is None:
+        return None
+    try:
+        return os.stat(f).st_mtime
+    except:
+        return None
+
+
+def _GetVersion(data):
+    '''
+    @return: the version of the package of the requested module (if it has a __version__).
+    '''
+    mod = sys.modules.get(data.split('.')[0])
+    try:
+        return str(getattr(mod, '__version__', ''))
+    except:
+        return ''
+
+
+def _GetLibDirs():
+    global _lib_dirs
+    if _lib_dirs is None:
+        dirs = []
+        try:
+            import sysconfig
+            paths = sysconfig.get_paths()
+            for key in ('stdlib', 'platstdlib', 'purelib', 'platlib'):
+                if key in paths:
+                    dirs.append(paths[key])
+        except:
+            try:
+                from distutils import sysconfig as distutils_sysconfig
+                for plat_specific in (0, 1):
+                    for standard_lib in (0, 1):
+                        dirs.append(distutils_sysconfig.get_python_lib(plat_specific, standard_lib))
+            except:
+                pass
+        try:
+            import site
+            dirs.append(site.getusersitepackages())
+        except:
+            pass
+
+        _lib_dirs = []
+        for d in dirs:
+            d = os.path.normcase(os.path.abspath(d))
+            if not d.endswith(os.sep):
+                d += os.sep
+            if d not in _lib_dirs:
+                _lib_dirs.append(d)
+    return _lib_dirs
+
+
+def GetDiskCacheDir():
+    '''
+    @return: the directory with the tips cached on disk for this interpreter (may be changed through the
+    PYDEV_COMPLETION_CACHE_DIR environment variable).
+    '''
+    cache_dir = os.environ.get('PYDEV_COMPLETION_CACHE_DIR')
+    if not cache_dir:
+        cache_dir = os.path.join(os.path.expanduser('~'), '.pydev_completion_cache')
+
+    try:
+        from hashlib import md5
+    except ImportError:
+        from md5 import new as md5
+    interpreter = '%s|%s|%s' % (sys.executable, sys.version, sys.prefix)
+    try:
+        interpreter = interpreter.encode('utf-8')
+    except UnicodeError:
+        pass #Python 2 str with non-ascii chars (can be used directly).
+    return os.path.join(cache_dir, md5(interpreter).hexdigest())
+
+
+def _GetDiskCacheFilename(data, f):
+    '''
+    @return: the file where the tips for the given name should be cached (or None if it shouldn't be cached on disk:
+    only modules from the standard library or site-packages are cached).
+    '''
+    for c in data:
+        if not (c.isalnum() or c in '._'):
+            return None
+
+    if f is None:
+        if data.split('.')[0] not in sys.builtin_module_names:
+            return None
+    else:
+        f = os.path.normcase(os.path.abspath(f))
+        for d in _GetLibDirs():
+            if f.startswith(d):
+                break
+        else:
+            return None
+
+    return os.path.join(GetDiskCacheDir(), data + '.tips')
+
+
+def _LoadDiskTips(filename, dirComps, file_and_mtime, version):
+    try:
+        import cPickle as pickle
+    except ImportError:
+        import pickle
+    try:
+        stream = open(filename, 'rb')
+        try:
+            contents = pickle.load(stream)
+        finally:
+            stream.close()
+        if contents['cache_version'] == DISK_CACHE_VERSION and contents['dirComps'] == dirComps and \
+            contents['file_and_mtime'] == file_and_mtime and contents['version'] == version:
+            return contents['tips']
+    except:
+        pass #Not cached (or invalid).
+    return None
+
+
+def _SaveDiskTips(filename, dirComps, file_and_mtime, version, tips):
+    try:
+        import cPickle as pickle
+    except ImportError:
+        import pickle
+    try:
+        directory = os.path.dirname(filename)
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        tmp_filename = '%s.%s.tmp' % (filename, os.getpid())
+        stream = open(tmp_filename, 'wb')
+        try:
+            pickle.dump({'cache_version': DISK_CACHE_VERSION, 'dirComps': dirComps, 'file_and_mtime': file_and_mtime,
+                'version': version, 'tips': tips}, stream, 2)
+        finally:
+            stream.close()
+        if os.path.exists(filename):
+            os.remove(filename)
+        os.rename(tmp_filename, filename)
+    except:
+        pass #Just don't cache it.
+
+
+def GenerateTip(data, log=None, max_complete_info=1000):
+    '''
+    The tips are cached for the name requested and are reused while the object found has the same contents (and the
+    file of its module the same mtime). Tips for modules from the standard library and site-packages are also cached
+    on disk (see GetDiskCacheDir), so that they can be reused when the process is restarted.
+
+    @param max_complete_info: see GenerateImportsTipForModule (only the tips with the complete info are cached on disk,
+        so, the bulk requests pass None to fill that cache while a single request isn't slowed down by big modules).
+    '''
     data = data.replace('\n', '')
     if data.endswith('.'):
         data = data.rstrip('.')
 
     f, mod, parent, foundAs = Find(data, log)
     #print_ >> open('temp.txt', 'w'), f
-    tips = GenerateImportsTipForModule(mod)
+    dirComps = _GetDirComps(mod)
+    file_and_mtime = (f, _GetMtime(f))
+    version = _GetVersion(data)
+
+    cached = _tips_cache.get(data)
+    if cached is not None and cached[0] is mod and cached[1] == dirComps and cached[2] == file_and_mtime and \
+        cached[3] == version and (cached[5] or max_complete_info is not None):
+        return f, cached[4]
+
+    tips = None
+    complete = True
+    disk_filename = _GetDiskCacheFilename(data, f)
+    if disk_filename is not None:
+        tips = _LoadDiskTips(disk_filename, dirComps, file_and_mtime, version)
+
+    if tips is None:
+        complete = max_complete_info is None or len(dirComps) <= max_complete_info
+        tips = GenerateImportsTipForModule(mod, dirComps[:], max_complete_info=max_complete_info)
+        if disk_filename is not None and complete:
+            _SaveDiskTips(disk_filename, dirComps, file_and_mtime, version, tips)
+
+    _tips_cache[data] = (mod, dirComps, file_and_mtime, version, tips, complete)
     return f, tips
 
 
@@ -140,27 +331,25 @@ def CheckChar(c):
         return '_'
     return c
 
-def GenerateImportsTipForModule(obj_to_complete, dirComps=None, getattr=getattr, filter=lambda name:True):
+def GenerateImportsTipForModule(obj_to_complete, dirComps=None, getattr=getattr, filter=lambda name:True,
+                                max_complete_info=1000):
     '''
         @param obj_to_complete: the object from where we should get the completions
         @param dirComps: if passed, we should not 'dir' the object and should just iterate those passed as a parameter
         @param getattr: the way to get a given object from the obj_to_complete (used for the completer)
         @param filter: a callable that receives the name and decides if it should be appended or not to the results
+        @param max_complete_info: if there are more names than this, docs and args are not gotten (None for no limit)
         @return: list of tuples, so that each tuple represents a completion with:
             name, doc, args, type (from the TYPE_* constants)
     '''
     ret = []
 
     if dirComps is None:
-        dirComps = dir(obj_to_complete)
-        if hasattr(obj_to_complete, '__dict__'):
-            dirComps.append('__dict__')
-        if hasattr(obj_to_complete, '__class__'):
-            dirComps.append('__class__')
+        dirComps = _GetDirComps(obj_to_complete)
 
     getCompleteInfo = True
 
-    if len(dirComps) > 1000:
+    if max_complete_info is not None and len(dirComps) > max_complete_info:
         #ok, we don't want to let our users wait forever...
         #no complete info for you...
 
@@ -163,6 +163,342 @@ def toasciimxl(s):
     return ret
 
 
+#=======================================================================================================================
+# Index of the modules available in the interpreter
+#=======================================================================================================================
+# The index is a text file (utf-8) with one entry per line and the fields separated by tabs:
+#
+#     PYDEV_MODULES_INDEX    version
+#     D    directory    mtime    kind    package    (kind: r=path entry, z=zip file, p=package, n=not a package)
+#     M    module    file    mtime    compiled    (compiled: 1 if it's a compiled extension)
+#
+# The M entries follow the D entry of the directory where they were found. When an index is refreshed, only the
+# directories whose mtime changed are listed again (the others are just stat'ed and their entries are reused).
+MODULES_INDEX_HEADER = 'PYDEV_MODULES_INDEX'
+MODULES_INDEX_VERSION = '1'
+
+INDEX_WORKERS = 8
+
+SOURCE_SUFFIXES = ('.py', '.pyw')
+
+
+def getExtensionSuffixes():
+    try:
+        from importlib.machinery import EXTENSION_SUFFIXES
+        suffixes = list(EXTENSION_SUFFIXES)
+    except:
+        try:
+            import imp
+            suffixes = [s[0] for s in imp.get_suffixes() if s[2] == imp.C_EXTENSION]
+        except:
+            suffixes = ['.so', '.pyd', '.dll']
+    # Longest first (i.e.: '.cpython-34m.so' must be checked before '.so').
+    suffixes.sort(key=len, reverse=True)
+    return tuple(suffixes)
+
+
+def isIdentifier(name):
+    if hasattr(name, 'isidentifier'):
+        return name.isidentifier()
+    if not name or name[0].isdigit():
+        return False
+    for c in name:
+        if not (c.isalnum() or c == '_'):
+            return False
+    return True
+
+
+def getModuleName(filename, extension_suffixes):
+    '''
+    @return: tuple(module name, compiled) or None if the given file is not a module.
+    '''
+    for suffix in SOURCE_SUFFIXES:
+        if filename.endswith(suffix):
+            name = filename[:-len(suffix)]
+            if isIdentifier(name):
+                return name, 0
+            return None
+
+    for suffix in extension_suffixes:
+        if filename.endswith(suffix):
+            name = filename[:-len(suffix)]
+            if isIdentifier(name):
+                return name, 1
+            return None
+    return None
+
+
+class IndexedDir:
+
+    def __init__(self, directory, mtime, kind, package):
+        self.directory = directory
+        self.mtime = mtime
+        self.kind = kind
+        self.package = package
+        self.modules = []  # list(tuple(module, file, mtime, compiled))
+        self.children = []  # directories inside this one which may be packages
+
+
+def listDir(directory):
+    '''
+    @return: list(tuple(name, path, is_dir, mtime))
+    '''
+    ret = []
+    if hasattr(os, 'scandir'):
+        for entry in os.scandir(directory):
+            try:
+                ret.append((entry.name, entry.path, entry.is_dir(), entry.stat().st_mtime))
+            except OSError:
+                continue
+    else:
+        import stat
+        for name in os.listdir(directory):
+            path = join(directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            ret.append((name, path, stat.S_ISDIR(st.st_mode), st.st_mtime))
+    return ret
+
+
+def indexZip(indexed):
+    import zipfile
+    zip_file = zipfile.ZipFile(indexed.directory)
+    try:
+        names = zip_file.namelist()
+    finally:
+        zip_file.close()
+
+    packages = {}
+    found = []
+    for name in names:
+        parts = name.split('/')
+        info = getModuleName(parts[-1], ())
+        if info is None:
+            continue
+        if info[0] == '__init__':
+            packages['/'.join(parts[:-1])] = 1
+            parts = parts[:-1]
+        else:
+            parts = parts[:-1] + [info[0]]
+        if parts:
+            found.append((parts, name))
+
+    for parts, name in found:
+        for i in range(1, len(parts)):
+            if not isIdentifier(parts[i - 1]) or '/'.join(parts[:i]) not in packages:
+                break
+        else:
+            indexed.modules.append(('.'.join(parts), join(indexed.directory, name), indexed.mtime, 0))
+    indexed.modules.sort()
+
+
+def indexDir(directory, kind, package, previous, extension_suffixes):
+    '''
+    @param kind: 'r' for a path entry or '?' for a directory inside a package (which may be a package itself).
+    @param previous: dict(directory -> IndexedDir) with the previous index (reused for directories not changed).
+    @return: IndexedDir or None if the directory is not there anymore.
+    '''
+    try:
+        mtime = os.stat(directory).st_mtime
+    except OSError:
+        return None
+
+    old = previous.get(directory)
+    if old is not None and old.mtime == mtime and old.package == package and \
+        (old.kind == kind or (kind == '?' and old.kind in ('p', 'n')) or (kind == 'r' and old.kind == 'z')):
+        return old
+
+    if kind == '?':
+        kind = 'p'
+    elif os.path.isfile(directory):
+        kind = 'z'
+    indexed = IndexedDir(directory, mtime, kind, package)
+
+    if kind == 'z':
+        try:
+            indexZip(indexed)
+        except:
+            pass  # Not a valid zip.
+        return indexed
+
+    try:
+        entries = listDir(directory)
+    except OSError:
+        return indexed
+
+    if kind == 'p':
+        for name, _path, is_dir, _mtime in entries:
+            if not is_dir:
+                info = getModuleName(name, extension_suffixes)
+                if info is not None and info[0] == '__init__':
+                    break
+        else:
+            indexed.kind = 'n'
+            return indexed
+        prefix = package + '.'
+    else:
+        prefix = ''
+
+    for name, path, is_dir, file_mtime in entries:
+        if is_dir:
+            if isIdentifier(name):
+                indexed.children.append(path)
+        else:
+            info = getModuleName(name, extension_suffixes)
+            if info is not None and info[0] != '__init__':
+                indexed.modules.append((prefix + info[0], path, file_mtime, info[1]))
+    indexed.modules.sort()
+    indexed.children.sort()
+    return indexed
+
+
+def loadModulesIndex(index_file):
+    '''
+    @return: dict(directory -> IndexedDir) with the contents of the given index (empty if it can't be read).
+    '''
+    ret = {}
+    try:
+        import codecs
+        stream = codecs.open(index_file, 'r', 'utf-8')
+        try:
+            lines = stream.read().splitlines()
+        finally:
+            stream.close()
+        if not lines or lines[0].split('\t') != [MODULES_INDEX_HEADER, MODULES_INDEX_VERSION]:
+            return ret
+
+        indexed = None
+        for line in lines[1:]:
+            fields = line.split('\t')
+            if fields[0] == 'D':
+                indexed = IndexedDir(fields[1], float(fields[2]), fields[3], fields[4])
+                ret[indexed.directory] = indexed
+                parent = ret.get(os.path.dirname(indexed.directory))
+                if parent is not None and indexed.kind in ('p', 'n'):
+                    parent.children.append(indexed.directory)
+            elif fields[0] == 'M':
+                indexed.modules.append((fields[1], fields[2], float(fields[3]), int(fields[4])))
+    except:
+        return {}
+    return ret
+
+
+def walkDirs(roots, previous, workers):
+    '''
+    Indexes the given roots (and the packages inside them) in a pool of threads (the time is mostly spent in
+    listdir/stat calls, which release the GIL).
+
+    @return: dict(directory -> IndexedDir)
+    '''
+    extension_suffixes = getExtensionSuffixes()
+    indexed = {}
+
+    def process(directory, kind, package):
+        entry = indexDir(directory, kind, package, previous, extension_suffixes)
+        if entry is None:
+            return []
+        indexed[directory] = entry
+        if entry.kind not in ('r', 'p'):
+            return []
+        if package:
+            package += '.'
+        # A directory which is also a path entry is indexed only as a path entry.
+        return [(child, '?', package + os.path.basename(child)) for child in entry.children if child not in roots]
+
+    pending = [(root, 'r', '') for root in roots]
+    try:
+        import threading
+        try:
+            import Queue as queue
+        except ImportError:
+            import queue
+    except:
+        workers = 1
+
+    if workers <= 1:
+        while pending:
+            pending.extend(process(*pending.pop()))
+        return indexed
+
+    work = queue.Queue()
+
+    def worker():
+        while True:
+            item = work.get()
+            try:
+                if item is None:
+                    return
+                try:
+                    for child in process(*item):
+                        work.put(child)
+                except:
+                    pass
+            finally:
+                work.task_done()
+
+    threads = []
+    for _i in range(workers):
+        t = threading.Thread(target=worker)
+        t.setDaemon(True)
+        t.start()
+        threads.append(t)
+
+    for item in pending:
+        work.put(item)
+    work.join()
+    for t in threads:
+        work.put(None)
+    return indexed
+
+
+def createModulesIndex(paths, index_file, workers=INDEX_WORKERS):
+    '''
+    Writes the index of the modules available in the given paths to index_file. If index_file already has an index,
+    only the directories changed since then are listed again.
+
+    @return: the number of directories in the index.
+    '''
+    roots = []
+    for p in paths:
+        p = tounicode(nativePath(p))
+        if p and p not in roots and '\t' not in p and '\n' not in p:
+            roots.append(p)
+
+    indexed = walkDirs(roots, loadModulesIndex(index_file), workers)
+
+    lines = [tounicode('%s\t%s') % (MODULES_INDEX_HEADER, MODULES_INDEX_VERSION)]
+
+    def write(directory):
+        entry = indexed.get(directory)
+        if entry is None:
+            return
+        lines.append(tounicode('D\t%s\t%r\t%s\t%s') % (entry.directory, entry.mtime, entry.kind, entry.package))
+        for module, f, mtime, compiled in entry.modules:
+            if '\t' not in f and '\n' not in f:
+                lines.append(tounicode('M\t%s\t%s\t%r\t%s') % (module, f, mtime, compiled))
+        for child in entry.children:
+            if child not in roots:  # A path entry inside another one is written only as a path entry.
+                write(child)
+
+    for root in roots:
+        write(root)
+
+    import codecs
+    tmp_file = '%s.%s.tmp' % (index_file, os.getpid())
+    stream = codecs.open(tmp_file, 'w', 'utf-8')
+    try:
+        lines.append(tounicode(''))
+        stream.write(tounicode('\n').join(lines))
+    finally:
+        stream.close()
+    if os.path.exists(index_file):
+        os.remove(index_file)
+    os.rename(tmp_file, index_file)
+    return len(indexed)
+
+
 if __name__ == '__main__':
     try:
         # just give some time to get the reading threads attached (just in case)
@@ -242,6 +578,20 @@ if __name__ == '__main__':
     for builtinMod in sys.builtin_module_names:
         contents.append(tounicode('<forced_lib>%s</forced_lib>') % tounicode(builtinMod))
 
+    # --index <file>: also write the index of the modules available in the paths (see createModulesIndex).
+    index_file = None
+    try:
+        index_file = sys.argv[sys.argv.index('--index') + 1]
+    except:
+        pass
+
+    if index_file:
+        try:
+            createModulesIndex([p for p, _b in result], index_file)
+            contents.append(tounicode('<modules_index>%s</modules_index>') % tounicode(nativePath(index_file)))
+        except:
+            pass  # The IDE can still crawl the paths itself.
+
 
     contents.append(tounicode('</xml>'))
     unic = tounicode('\n').join(contents)
@@ -32,6 +32,8 @@ else:
 
 
 from _pydev_imps import _pydev_socket as socket
+from _pydev_imps import _pydev_Queue as _queue
+import _pydev_threading as threading
 
 import sys
 if sys.platform == "darwin":
@@ -97,8 +99,34 @@ MSG_PYTHONPATH = '@@PYTHONPATH_END@@'
 MSG_CHANGE_PYTHONPATH = '@@CHANGE_PYTHONPATH:'
 MSG_JEDI = '@@MSG_JEDI:'
 MSG_SEARCH = '@@SEARCH'
+MSG_MODULES_INDEX = '@@MODULES_INDEX:'  # Writes the index of the modules in the pythonpath (see interpreterInfo).
 
-BUFFER_SIZE = 1024
+# '@@BULK_IMPORTS:' + quote_plus('mod1|mod2|...') + 'END@@' computes the tips for all the given modules: each one is
+# sent back as '@@BULK_TIP:' + quote_plus(module) + '|' + response as it completes (where response is the same message
+# sent for @@IMPORTS, or @@BULK_TIMEOUT_END@@ if it took more than BULK_TIP_BUDGET seconds -- its tips are still
+# computed in the background and cached for a later request). At the end, @@MSG_OK_END@@ is sent.
+MSG_BULK_IMPORTS = '@@BULK_IMPORTS:'
+MSG_BULK_TIP = '@@BULK_TIP:'
+MSG_BULK_TIMEOUT = '@@BULK_TIMEOUT_END@@'
+
+# Multiple requests may be pipelined by sending '@@REQUEST:id|message', where message is one of the messages above
+# (i.e.: '@@REQUEST:1|@@IMPORTS:osEND@@'). Those are handled concurrently by the workers and each one is answered with
+# '@@RESPONSE:id|response' (in the order they finish). If a channel is given ('@@REQUEST:id:channel|message'), a new
+# request in the same channel supersedes (cancels) the previous one. '@@CANCEL:idEND@@' cancels a request: it's answered
+# with '@@RESPONSE:id|@@CANCELLED_END@@' (and its result is discarded if it's already running).
+MSG_REQUEST = '@@REQUEST:'
+MSG_RESPONSE = '@@RESPONSE:'
+MSG_CANCEL = '@@CANCEL:'
+MSG_CANCELLED = '@@CANCELLED_END@@'
+
+BUFFER_SIZE = 1024 * 32
+
+# Number of threads handling the requests with ids (so that a slow import doesn't block other completions).
+WORKERS = 4
+
+# Number of threads computing the tips of a @@BULK_IMPORTS request and the seconds each module may take.
+BULK_WORKERS = 4
+BULK_TIP_BUDGET = 5.0
 
 
 
@@ -182,15 +210,47 @@ class Processor:
 class Exit(Exception):
     pass
 
+
+#=======================================================================================================================
+# Request
+#=======================================================================================================================
+class Request:
+    '''
+    A request received with MSG_REQUEST (handled by the workers of the CompletionServer).
+    '''
+
+    def __init__(self, request_id, channel, data, barrier=False):
+        self.request_id = request_id
+        self.channel = channel
+        self.data = data
+        self.cancelled = False
+        self.answered = False
+        # A barrier is only handled when the requests received before it are finished (and the ones received after
+        # it only start after it's handled).
+        self.barrier = barrier
+        self.response = None  # the response of a barrier (computed when it's handled)
+
+
 class CompletionServer:
 
-    def __init__(self, port):
+    def __init__(self, port, workers=WORKERS):
         self.ended = False
         self.port = port
         self.socket = None  # socket to send messages.
         self.exit_process_on_kill = True
         self.processor = Processor()
 
+        self.workers = workers
+        self._write_lock = threading.Lock()
+        self._jedi_lock = threading.Lock()
+        self._requests_lock = threading.Lock()
+        self._requests = {}  # request id -> Request (not answered yet)
+        self._channels = {}  # channel -> last Request received in it
+        self._pending_requests = []  # Requests waiting for a worker (in the order received)
+        self._pending_condition = threading.Condition()
+        self._running_requests = 0
+        self._workers_started = False
+
 
     def connectToServer(self):
         from _pydev_imps import _pydev_socket as socket
@@ -233,14 +293,323 @@ class CompletionServer:
 
 
     def send(self, msg):
-        if not hasattr(self.socket, 'sendall'):
-            #Older versions (jython 2.1)
-            self.emulated_sendall(msg)
-        else:
+        # Responses may be sent from the workers, so, make sure they're not interleaved.
+        self._write_lock.acquire()
+        try:
+            if not hasattr(self.socket, 'sendall'):
+                #Older versions (jython 2.1)
+                self.emulated_sendall(msg)
+            else:
+                if IS_PYTHON3K:
+                    self.socket.sendall(bytearray(msg, 'utf-8'))
+                else:
+                    self.socket.sendall(msg)
+        finally:
+            self._write_lock.release()
+
+
+    def readMessages(self):
+        '''
+        Generator with the messages received (each one ending with MSG_END). The data received is kept in chunks
+        (only the last chunk is searched for MSG_END), so, big messages aren't copied over and over.
+        '''
+        if IS_PYTHON3K:
+            import codecs
+            decoder = codecs.getincrementaldecoder('utf-8')()
+
+        chunks = []
+        overlap_len = len(MSG_END) - 1
+        while True:
+            received = self.socket.recv(BUFFER_SIZE)
+            if len(received) == 0:
+                raise Exit()  # ok, connection ended
             if IS_PYTHON3K:
-                self.socket.sendall(bytearray(msg, 'utf-8'))
+                received = decoder.decode(received)
+
+            if chunks:
+                # MSG_END may be split between the previous chunk and this one.
+                last = chunks[-1]
+                overlap = last[-overlap_len:]
+                if overlap:
+                    chunks[-1] = last[:-len(overlap)]
+                    received = overlap + received
+            chunks.append(received)
+
+            i = received.find(MSG_END)
+            while i != -1:
+                i += len(MSG_END)
+                chunks[-1] = received[:i]
+                yield ''.join(chunks)
+                received = received[i:]
+                chunks = [received]
+                i = received.find(MSG_END)
+
+
+    def handleMessage(self, data, log, max_complete_info=1000):
+        '''
+        @param data: the message received (with MSG_END).
+        @param max_complete_info: see _pydev_imports_tipper.GenerateTip (None for the bulk requests, which compute
+            the complete info for the disk cache).
+        @return: the message to be sent back.
+        '''
+        try:
+            if data.find(MSG_PYTHONPATH) != -1:
+                comps = []
+                for p in _sys_path:
+                    comps.append((p, ' '))
+                return self.getCompletionsMessage(None, comps)
+
+            data = data[:data.rfind(MSG_END)]
+
+            if data.startswith(MSG_IMPORTS):
+                data = data[len(MSG_IMPORTS):]
+                data = unquote_plus(data)
+                defFile, comps = _pydev_imports_tipper.GenerateTip(data, log, max_complete_info)
+                return self.getCompletionsMessage(defFile, comps)
+
+            elif data.startswith(MSG_CHANGE_PYTHONPATH):
+                data = data[len(MSG_CHANGE_PYTHONPATH):]
+                data = unquote_plus(data)
+                ChangePythonPath(data)
+                return MSG_OK
+
+            elif data.startswith(MSG_JEDI):
+                data = data[len(MSG_JEDI):]
+                data = unquote_plus(data)
+                line, column, encoding, path, source = data.split('|', 4)
+                try:
+                    import jedi  # @UnresolvedImport
+                except:
+                    return self.getCompletionsMessage(None, [('Error on import jedi', 'Error importing jedi', '')])
+
+                # jedi keeps global caches, so, don't run it concurrently.
+                self._jedi_lock.acquire()
+                try:
+                    script = jedi.Script(
+                        # Line +1 because it expects lines 1-based (and col 0-based)
+                        source=source,
+                        line=int(line) + 1,
+                        column=int(column),
+                        source_encoding=encoding,
+                        path=path,
+                    )
+                    lst = []
+                    for completion in script.completions():
+                        t = completion.type
+                        if t == 'class':
+                            t = '1'
+
+                        elif t == 'function':
+                            t = '2'
+
+                        elif t == 'import':
+                            t = '0'
+
+                        elif t == 'keyword':
+                            continue  # Keywords are already handled in PyDev
+
+                        elif t == 'statement':
+                            t = '3'
+
+                        else:
+                            t = '-1'
+
+                        # gen list(tuple(name, doc, args, type))
+                        lst.append((completion.name, '', '', t))
+                finally:
+                    self._jedi_lock.release()
+                return self.getCompletionsMessage('empty', lst)
+
+            elif data.startswith(MSG_SEARCH):
+                data = data[len(MSG_SEARCH):]
+                data = unquote_plus(data)
+                (f, line, col), foundAs = _pydev_imports_tipper.Search(data)
+                return self.getCompletionsMessage(f, [(line, col, foundAs)])
+
+            elif data.startswith(MSG_MODULES_INDEX):
+                data = data[len(MSG_MODULES_INDEX):]
+                data = unquote_plus(data)
+                import interpreterInfo
+                interpreterInfo.createModulesIndex(sys.path, data)
+                return MSG_OK
+
+            elif data.startswith(MSG_CHANGE_DIR):
+                data = data[len(MSG_CHANGE_DIR):]
+                data = unquote_plus(data)
+                CompleteFromDir(data)
+                return MSG_OK
+
             else:
-                self.socket.sendall(msg)
+                return MSG_INVALID_REQUEST
+
+        except:
+            dbg(SERVER_NAME + ' exception occurred', ERROR)
+            s = StringIO.StringIO()
+            traceback.print_exc(file=s)
+
+            err = s.getvalue()
+            dbg(SERVER_NAME + ' received error: ' + str(err), ERROR)
+            return self.getCompletionsMessage(None, [('ERROR:', '%s\nLog:%s' % (err, log.GetContents()), '')])
+
+
+    #===================================================================================================================
+    # Requests with ids (MSG_REQUEST)
+    #===================================================================================================================
+    def addRequest(self, data):
+        '''
+        @param data: '@@REQUEST:id[:channel]|message'
+        '''
+        header, data = data[len(MSG_REQUEST):].split('|', 1)
+        if ':' in header:
+            request_id, channel = header.split(':', 1)
+        else:
+            request_id, channel = header, None
+
+        if data.startswith(MSG_CHANGE_DIR) or data.startswith(MSG_CHANGE_PYTHONPATH):
+            # These change the state used by the other requests, so, they're applied in the order received.
+            self._addPendingRequest(Request(request_id, None, data, barrier=True))
+            return
+
+        request = Request(request_id, channel, data)
+        superseded = None
+        self._requests_lock.acquire()
+        try:
+            self._requests[request_id] = request
+            if channel is not None:
+                superseded = self._channels.get(channel)
+                self._channels[channel] = request
+        finally:
+            self._requests_lock.release()
+
+        if superseded is not None:
+            self.cancelRequest(superseded.request_id)
+
+        self._addPendingRequest(request)
+
+
+    def _addPendingRequest(self, request):
+        self._pending_condition.acquire()
+        try:
+            if not self._workers_started:
+                self._workers_started = True
+                for _i in range(max(1, self.workers)):
+                    t = threading.Thread(target=self._workerLoop)
+                    t.setDaemon(True)
+                    t.start()
+            self._pending_requests.append(request)
+            self._pending_condition.notifyAll()
+        finally:
+            self._pending_condition.release()
+
+
+    def _nextRequest(self, log):
+        '''
+        @return: the next request to be handled by a worker (None to stop the worker). Barriers are handled here
+        (while no other request is running) and returned with their response already computed.
+        '''
+        pending = self._pending_requests
+        self._pending_condition.acquire()
+        try:
+            while True:
+                if pending:
+                    request = pending[0]
+                    if request is None:
+                        del pending[0]
+                        return None
+
+                    if not request.barrier or self._running_requests == 0:
+                        del pending[0]
+                        if request.barrier:
+                            try:
+                                request.response = self.handleMessage(request.data, log)
+                            finally:
+                                log.Clear()
+                        self._running_requests += 1
+                        return request
+                self._pending_condition.wait()
+        finally:
+            self._pending_condition.release()
+
+
+    def _requestFinished(self):
+        self._pending_condition.acquire()
+        try:
+            self._running_requests -= 1
+            self._pending_condition.notifyAll()
+        finally:
+            self._pending_condition.release()
+
+
+    def cancelRequest(self, request_id):
+        '''
+        Answers the given request with MSG_CANCELLED (if it's still running, its result is discarded).
+        '''
+        self._requests_lock.acquire()
+        try:
+            request = self._requests.get(request_id)
+            if request is not None:
+                request.cancelled = True
+        finally:
+            self._requests_lock.release()
+
+        if request is not None:
+            self.sendResponse(request, MSG_CANCELLED)
+
+
+    def sendResponse(self, request, msg):
+        '''
+        Sends the response to the given request (only the first response to a request is sent).
+        '''
+        self._requests_lock.acquire()
+        try:
+            if request.answered:
+                return
+            request.answered = True
+            self._requests.pop(request.request_id, None)
+            if request.channel is not None and self._channels.get(request.channel) is request:
+                del self._channels[request.channel]
+        finally:
+            self._requests_lock.release()
+
+        self.send('%s%s|%s' % (MSG_RESPONSE, request.request_id, msg))
+
+
+    def sendPartialResponse(self, request, msg):
+        '''
+        Sends a message for the given request before its response (i.e.: the tips of a @@BULK_IMPORTS request).
+        '''
+        if not request.answered:
+            self.send('%s%s|%s' % (MSG_RESPONSE, request.request_id, msg))
+
+
+    def _workerLoop(self):
+        import _pydev_log
+        log = _pydev_log.Log()
+        while not self.ended:
+            request = self._nextRequest(log)
+            if request is None:
+                return
+            try:
+                try:
+                    if request.cancelled:
+                        continue
+                    if request.barrier:
+                        msg = request.response
+                    elif request.data.startswith(MSG_BULK_IMPORTS):
+                        def send(msg):
+                            self.sendPartialResponse(request, msg)
+                        self.sendBulkTips(request.data, send, lambda: request.cancelled)
+                        msg = MSG_OK
+                    else:
+                        msg = self.handleMessage(request.data, log)
+                    if not request.cancelled:
+                        self.sendResponse(request, msg)
+                except:
+                    # i.e.: the socket was closed.
+                    dbg(SERVER_NAME + ' error sending response: ' + str(sys.exc_info()[1]), ERROR)
+            finally:
+                log.Clear()
+                self._requestFinished()
 
 
     def run(self):
@@ -256,18 +625,7 @@ class CompletionServer:
             dbg(SERVER_NAME + ' Connected to java server', INFO1)
 
 
-            while not self.ended:
-                data = ''
-
-                while data.find(MSG_END) == -1:
-                    received = self.socket.recv(BUFFER_SIZE)
-                    if len(received) == 0:
-                        raise Exit()  # ok, connection ended
-                    if IS_PYTHON3K:
-                        data = data + received.decode('utf-8')
-                    else:
-                        data = data + received
-
+            for data in self.readMessages():
                 try:
                     try:
                         if data.find(MSG_KILL_SERVER) != -1:
@@ -278,83 +636,19 @@ class CompletionServer:
 
                         dbg(SERVER_NAME + ' starting keep alive thread', INFO2)
 
-                        if data.find(MSG_PYTHONPATH) != -1:
-                            comps = []
-                            for p in _sys_path:
-                                comps.append((p, ' '))
-                            self.send(self.getCompletionsMessage(None, comps))
+                        if data.startswith(MSG_REQUEST):
+                            self.addRequest(data)
+
+                        elif data.startswith(MSG_BULK_IMPORTS):
+                            self.sendBulkTips(data, self.send)
+                            self.send(MSG_OK)
+
+                        elif data.startswith(MSG_CANCEL):
+                            self.cancelRequest(data[len(MSG_CANCEL):data.rfind(MSG_END)])
 
                         else:
-                            data = data[:data.rfind(MSG_END)]
-
-                            if data.startswith(MSG_IMPORTS):
-                                data = data[len(MSG_IMPORTS):]
-                                data = unquote_plus(data)
-                                defFile, comps = _pydev_imports_tipper.GenerateTip(data, log)
-                                self.send(self.getCompletionsMessage(defFile, comps))
-
-                            elif data.startswith(MSG_CHANGE_PYTHONPATH):
-                                data = data[len(MSG_CHANGE_PYTHONPATH):]
-                                data = unquote_plus(data)
-                                ChangePythonPath(data)
-                                self.send(MSG_OK)
-
-                            elif data.startswith(MSG_JEDI):
-                                data = data[len(MSG_JEDI):]
-                                data = unquote_plus(data)
-                                line, column, encoding, path, source = data.split('|', 4)
-                                try:
-                                    import jedi  # @UnresolvedImport
-                                except:
-                                    self.send(self.getCompletionsMessage(None, [('Error on import jedi', 'Error importing jedi', '')]))
-                                else:
-                                    script = jedi.Script(
-                                        # Line +1 because it expects lines 1-based (and col 0-based)
-                                        source=source,
-                                        line=int(line) + 1,
-                                        column=int(column),
-                                        source_encoding=encoding,
-                                        path=path,
-                                    )
-                                    lst = []
-                                    for completion in script.completions():
-                                        t = completion.type
-                                        if t == 'class':
-                                            t = '1'
-
-                                        elif t == 'function':
-                                            t = '2'
-
-                                        elif t == 'import':
-                                            t = '0'
-
-                                        elif t == 'keyword':
-                                            continue  # Keywords are already handled in PyDev
-
-                                        elif t == 'statement':
-                                            t = '3'
-
-                                        else:
-                                            t = '-1'
-
-                                        # gen list(tuple(name, doc, args, type))
-                                        lst.append((completion.name, '', '', t))
-                                    self.send(self.getCompletionsMessage('empty', lst))
-
-                            elif data.startswith(MSG_SEARCH):
-                                data = data[len(MSG_SEARCH):]
-                                data = unquote_plus(data)
-                                (f, line, col), foundAs = _pydev_imports_tipper.Search(data)
-                                self.send(self.getCompletionsMessage(f, [(line, col, foundAs)]))
-
-                            elif data.startswith(MSG_CHANGE_DIR):
-                                data = data[len(MSG_CHANGE_DIR):]
-                                data = unquote_plus(data)
-                                CompleteFromDir(data)
-                                self.send(MSG_OK)
-
-                            else:
-                                self.send(MSG_INVALID_REQUEST)
+                            self.send(self.handleMessage(data, log))
+
                     except Exit:
                         self.send(self.getCompletionsMessage(None, [('Exit:', 'SystemExit', '')]))
                         raise
@@ -372,16 +666,19 @@ class CompletionServer:
                 finally:
                     log.Clear()
 
-            self.socket.close()
-            self.ended = True
-            raise Exit()  # connection broken
-
-
         except Exit:
+            self.ended = True
+            self.stopWorkers()
+            try:
+                self.socket.close()
+            except:
+                pass
             if self.exit_process_on_kill:
                 sys.exit(0)
             # No need to log SystemExit error
         except:
+            self.ended = True
+            self.stopWorkers()
             s = StringIO.StringIO()
             exc_info = sys.exc_info()
 
@@ -391,6 +688,98 @@ class CompletionServer:
             raise
 
 
+    def generateTips(self, names, budget=BULK_TIP_BUDGET, workers=BULK_WORKERS, is_cancelled=lambda: False):
+        '''
+        Computes the tips for the given modules in a pool of threads.
+
+        A module which takes more than budget seconds is given up (and its worker is replaced so that the modules
+        still queued aren't stuck behind it). Modules still queued when the overall budget (the time the pool would
+        take if all the modules took budget seconds) is used up are also given up.
+
+        @return: generator with tuple(name, message) as each module completes (message is MSG_BULK_TIMEOUT if the
+        module was given up).
+        '''
+        import _pydev_log
+        work = _queue.Queue()
+        results = _queue.Queue()
+        started = {}  # name -> time when it started
+        timed_out = {}  # name -> True for the modules given up
+        remaining = {}
+        for name in names:
+            if name and name not in remaining:
+                remaining[name] = True
+                work.put(name)
+
+        def worker():
+            log = _pydev_log.Log()
+            while not is_cancelled():
+                try:
+                    name = work.get(False)
+                except _queue.Empty:
+                    return
+                if name in timed_out:
+                    continue
+                started[name] = time.time()
+                results.put((name, self.handleMessage(MSG_IMPORTS + quote_plus(name) + MSG_END, log, None)))
+                log.Clear()
+                if name in timed_out:
+                    return  # A replacement was already started for this worker.
+
+        def startWorker():
+            t = threading.Thread(target=worker)
+            t.setDaemon(True)
+            t.start()
+
+        workers = max(1, min(workers, len(remaining)))
+        deadline = time.time() + budget * ((len(remaining) + workers - 1) // workers)
+        for _i in range(workers):
+            startWorker()
+
+        while remaining and not is_cancelled():
+            now = time.time()
+            timeout = deadline - now
+            for name in remaining:
+                if name in started:
+                    timeout = min(timeout, started[name] + budget - now)
+            try:
+                name, msg = results.get(True, max(0, timeout))
+            except _queue.Empty:
+                now = time.time()
+                for name in list(remaining.keys()):
+                    if name in started:
+                        if started[name] + budget > now:
+                            continue
+                        timed_out[name] = True
+                        startWorker()
+                    elif deadline <= now:
+                        timed_out[name] = True
+                    else:
+                        continue
+                    del remaining[name]
+                    yield name, MSG_BULK_TIMEOUT
+                continue
+
+            if name in remaining:
+                del remaining[name]
+                yield name, msg
+
+
+    def sendBulkTips(self, data, send, is_cancelled=lambda: False):
+        '''
+        Handles a MSG_BULK_IMPORTS message: each result is passed to send as it completes.
+        '''
+        data = data[len(MSG_BULK_IMPORTS):data.rfind(MSG_END)]
+        names = unquote_plus(data).split('|')
+        for name, msg in self.generateTips(names, is_cancelled=is_cancelled):
+            send('%s%s|%s' % (MSG_BULK_TIP, quote_plus(name), msg))
+
+
+    def stopWorkers(self):
+        if self._workers_started:
+            for _i in range(max(1, self.workers)):
+                self._addPendingRequest(None)
+
+
 
 if __name__ == '__main__':
 
@@ -430,18 +430,18 @@ class BaseInterpreterInterface:
 
         return xml
 
-    def getArray(self, attr, roffset, coffset, rows, cols, format):
+    def getArray(self, attr, roffset, coffset, rows, cols, format, options=''):
+        '''
+        @param options: ':compact' and/or ':table' (as the suffixes of the scope in CMD_GET_ARRAY).
+        '''
         xml = "<xml>"
         name = attr.split("\t")[-1]
         array = pydevd_vars.evalInContext(name, self.getNamespace(), self.getNamespace())
+        _scope, compact, table = pydevd_vars.get_array_options(options)
 
-        array, metaxml, r, c, f = pydevd_vars.array_to_meta_xml(array, name, format)
-        xml += metaxml
-        format = '%' + f
-        if rows == -1 and cols == -1:
-            rows = r
-            cols = c
-        xml += pydevd_vars.array_to_xml(array, roffset, coffset, rows, cols, format)
+        # The console isn't suspended between requests (so, the array may have been changed since the last one).
+        pydevd_vars.clear_array_meta_cache()
+        xml += pydevd_vars.array_data_to_xml(array, name, roffset, coffset, rows, cols, format, compact, table)
         xml += "</xml>"
 
         return xml
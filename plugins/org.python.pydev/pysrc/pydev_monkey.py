@@ -51,6 +51,12 @@ def _on_set_trace_for_new_thread():
     if global_debugger is not None:
         global_debugger.SetTrace(global_debugger.trace_dispatch)
 
+def _on_new_thread_finished():
+    from pydevd_comm import GetGlobalDebugger
+    global_debugger = GetGlobalDebugger()
+    if global_debugger is not None:
+        global_debugger.notifyCurrentThreadFinished()
+
 #===============================================================================
 # Things related to monkey-patching
 #===============================================================================
@@ -470,7 +476,10 @@ class _NewThreadStartupWithTrace:
 
     def __call__(self):
         _on_set_trace_for_new_thread()
-        return self.original_func(*self.args, **self.kwargs)
+        try:
+            return self.original_func(*self.args, **self.kwargs)
+        finally:
+            _on_new_thread_finished()
 
 
 class _NewThreadStartupWithoutTrace:
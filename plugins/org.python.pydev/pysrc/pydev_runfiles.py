@@ -30,6 +30,11 @@ class Configuration:
         exclude_tests=None,
         include_files=None,
         django=False,
+        zygote=False,
+        stream_port=None,
+        discovery_cache=False,
+        affected=False,
+        capture='sys',
         ):
         self.files_or_dirs = files_or_dirs
         self.verbosity = verbosity
@@ -40,6 +45,11 @@ class Configuration:
         self.jobs = jobs
         self.split_jobs = split_jobs
         self.django = django
+        self.zygote = zygote
+        self.stream_port = stream_port
+        self.discovery_cache = discovery_cache
+        self.affected = affected
+        self.capture = capture
 
         if include_tests:
             assert isinstance(include_tests, (list, tuple))
@@ -79,6 +89,11 @@ class Configuration:
  - coverage_output_file: %s
 
  - django: %s
+ - zygote: %s
+ - stream_port: %s
+ - discovery_cache: %s
+ - affected: %s
+ - capture: %s
 ''' % (
         self.files_or_dirs,
         self.verbosity,
@@ -99,6 +114,11 @@ class Configuration:
         self.coverage_output_file,
 
         self.django,
+        self.zygote,
+        self.stream_port,
+        self.discovery_cache,
+        self.affected,
+        self.capture,
     )
 
 
@@ -114,9 +134,33 @@ def parse_cmdline(argv=None):
 
     Multiprocessing options:
     jobs=number (with the number of jobs to be used to run the tests)
-    split_jobs='module'|'tests'
+    split_jobs='module'|'tests'|'auto'
         if == module, a given job will always receive all the tests from a module
         if == tests, the tests will be split independently of their originating module (default)
+        if == auto, the tests will be split in batches which should take about the same time (based on the durations
+            of previous runs)
+        (in all cases the batches which should take longer -- based on the durations of previous runs -- are run first)
+    zygote=true|false
+        if true (and os.fork is available), the test modules are imported in a single process which is then forked
+        for each job (so, the jobs don't have to import the modules -- and their dependencies -- again)
+
+    --stream_port = port where the notifications should be sent through a persistent socket (see pydev_runfiles_stream)
+        instead of using xml-rpc requests to --port (which is still used if the connection to this port fails).
+
+    --discovery_cache=true|false
+        if true (default), the directories listed and the tests found in each file are cached between runs (see
+        pydev_runfiles_discovery), so, only the changed directories and files are scanned again
+
+    --affected
+        only runs the tests affected by the changes since they last ran (see pydev_runfiles_affected) -- all the tests
+        are run if their dependencies weren't recorded yet. The tests are always run in this process (--jobs is ignored)
+
+    --capture=sys|fd
+        how the output of each test is captured (see pydev_runfiles_unittest.PydevTestResult):
+        if == sys, sys.stdout and sys.stderr are replaced during the test (default)
+        if == fd, the stdout and stderr file descriptors are redirected (faster and also captures the output of C
+            extensions and child processes -- the output is only passed for tests which don't pass, unless
+            verbosity > 2, and is truncated if too big)
 
     --exclude_files  = comma-separated list of patterns with files to exclude (fnmatch style)
     --include_files = comma-separated list of patterns with files to include (fnmatch style)
@@ -140,6 +184,11 @@ def parse_cmdline(argv=None):
     exclude_tests = None
     include_files = None
     django = False
+    zygote = False
+    stream_port = None
+    discovery_cache = True
+    affected = False
+    capture = 'sys'
 
     from _pydev_getopt import gnu_getopt
     optlist, dirs = gnu_getopt(
@@ -149,6 +198,7 @@ def parse_cmdline(argv=None):
             "tests=",
 
             "port=",
+            "stream_port=",
             "config_file=",
 
             "jobs=",
@@ -163,7 +213,11 @@ def parse_cmdline(argv=None):
             "coverage_output_dir=",
             "coverage_include=",
 
-            "django="
+            "django=",
+            "zygote=",
+            "discovery_cache=",
+            "affected",
+            "capture=",
         ]
     )
 
@@ -174,13 +228,16 @@ def parse_cmdline(argv=None):
         elif opt in ("-p", "--port"):
             port = int(value)
 
+        elif opt in ("--stream_port",):
+            stream_port = int(value)
+
         elif opt in ("-j", "--jobs"):
             jobs = int(value)
 
         elif opt in ("-s", "--split_jobs"):
             split_jobs = value
-            if split_jobs not in ('module', 'tests'):
-                raise AssertionError('Expected split to be either "module" or "tests". Was :%s' % (split_jobs,))
+            if split_jobs not in ('module', 'tests', 'auto'):
+                raise AssertionError('Expected split to be either "module", "tests" or "auto". Was :%s' % (split_jobs,))
 
         elif opt in ("-d", "--coverage_output_dir",):
             coverage_output_dir = value.strip()
@@ -206,6 +263,20 @@ def parse_cmdline(argv=None):
         elif opt in ("--django",):
             django = value.strip() in ['true', 'True', '1']
 
+        elif opt in ("--zygote",):
+            zygote = value.strip() in ['true', 'True', '1']
+
+        elif opt in ("--discovery_cache",):
+            discovery_cache = value.strip() in ['true', 'True', '1']
+
+        elif opt in ("--affected",):
+            affected = True
+
+        elif opt in ("--capture",):
+            capture = value.strip()
+            if capture not in ('sys', 'fd'):
+                raise AssertionError('Expected capture to be either "sys" or "fd". Was :%s' % (capture,))
+
         elif opt in ("-c", "--config_file"):
             config_file = value.strip()
             if os.path.exists(config_file):
@@ -264,6 +335,11 @@ def parse_cmdline(argv=None):
         exclude_tests=exclude_tests,
         include_files=include_files,
         django=django,
+        zygote=zygote,
+        stream_port=stream_port,
+        discovery_cache=discovery_cache,
+        affected=affected,
+        capture=capture,
     )
 
     if verbosity > 5:
@@ -271,6 +347,47 @@ def parse_cmdline(argv=None):
     return config
 
 
+#=======================================================================================================================
+# _PathsTrie
+#=======================================================================================================================
+class _PathsTrie:
+    """ prefix tree with the entries of the pythonpath (as import strings), so, the module names for a file are found
+        without comparing it against each entry """
+
+    def __init__(self):
+        self.root = {}
+        self.count = 0
+
+    def add(self, path):
+        node = self.root
+        for part in path.split('.'):
+            if not DictContains(node, part):
+                node[part] = {}
+            node = node[part]
+
+        #None is the key with the indexes of the entries ending in the node.
+        if not DictContains(node, None):
+            node[None] = []
+        node[None].append(self.count)
+        self.count += 1
+
+    def get_import_choices(self, imp):
+        """ returns the module names for the given import string (ordered as the pythonpath entries used) """
+        parts = imp.split('.')
+        found = []
+        node = self.root
+        for i in xrange(len(parts)):
+            node = node.get(parts[i])
+            if node is None:
+                break
+            if DictContains(node, None) and i + 1 < len(parts):
+                add = '.'.join(parts[i + 1:])
+                for index in node[None]:
+                    found.append((index, add))
+        found.sort()
+        return [add for _index, add in found]
+
+
 #=======================================================================================================================
 # PydevTestRunner
 #=======================================================================================================================
@@ -295,10 +412,18 @@ class PydevTestRunner(object):
 
         'configuration',
         'coverage',
+        'modules_cache',  #Dict shared by the runners which run batches of tests in the same process (may be None)
+        'discovery_cache',  #pydev_runfiles_discovery.DiscoveryCache (None if not used)
     ]
 
-    def __init__(self, configuration):
+    def __init__(self, configuration, modules_cache=None):
+        '''
+        @param modules_cache: dict(filename -> tuple(filename, module, import_str))
+            If given, the modules found for the test files are kept in it, so, other runners created with the same
+            dict don't have to find them again.
+        '''
         self.verbosity = configuration.verbosity
+        self.modules_cache = modules_cache
 
         self.jobs = configuration.jobs
         self.split_jobs = configuration.split_jobs
@@ -314,6 +439,10 @@ class PydevTestRunner(object):
             self.tests = configuration.tests
 
         self.configuration = configuration
+        self.discovery_cache = None
+        if configuration.discovery_cache:
+            import pydev_runfiles_discovery
+            self.discovery_cache = pydev_runfiles_discovery.DiscoveryCache()
         self.__adjust_path()
 
 
@@ -336,6 +465,9 @@ class PydevTestRunner(object):
                 msg = ("unknown type. \n%s\nshould be file or a directory.\n" % (dir_name))
                 raise RuntimeError(msg)
         if path_to_append is not None:
+            if self.modules_cache is not None and path_to_append in sys.path:
+                return #Runners sharing a cache run in the same process (don't add it again for each one).
+
             #Add it as the last one (so, first things are resolved against the default dirs and
             #if none resolves, then we try a relative import).
             sys.path.append(path_to_append)
@@ -392,7 +524,12 @@ class PydevTestRunner(object):
 
             for base_dir in self.files_or_dirs:
                 if os.path.isdir(base_dir):
-                    if hasattr(os, 'walk'):
+                    if self.discovery_cache is not None:
+                        #Only directories changed since the last run are listed again.
+                        for root, files in self.discovery_cache.Walk(base_dir):
+                            self.__add_files(pyfiles, root, files)
+
+                    elif hasattr(os, 'walk'):
                         for root, dirs, files in os.walk(base_dir):
 
                             #Note: handling directories that should be excluded from the search because
@@ -457,9 +594,25 @@ class PydevTestRunner(object):
 
             pyfiles = ret
 
+        if self.tests and self.discovery_cache is not None:
+            pyfiles = self.__filter_files_by_static_tests(pyfiles)
+
+        if self.discovery_cache is not None:
+            self.discovery_cache.Save()
 
         return pyfiles
 
+    def __filter_files_by_static_tests(self, pyfiles):
+        """ removes the files which surely don't have any of the tests requested (so, they're not imported) """
+        import pydev_runfiles_discovery
+        ret = []
+        for f in pyfiles:
+            if pydev_runfiles_discovery.CouldHaveTests(self.discovery_cache.GetStaticTests(f), self.tests):
+                ret.append(f)
+            elif self.verbosity > 3:
+                sys.stdout.write('Skipped file: %s (does not have any of the tests: %s)\n' % (f, self.tests))
+        return ret
+
     def __get_module_from_str(self, modname, print_exception, pyfile):
         """ Import the module in the given import path.
             * Returns the "final" module, so importing "coilib40.subject.visu"
@@ -489,25 +642,36 @@ class PydevTestRunner(object):
 
     def find_modules_from_files(self, pyfiles):
         """ returns a list of modules given a list of files """
+        modules_cache = self.modules_cache
+        if modules_cache is None:
+            return self.__find_modules_from_files(pyfiles)
+
+        not_cached = [pyfile for pyfile in pyfiles if pyfile not in modules_cache]
+        if not_cached:
+            for pyfile_and_module in self.__find_modules_from_files(not_cached):
+                modules_cache[pyfile_and_module[0]] = pyfile_and_module
+
+        ret = []
+        for pyfile in pyfiles:
+            pyfile_and_module = modules_cache.get(pyfile)
+            if pyfile_and_module is not None:
+                ret.append(pyfile_and_module)
+        return ret
+
+    def __find_modules_from_files(self, pyfiles):
         #let's make sure that the paths we want are in the pythonpath...
         imports = [(s, self.__importify(s)) for s in pyfiles]
 
-        system_paths = []
+        system_paths = _PathsTrie()
         for s in sys.path:
-            system_paths.append(self.__importify(s, True))
+            system_paths.add(self.__importify(s, True))
 
 
         ret = []
         for pyfile, imp in imports:
             if imp is None:
                 continue  #can happen if a file is not a valid module
-            choices = []
-            for s in system_paths:
-                if imp.startswith(s):
-                    add = imp[len(s) + 1:]
-                    if add:
-                        choices.append(add)
-                    #sys.stdout.write(' ' + add + ' ')
+            choices = system_paths.get_import_choices(imp)
 
             if not choices:
                 sys.stdout.write('PYTHONPATH not found for file: %s\n' % imp)
@@ -692,6 +856,28 @@ class PydevTestRunner(object):
         return test_suite
 
 
+    def filter_affected_tests(self, test_objs, affected_tests):
+        """ only keeps the tests affected by the changes since they last ran (see pydev_runfiles_affected) """
+        import unittest
+        from pydev_runfiles_parallel import GetTestId
+        test_suite = []
+        for test_obj in test_objs:
+
+            if isinstance(test_obj, unittest.TestSuite):
+                if test_obj._tests:
+                    test_obj._tests = self.filter_affected_tests(test_obj._tests, affected_tests)
+                    if test_obj._tests:  #Only add the suite if we still have tests there.
+                        test_suite.append(test_obj)
+
+            elif isinstance(test_obj, unittest.TestCase):
+                if affected_tests.IsAffected(GetTestId(test_obj)):
+                    test_suite.append(test_obj)
+
+                elif self.verbosity > 3:
+                    sys.stdout.write('Skipped test: %s (not affected by the changes)\n' % (GetTestId(test_obj),))
+        return test_suite
+
+
     def iter_tests(self, test_objs):
         #Note: not using yield because of Jython 2.1.
         import unittest
@@ -765,6 +951,18 @@ class PydevTestRunner(object):
         all_tests = self.find_tests_from_modules(file_and_modules_and_module_name)
         all_tests = self.filter_tests(all_tests)
 
+        affected_tests = None
+        if self.configuration.affected:
+            import pydev_runfiles_affected
+            affected_tests = pydev_runfiles_affected.AffectedTests()
+            if affected_tests.IsStale():
+                sys.stdout.write('Dependencies of the tests not recorded yet: running all the tests.\n')
+            else:
+                total = len(self.iter_tests(all_tests))
+                all_tests = self.filter_affected_tests(all_tests, affected_tests)
+                sys.stdout.write('Running %s of %s tests (affected by the changes since they last ran).\n' % (
+                    len(self.iter_tests(all_tests)), total))
+
         import pydev_runfiles_unittest
         test_suite = pydev_runfiles_unittest.PydevTestSuite(all_tests)
         import pydev_runfiles_xml_rpc
@@ -774,20 +972,31 @@ class PydevTestRunner(object):
 
         def run_tests():
             executed_in_parallel = False
-            if self.jobs > 1:
+            if self.jobs > 1 and affected_tests is None:
                 import pydev_runfiles_parallel
 
                 #What may happen is that the number of jobs needed is lower than the number of jobs requested
                 #(e.g.: 2 jobs were requested for running 1 test) -- in which case ExecuteTestsInParallel will
                 #return False and won't run any tests.
                 executed_in_parallel = pydev_runfiles_parallel.ExecuteTestsInParallel(
-                    all_tests, self.jobs, self.split_jobs, self.verbosity, coverage_files, self.configuration.coverage_include)
+                    all_tests, self.jobs, self.split_jobs, self.verbosity, coverage_files, self.configuration.coverage_include,
+                    self.configuration.zygote, self.configuration.capture)
 
             if not executed_in_parallel:
                 #If in coverage, we don't need to pass anything here (coverage is already enabled for this execution).
-                runner = pydev_runfiles_unittest.PydevTextTestRunner(stream=sys.stdout, descriptions=1, verbosity=self.verbosity)
+                runner = pydev_runfiles_unittest.PydevTextTestRunner(
+                    stream=sys.stdout, descriptions=1, verbosity=self.verbosity, capture=self.configuration.capture)
                 sys.stdout.write('\n')
-                runner.run(test_suite)
+                if affected_tests is None:
+                    runner.run(test_suite)
+                else:
+                    #Record the dependencies of the tests run.
+                    pydev_runfiles_affected.SetRecorder(affected_tests)
+                    try:
+                        runner.run(test_suite)
+                    finally:
+                        pydev_runfiles_affected.SetRecorder(None)
+                    affected_tests.Save()
 
         if self.configuration.django:
             MyDjangoTestSuiteRunner(run_tests).run_tests([])
@@ -0,0 +1,264 @@
+'''
+Support for running only the tests affected by the changes since they last ran (runfiles.py --affected).
+
+While each test runs, the files with the code it executes are recorded (through sys.settrace -- only 'call' events are
+traced, so, the overhead is small). The dependencies of each test are kept with the hash of the contents of those files
+and in the next run, a test is only selected if some of those files changed (or if it's a new test or if it didn't
+pass in its last run).
+
+The map with the dependencies is kept in a pickle file for each python version (the default file is in the user home,
+but it may be changed through the PYDEV_RUNFILES_AFFECTED_DB environment variable). If the map can't be used (i.e.: it
+doesn't exist yet), all the tests are run (and their dependencies recorded).
+
+Note: the dependencies are gathered per file (a test is affected by any change in a file with code it executed) and
+code executed outside of the test (i.e.: when its module is imported or in setUpClass/setUpModule) is not recorded
+(a change there only selects the tests whose code is in the same file or which call code from that file).
+'''
+from pydevd_constants import * #@UnusedWildImport
+import os
+import time
+from pydev_runfiles_discovery import RACY_INTERVAL
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+try:
+    from hashlib import md5
+except ImportError:
+    from md5 import new as md5 #Python 2.4
+
+DB_VERSION = 1
+
+#The files of the test runner itself are not dependencies of the tests.
+PYSRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+#=======================================================================================================================
+# GetAffectedDbFilename
+#=======================================================================================================================
+def GetAffectedDbFilename():
+    '''
+    @return: str
+        The file with the dependencies of the tests for the current python version (may be changed through the
+        PYDEV_RUNFILES_AFFECTED_DB environment variable).
+    '''
+    filename = os.environ.get('PYDEV_RUNFILES_AFFECTED_DB')
+    if not filename:
+        filename = os.path.join(os.path.expanduser('~'), '.pydev_runfiles_affected')
+    return '%s_%s%s' % (filename, sys.version_info[0], sys.version_info[1])
+
+
+#=======================================================================================================================
+# _DependenciesTracer
+#=======================================================================================================================
+class _DependenciesTracer:
+
+    def __init__(self):
+        self.filenames = {}
+
+    def __call__(self, frame, event, arg):
+        if event == 'call':
+            self.filenames[frame.f_code.co_filename] = 1
+        return None #No need to trace the lines.
+
+
+#=======================================================================================================================
+# AffectedTests
+#=======================================================================================================================
+class AffectedTests:
+
+    def __init__(self, filename=None):
+        if filename is None:
+            filename = GetAffectedDbFilename()
+        self.filename = filename
+
+        #file -> tuple(mtime, size, gathered_at, md5 of the contents)
+        self.files = {}
+
+        #filename|Test.testName -> tuple(passed, dict(file -> md5 of its contents when the test ran))
+        self.tests = {}
+
+        self.loaded = False
+        self._current_hashes = {} #Hashes already computed in this run.
+        self._tracer = None
+        self._Load()
+
+
+    def _Load(self):
+        try:
+            f = open(self.filename, 'rb')
+        except IOError:
+            return #No dependencies recorded yet.
+
+        try:
+            try:
+                contents = pickle.load(f)
+                if contents.get('version') == DB_VERSION:
+                    self.files = contents['files']
+                    self.tests = contents['tests']
+                    self.loaded = True
+            except:
+                pass #Just ignore an invalid file (all the tests will be run).
+        finally:
+            f.close()
+
+
+    def Save(self):
+        '''
+        Saves the dependencies (the contents of the file are replaced only after all was written).
+        '''
+        try:
+            tmp_filename = '%s.%s.tmp' % (self.filename, os.getpid())
+            f = open(tmp_filename, 'wb')
+            try:
+                pickle.dump({'version': DB_VERSION, 'files': self.files, 'tests': self.tests}, f, 2)
+            finally:
+                f.close()
+
+            if os.path.exists(self.filename):
+                try:
+                    os.rename(tmp_filename, self.filename)
+                except OSError:
+                    #On Windows, rename fails if the target exists.
+                    os.remove(self.filename)
+                    os.rename(tmp_filename, self.filename)
+            else:
+                os.rename(tmp_filename, self.filename)
+        except:
+            sys.stderr.write('Unable to save the dependencies of the tests to: %s\n' % (self.filename,))
+
+
+    def IsStale(self):
+        '''
+        @return: bool
+            True if the dependencies recorded can't be used to select the tests (so, all should be run).
+        '''
+        return not self.loaded or not self.tests
+
+
+    def GetHash(self, filename):
+        '''
+        @return: str or None (if the file doesn't exist)
+            The md5 of the contents of the file (only computed again if its mtime or size changed).
+        '''
+        try:
+            return self._current_hashes[filename]
+        except KeyError:
+            pass
+
+        file_hash = None
+        try:
+            st = os.stat(filename)
+        except OSError:
+            st = None
+
+        if st is not None:
+            entry = self.files.get(filename)
+            if entry is not None and entry[0] == st.st_mtime and entry[1] == st.st_size and \
+                st.st_mtime < entry[2] - RACY_INTERVAL:
+                file_hash = entry[3]
+            else:
+                gathered_at = time.time()
+                try:
+                    f = open(filename, 'rb')
+                    try:
+                        file_hash = md5(f.read()).hexdigest()
+                    finally:
+                        f.close()
+                except IOError:
+                    pass
+                else:
+                    self.files[filename] = (st.st_mtime, st.st_size, gathered_at, file_hash)
+
+        if file_hash is None:
+            try:
+                del self.files[filename]
+            except KeyError:
+                pass
+        self._current_hashes[filename] = file_hash
+        return file_hash
+
+
+    def IsAffected(self, test_id):
+        '''
+        @return: bool
+            True if the test should be run (it's new, didn't pass in its last run or some of its dependencies changed).
+        '''
+        entry = self.tests.get(test_id)
+        if entry is None:
+            return True
+
+        passed, dependencies = entry
+        if not passed:
+            return True
+
+        for filename, file_hash in dependencies.items():
+            if self.GetHash(filename) != file_hash:
+                return True
+        return False
+
+
+    def StartTest(self):
+        '''
+        Starts recording the dependencies of a test (not done if something else is already tracing -- i.e.: the
+        debugger or coverage -- in which case the dependencies of the test are not updated).
+        '''
+        self._tracer = None
+        if hasattr(sys, 'gettrace') and sys.gettrace() is not None:
+            return
+
+        self._tracer = _DependenciesTracer()
+        threading.settrace(self._tracer)
+        sys.settrace(self._tracer)
+
+
+    def StopTest(self, test_id, test_file, passed):
+        tracer = self._tracer
+        if tracer is None:
+            return
+        sys.settrace(None)
+        threading.settrace(None)
+        self._tracer = None
+
+        dependencies = {}
+        for filename in list(tracer.filenames.keys()) + [test_file]:
+            filename = os.path.abspath(filename)
+            if filename.startswith(PYSRC_DIR + os.sep):
+                continue
+
+            file_hash = self.GetHash(filename)
+            if file_hash is not None: #i.e.: <string>
+                dependencies[filename] = file_hash
+
+        self.tests[test_id] = (passed, dependencies)
+
+
+
+#=======================================================================================================================
+# _RecorderHolder
+#=======================================================================================================================
+class _RecorderHolder:
+    '''
+    Helper so that we don't have to use a global here.
+    '''
+    RECORDER = None
+
+
+#=======================================================================================================================
+# SetRecorder
+#=======================================================================================================================
+def SetRecorder(recorder):
+    '''
+    @param recorder: AffectedTests or None
+        The AffectedTests which should record the dependencies of the tests run.
+    '''
+    _RecorderHolder.RECORDER = recorder
+
+
+#=======================================================================================================================
+# GetRecorder
+#=======================================================================================================================
+def GetRecorder():
+    return _RecorderHolder.RECORDER
@@ -0,0 +1,390 @@
+'''
+Cache used by PydevTestRunner to find the files with the tests faster in subsequent runs.
+
+It keeps:
+- the listing of each directory walked (its files and sub-directories and whether it's a package), which is reused
+  while the mtime of the directory doesn't change (so, unchanged directories don't have to be listed again nor have
+  their sub-directories checked for an __init__ file);
+- the tests found in each file by parsing it with the ast module (without importing it), which are reused while
+  the mtime and size of the file don't change. These are used when only some tests should be run (--tests) to skip
+  importing the modules which can't have them.
+
+The cache is kept in a pickle file for each python version (the default file is in the user home, but it may be
+changed through the PYDEV_RUNFILES_DISCOVERY_CACHE environment variable).
+'''
+from pydevd_constants import * #@UnusedWildImport
+import os
+import time
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+try:
+    import ast
+except ImportError:
+    ast = None #Python 2.5 or older: the tests can't be found statically.
+
+CACHE_VERSION = 1
+
+#Entries whose mtime is too close to the time they were gathered are not reused (the directory or file could have
+#been changed again in the same mtime tick -- some file systems only have a 2 seconds resolution).
+RACY_INTERVAL = 2.0
+
+INIT_FILES = ['__init__.py', '__init__.pyo', '__init__.pyc', '__init__.pyw']
+
+#If any of these is used in the module level, test cases may be created dynamically.
+DYNAMIC_NAMES = {'setattr': 1, 'globals': 1, 'locals': 1, 'vars': 1, 'exec': 1, 'execfile': 1, '__import__': 1,
+                 'type': 1}
+
+
+#=======================================================================================================================
+# GetDiscoveryCacheFilename
+#=======================================================================================================================
+def GetDiscoveryCacheFilename():
+    '''
+    @return: str
+        The file with the cache for the current python version (may be changed through the
+        PYDEV_RUNFILES_DISCOVERY_CACHE environment variable).
+    '''
+    filename = os.environ.get('PYDEV_RUNFILES_DISCOVERY_CACHE')
+    if not filename:
+        filename = os.path.join(os.path.expanduser('~'), '.pydev_runfiles_discovery')
+    return '%s_%s%s' % (filename, sys.version_info[0], sys.version_info[1])
+
+
+#=======================================================================================================================
+# StaticTestsFinder
+#=======================================================================================================================
+class StaticTestsFinder:
+    '''
+    Finds the test cases of a module by parsing it.
+
+    The result is None if the tests can't be known without importing the module (i.e.: a load_tests function,
+    'from x import *', classes created or changed dynamically) or a dict with:
+        'classes': dict(class name -> list(test method names) or None if its bases are not in the module)
+        'names': list(other names bound in the module level -- which could be test cases from other modules)
+    '''
+
+    def __init__(self):
+        self.classes = {}
+        self.names = {}
+
+
+    def Find(self, source, filename):
+        if ast is None:
+            return None
+        try:
+            tree = ast.parse(source, filename)
+        except:
+            return None #i.e.: syntax error or python 2 file in python 3.
+
+        if not self._VisitStatements(tree.body):
+            return None
+        return {'classes': self.classes, 'names': list(self.names.keys())}
+
+
+    def _VisitStatements(self, statements):
+        for node in statements:
+            if not self._VisitStatement(node):
+                return False
+        return True
+
+
+    def _VisitStatement(self, node):
+        if isinstance(node, ast.ClassDef):
+            return self._VisitClass(node)
+
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                if alias.name == '*':
+                    return False
+                self.names[alias.name.split('.')[-1]] = 1
+                if alias.asname:
+                    self.names[alias.asname] = 1
+            return True
+
+        if isinstance(node, ast.FunctionDef) or node.__class__.__name__ == 'AsyncFunctionDef':
+            return node.name != 'load_tests'
+
+        for child in ast.walk(node):
+            if isinstance(child, ast.Name) and DictContains(DYNAMIC_NAMES, child.id):
+                return False
+            if child.__class__.__name__ == 'Exec':
+                return False #Python 2 exec statement.
+
+        if isinstance(node, (ast.Assign, ast.AugAssign)) or node.__class__.__name__ == 'AnnAssign':
+            targets = getattr(node, 'targets', None)
+            if targets is None:
+                targets = [node.target]
+            for target in targets:
+                if not self._VisitTarget(target, node.value):
+                    return False
+            return True
+
+        #Compound statements (if, try, for, while, with): their bodies may also define test cases.
+        for field in ('body', 'orelse', 'finalbody'):
+            if not self._VisitStatements(getattr(node, field, [])):
+                return False
+        for handler in getattr(node, 'handlers', []):
+            if not self._VisitStatements(handler.body):
+                return False
+        return True
+
+
+    def _VisitTarget(self, target, value):
+        if isinstance(target, (ast.Tuple, ast.List)):
+            for elt in target.elts:
+                if not self._VisitTarget(elt, None):
+                    return False
+            return True
+
+        if isinstance(target, ast.Name):
+            if isinstance(value, ast.Call) and target.id[:1].isupper():
+                return False #Could be a test case created by a factory (its class name is not known).
+            self.names[target.id] = 1
+            if isinstance(value, ast.Name):
+                self.names[value.id] = 1
+            elif isinstance(value, ast.Attribute):
+                self.names[value.attr] = 1
+            return True
+
+        if isinstance(target, ast.Attribute):
+            return not target.attr.startswith('test')
+
+        return False #i.e.: subscript (could be changing the module namespace).
+
+
+    def _VisitClass(self, node):
+        methods = []
+        for stmt in node.body:
+            if isinstance(stmt, ast.FunctionDef) or stmt.__class__.__name__ == 'AsyncFunctionDef':
+                if stmt.name.startswith('test'):
+                    methods.append(stmt.name)
+            elif isinstance(stmt, ast.Assign):
+                for target in stmt.targets:
+                    if isinstance(target, ast.Name) and target.id.startswith('test'):
+                        methods.append(target.id)
+
+        if getattr(node, 'decorator_list', None):
+            methods = None #A decorator could change the test methods.
+
+        for base in node.bases:
+            if methods is None:
+                break
+            if isinstance(base, ast.Name):
+                base_name = base.id
+            elif isinstance(base, ast.Attribute):
+                base_name = base.attr
+            else:
+                methods = None
+                break
+
+            if base_name in ('object', 'TestCase'):
+                continue
+
+            if isinstance(base, ast.Name) and DictContains(self.classes, base_name):
+                base_methods = self.classes[base_name]
+                if base_methods is None:
+                    methods = None
+                else:
+                    methods.extend(base_methods)
+            else:
+                methods = None #Bases from other modules (their test methods are not known).
+
+        self.classes[node.name] = methods
+        return True
+
+
+#=======================================================================================================================
+# CouldHaveTests
+#=======================================================================================================================
+def CouldHaveTests(static_tests, tests):
+    '''
+    @param static_tests: the tests found by StaticTestsFinder (may be None).
+
+    @param tests: list(str)
+        The tests requested (i.e.: Class or Class.test_method).
+
+    @return: bool
+        False only if the module surely doesn't have any of the given tests.
+    '''
+    if static_tests is None:
+        return True
+
+    classes = static_tests['classes']
+    names = static_tests['names']
+    for t in tests:
+        splitted = t.split('.')
+        class_name = splitted[0]
+        if class_name in names:
+            return True
+
+        if DictContains(classes, class_name):
+            methods = classes[class_name]
+            if len(splitted) != 2 or methods is None or splitted[1] in methods:
+                return True
+    return False
+
+
+#=======================================================================================================================
+# DiscoveryCache
+#=======================================================================================================================
+class DiscoveryCache:
+
+    def __init__(self, filename=None):
+        if filename is None:
+            filename = GetDiscoveryCacheFilename()
+        self.filename = filename
+
+        #directory -> tuple(mtime, gathered_at, files, sub-directories which are not links, is_package)
+        self.directories = {}
+
+        #file -> tuple(mtime, size, gathered_at, static tests)
+        self.files = {}
+
+        self.changed = False
+        self._Load()
+
+
+    def _Load(self):
+        try:
+            f = open(self.filename, 'rb')
+        except IOError:
+            return #No cache yet.
+
+        try:
+            try:
+                contents = pickle.load(f)
+                if contents.get('version') == CACHE_VERSION:
+                    self.directories = contents['directories']
+                    self.files = contents['files']
+            except:
+                pass #Just ignore an invalid cache.
+        finally:
+            f.close()
+
+
+    def Save(self):
+        '''
+        Saves the cache (if it changed -- the contents of the file are replaced only after all was written).
+        '''
+        if not self.changed:
+            return
+
+        try:
+            tmp_filename = '%s.%s.tmp' % (self.filename, os.getpid())
+            f = open(tmp_filename, 'wb')
+            try:
+                pickle.dump({'version': CACHE_VERSION, 'directories': self.directories, 'files': self.files}, f, 2)
+            finally:
+                f.close()
+
+            if os.path.exists(self.filename):
+                try:
+                    os.rename(tmp_filename, self.filename)
+                except OSError:
+                    #On Windows, rename fails if the target exists.
+                    os.remove(self.filename)
+                    os.rename(tmp_filename, self.filename)
+            else:
+                os.rename(tmp_filename, self.filename)
+            self.changed = False
+        except:
+            sys.stderr.write('Unable to save the tests discovery cache to: %s\n' % (self.filename,))
+
+
+    def ListDirectory(self, directory):
+        '''
+        @return: tuple(files, sub-directories which are not links, is_package) or None if it can't be listed.
+        '''
+        try:
+            mtime = os.stat(directory).st_mtime
+        except OSError:
+            return None
+
+        entry = self.directories.get(directory)
+        if entry is not None and entry[0] == mtime and mtime < entry[1] - RACY_INTERVAL:
+            return entry[2:]
+
+        gathered_at = time.time()
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return None
+
+        files = []
+        dirs = []
+        for name in names:
+            path = os.path.join(directory, name)
+            if os.path.isdir(path):
+                if not os.path.islink(path): #Just like os.walk, links to directories are not followed.
+                    dirs.append(name)
+            else:
+                files.append(name)
+
+        is_package = False
+        for init in INIT_FILES:
+            if init in files:
+                is_package = True
+                break
+
+        self.directories[directory] = (mtime, gathered_at, files, dirs, is_package)
+        self.changed = True
+        return files, dirs, is_package
+
+
+    def Walk(self, base_dir):
+        '''
+        Same as os.walk, but the directories which are not packages (don't have an __init__ file) are not entered.
+
+        @return: list(tuple(directory, files))
+        '''
+        ret = []
+        self._Walk(base_dir, True, ret)
+        return ret
+
+
+    def _Walk(self, directory, is_base_dir, ret):
+        listing = self.ListDirectory(directory)
+        if listing is None:
+            return
+
+        files, dirs, is_package = listing
+        if not is_base_dir and not is_package:
+            return
+
+        ret.append((directory, files))
+        for d in dirs:
+            self._Walk(os.path.join(directory, d), False, ret)
+
+
+    def GetStaticTests(self, filename):
+        '''
+        @return: the tests found by StaticTestsFinder in the given file (or None if they're not known).
+        '''
+        try:
+            st = os.stat(filename)
+        except OSError:
+            return None
+
+        entry = self.files.get(filename)
+        if entry is not None and entry[0] == st.st_mtime and entry[1] == st.st_size and \
+            st.st_mtime < entry[2] - RACY_INTERVAL:
+            return entry[3]
+
+        gathered_at = time.time()
+        try:
+            f = open(filename, 'rb')
+            try:
+                source = f.read()
+            finally:
+                f.close()
+        except IOError:
+            return None
+
+        static_tests = StaticTestsFinder().Find(source, filename)
+        self.files[filename] = (st.st_mtime, st.st_size, gathered_at, static_tests)
+        self.changed = True
+        return static_tests
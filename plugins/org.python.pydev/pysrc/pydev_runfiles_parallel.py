@@ -21,16 +21,280 @@ def FlattenTestSuite(test_suite, ret):
         ret.append(test_suite)
 
 
+#=======================================================================================================================
+# GetTestId
+#=======================================================================================================================
+def GetTestId(test_case):
+    '''
+    @return: str
+        The id of the test case in the format: filename|Test.testName
+    '''
+    try:
+        test_name = test_case.__class__.__name__+"."+test_case._testMethodName
+    except AttributeError:
+        #Support for jython 2.1 (__testMethodName is pseudo-private in the test case)
+        test_name = test_case.__class__.__name__+"."+test_case._TestCase__testMethodName
+
+    return test_case.__pydev_pyfile__+'|'+test_name
+
+
+#=======================================================================================================================
+# GetDurationsFilename
+#=======================================================================================================================
+def GetDurationsFilename():
+    '''
+    @return: str
+        The file with the history of the durations of the tests (may be changed through the
+        PYDEV_RUNFILES_DURATIONS_FILE environment variable).
+    '''
+    filename = os.environ.get('PYDEV_RUNFILES_DURATIONS_FILE')
+    if not filename:
+        filename = os.path.join(os.path.expanduser('~'), '.pydev_runfiles_durations')
+    return filename
+
+
+#Duration used for a test which doesn't have any history (nor any other test in its module).
+DEFAULT_TEST_DURATION = 0.1
+
+#With split == 'auto', the batches are created so that each job receives about this number of batches (so that the jobs
+#which finish first may still get the remaining small batches).
+AUTO_BATCHES_PER_JOB = 4
+
+
+#=======================================================================================================================
+# TestDurations
+#=======================================================================================================================
+class TestDurations:
+    '''
+    History with the durations of the tests (filename|Test.testName -> seconds).
+
+    The file has a line for each test with: seconds<tab>filename|Test.testName
+    '''
+
+    def __init__(self, filename=None):
+        if filename is None:
+            filename = GetDurationsFilename()
+        self.filename = filename
+        self.durations = {}
+        self.lock = _pydev_thread.allocate_lock() #Durations are added from the threads serving each job.
+        self._Load()
+
+
+    def _Load(self):
+        try:
+            f = open(self.filename, 'r')
+        except IOError:
+            return #No history yet.
+
+        try:
+            for line in f.readlines():
+                splitted = line.rstrip('\r\n').split('\t', 1)
+                if len(splitted) == 2:
+                    try:
+                        self.durations[splitted[1]] = float(splitted[0])
+                    except ValueError:
+                        pass #Just ignore an invalid line.
+        finally:
+            f.close()
+
+
+    def AddDuration(self, test_id, duration):
+        try:
+            duration = float(duration)
+        except (TypeError, ValueError):
+            return
+
+        self.lock.acquire()
+        try:
+            self.durations[test_id] = duration
+        finally:
+            self.lock.release()
+
+
+    def GetDuration(self, test_id):
+        '''
+        @return: float or None (if there's no history for the given test)
+        '''
+        return self.durations.get(test_id)
+
+
+    def EstimateDurations(self, test_ids):
+        '''
+        @return: list(float)
+            The estimated duration of each test: its duration in the history or, if it's not there, the mean
+            duration of the tests in the same module (or DEFAULT_TEST_DURATION if there's no history for the module).
+        '''
+        ret = []
+        unknown_files = {}
+        for test_id in test_ids:
+            duration = self.durations.get(test_id)
+            if duration is None:
+                unknown_files[test_id.split('|')[0]] = None
+            ret.append(duration)
+
+        if unknown_files:
+            file_to_durations = {}
+            for test_id, duration in self.durations.items():
+                filename = test_id.split('|')[0]
+                if filename in unknown_files:
+                    file_to_durations.setdefault(filename, []).append(duration)
+
+            for i, test_id in enumerate(test_ids):
+                if ret[i] is None:
+                    durations = file_to_durations.get(test_id.split('|')[0])
+                    if durations:
+                        ret[i] = sum(durations) / len(durations)
+                    else:
+                        ret[i] = DEFAULT_TEST_DURATION
+        return ret
+
+
+    def Save(self):
+        '''
+        Saves the history (the contents of the file are replaced only after all was written).
+        '''
+        self.lock.acquire()
+        try:
+            lines = []
+            for test_id, duration in self.durations.items():
+                lines.append('%s\t%s\n' % (duration, test_id))
+        finally:
+            self.lock.release()
+
+        try:
+            tmp_filename = '%s.%s.tmp' % (self.filename, os.getpid())
+            f = open(tmp_filename, 'w')
+            try:
+                f.writelines(lines)
+            finally:
+                f.close()
+
+            if os.path.exists(self.filename):
+                try:
+                    os.rename(tmp_filename, self.filename)
+                except OSError:
+                    #On Windows, rename fails if the target exists.
+                    os.remove(self.filename)
+                    os.rename(tmp_filename, self.filename)
+            else:
+                os.rename(tmp_filename, self.filename)
+        except:
+            sys.stderr.write('Unable to save the durations of the tests to: %s\n' % (self.filename,))
+
+
+#=======================================================================================================================
+# CreateBatches
+#=======================================================================================================================
+def CreateBatches(test_ids, jobs, split, durations):
+    '''
+    @param test_ids: list(str)
+        The tests to be run (in the format: filename|Test.testName)
+
+    @param split: str
+        'module', 'tests' or 'auto' (see ExecuteTestsInParallel)
+
+    @param durations: TestDurations
+        The history used to estimate the duration of the batches.
+
+    @return: list(list(str))
+        The batches with the tests to be run together, longest batch first (the batches are given in this order to
+        the first job requesting tests, so, the small batches remaining at the end go to the jobs that finish first).
+    '''
+    estimates = durations.EstimateDurations(test_ids)
+
+    if split == 'tests':
+        batches = []
+        for test_id, estimate in zip(test_ids, estimates):
+            batches.append((estimate, [test_id]))
+
+    else:
+        module_to_tests = {}
+        module_order = []
+        for test_id, estimate in zip(test_ids, estimates):
+            filename = test_id.split('|')[0]
+            if filename not in module_to_tests:
+                module_to_tests[filename] = []
+                module_order.append(filename)
+            module_to_tests[filename].append((estimate, test_id))
+
+        if split == 'module':
+            batches = []
+            for filename in module_order:
+                tests = module_to_tests[filename]
+                batches.append((sum([estimate for estimate, _test_id in tests]), [test_id for _estimate, test_id in tests]))
+
+        elif split == 'auto':
+            batches = _CreateAutoBatches(module_order, module_to_tests, sum(estimates), jobs)
+
+        else:
+            raise AssertionError('Do not know how to handle: %s' % (split,))
+
+    #Longest first (stable, so, without any history, the tests are run in the order they were found).
+    batches.sort(key=lambda batch: batch[0], reverse=True)
+    return [tests for _duration, tests in batches]
+
+
+def _CreateAutoBatches(module_order, module_to_tests, total_duration, jobs):
+    '''
+    Creates batches with about the same duration: modules which take longer are split and small modules are joined
+    (the tests from a module are kept together when possible as there's some overhead to run the tests of a module
+    in a job -- i.e.: importing the module).
+    '''
+    target = total_duration / max(1, jobs * AUTO_BATCHES_PER_JOB)
+
+    batches = []
+    small_modules = []
+    for filename in module_order:
+        tests = module_to_tests[filename]
+        module_duration = sum([estimate for estimate, _test_id in tests])
+        if module_duration <= target:
+            small_modules.append((module_duration, [test_id for _estimate, test_id in tests]))
+            continue
+
+        tests = tests[:]
+        tests.sort(key=lambda test: test[0], reverse=True)
+        _AddToBatches(batches, tests, target)
+
+    small_modules.sort(key=lambda module: module[0], reverse=True)
+    _AddToBatches(batches, small_modules, target)
+    return batches
+
+
+def _AddToBatches(batches, items, target):
+    '''
+    @param items: list(tuple(duration, test_id or list(test_id)))
+        Added to new batches (each batch gets items until its duration reaches the target).
+    '''
+    curr_duration = 0
+    curr_tests = []
+    for duration, tests in items:
+        if curr_tests and curr_duration + duration > target:
+            batches.append((curr_duration, curr_tests))
+            curr_duration = 0
+            curr_tests = []
+
+        curr_duration += duration
+        if isinstance(tests, list):
+            curr_tests.extend(tests)
+        else:
+            curr_tests.append(tests)
+
+    if curr_tests:
+        batches.append((curr_duration, curr_tests))
+
+
 #=======================================================================================================================
 # ExecuteTestsInParallel
 #=======================================================================================================================
-def ExecuteTestsInParallel(tests, jobs, split, verbosity, coverage_files, coverage_include):
+def ExecuteTestsInParallel(tests, jobs, split, verbosity, coverage_files, coverage_include, zygote=False, capture='sys'):
     '''
     @param tests: list(PydevTestSuite)
         A list with the suites to be run
         
     @param split: str
-        Either 'module' or the number of tests that should be run in each batch
+        Either 'module' (each batch has all the tests of a module), 'tests' (each batch has a single test) or 'auto'
+        (batches are created based on the history of the durations of the tests). In all cases, the batches which
+        should take longer are run first.
         
     @param coverage_files: list(file)
         A list with the files that should be used for giving coverage information (if empty, coverage information 
@@ -38,6 +302,13 @@ def ExecuteTestsInParallel(tests, jobs, split, verbosity, coverage_files, covera
         
     @param coverage_include: str
         The pattern that should be included in the coverage.
+
+    @param zygote: bool
+        If True, a single process imports the test modules and is then forked for each job (only used if os.fork is
+        available and the coverage is not being gathered).
+
+    @param capture: str
+        How the output of the tests is captured in the jobs ('sys' or 'fd' -- see pydev_runfiles_unittest).
         
     @return: bool
         Returns True if the tests were actually executed in parallel. If the tests were not executed because only 1
@@ -53,55 +324,23 @@ def ExecuteTestsInParallel(tests, jobs, split, verbosity, coverage_files, covera
     except:
         pass #Ignore any error here.
     
-    #This queue will receive the tests to be run. Each entry in a queue is a list with the tests to be run together When
-    #split == 'tests', each list will have a single element, when split == 'module', each list will have all the tests
-    #from a given module.
-    tests_queue = []
-    
-    queue_elements = []
-    if split == 'module':
-        module_to_tests = {}
-        for test in tests:
-            lst = []
-            FlattenTestSuite(test, lst)
-            for test in lst:
-                key = (test.__pydev_pyfile__, test.__pydev_module_name__)
-                module_to_tests.setdefault(key, []).append(test)
-        
-        for key, tests in module_to_tests.items():
-            queue_elements.append(tests)
-            
-        if len(queue_elements) < jobs:
-            #Don't create jobs we will never use.
-            jobs = len(queue_elements)
-    
-    elif split == 'tests':
-        for test in tests:
-            lst = []
-            FlattenTestSuite(test, lst)
-            for test in lst:
-                queue_elements.append([test])
-                
-        if len(queue_elements) < jobs:
-            #Don't create jobs we will never use.
-            jobs = len(queue_elements)
-    
-    else:
-        raise AssertionError('Do not know how to handle: %s' % (split,))
-    
-    for test_cases in queue_elements:
-        test_queue_elements = []
-        for test_case in test_cases:
-            try:
-                test_name = test_case.__class__.__name__+"."+test_case._testMethodName
-            except AttributeError:
-                #Support for jython 2.1 (__testMethodName is pseudo-private in the test case)
-                test_name = test_case.__class__.__name__+"."+test_case._TestCase__testMethodName
+    test_ids = []
+    for test in tests:
+        lst = []
+        FlattenTestSuite(test, lst)
+        for test_case in lst:
+            test_ids.append(GetTestId(test_case))
+
+    #Each entry in the queue is a list with the tests to be run together. When split == 'tests', each list will have a
+    #single element, when split == 'module', each list will have all the tests from a given module and when
+    #split == 'auto', each list will have tests which should take about the same time (based on the history).
+    durations = TestDurations()
+    tests_queue = CreateBatches(test_ids, jobs, split, durations)
+
+    if len(tests_queue) < jobs:
+        #Don't create jobs we will never use.
+        jobs = len(tests_queue)
 
-            test_queue_elements.append(test_case.__pydev_pyfile__+'|'+test_name)
-        
-        tests_queue.append(test_queue_elements)
-        
     if jobs < 2:
         return False
         
@@ -113,19 +352,32 @@ def ExecuteTestsInParallel(tests, jobs, split, verbosity, coverage_files, covera
         queue.put(item, block=False)
 
     
+    use_zygote = zygote and not coverage_files and hasattr(os, 'fork')
+
     providers = []
     clients = []
     for i in range(jobs):
-        test_cases_provider = CommunicationThread(queue)
+        test_cases_provider = CommunicationThread(queue, durations)
         providers.append(test_cases_provider)
         
         test_cases_provider.start()
         port = test_cases_provider.port
         
-        if coverage_files:
-            clients.append(ClientThread(i, port, verbosity, coverage_files.pop(0), coverage_include))
+        if use_zygote:
+            pass #A single client is created for all the providers (below).
+        elif coverage_files:
+            clients.append(ClientThread(i, port, verbosity, coverage_files.pop(0), coverage_include, capture))
         else:
-            clients.append(ClientThread(i, port, verbosity))
+            clients.append(ClientThread(i, port, verbosity, capture=capture))
+
+    if use_zygote:
+        files_to_preload = []
+        for test_id in test_ids:
+            filename = test_id.split('|')[0]
+            if filename not in files_to_preload:
+                files_to_preload.append(filename)
+        providers[0].files_to_preload = files_to_preload
+        clients.append(ZygoteClientThread([provider.port for provider in providers], verbosity, capture))
         
     for client in clients:
         client.start()
@@ -142,7 +394,8 @@ def ExecuteTestsInParallel(tests, jobs, split, verbosity, coverage_files, covera
     
     for provider in providers:
         provider.shutdown()
-        
+
+    durations.Save()
     return True
     
     
@@ -152,10 +405,12 @@ def ExecuteTestsInParallel(tests, jobs, split, verbosity, coverage_files, covera
 #=======================================================================================================================
 class CommunicationThread(threading.Thread):
     
-    def __init__(self, tests_queue):
+    def __init__(self, tests_queue, durations=None):
         threading.Thread.__init__(self)
         self.setDaemon(True)
         self.queue = tests_queue
+        self.durations = durations
+        self.files_to_preload = []
         self.finished = False
         from pydev_imports import SimpleXMLRPCServer
         
@@ -181,11 +436,17 @@ class CommunicationThread(threading.Thread):
         import pydev_localhost
         server = SimpleXMLRPCServer((pydev_localhost.get_localhost(), 0), logRequests=False)
         server.register_function(self.GetTestsToRun)
+        server.register_function(self.GetFilesToPreload)
         server.register_function(self.notifyStartTest)
         server.register_function(self.notifyTest)
         server.register_function(self.notifyCommands)
+        server.register_function(self.GetNotificationsPort)
         self.port = server.socket.getsockname()[1]
         self.server = server
+
+        #The job sends the notifications through a persistent socket (see pydev_runfiles_stream) if it's able to
+        #connect to the port returned by GetNotificationsPort (otherwise, notifyCommands is still used).
+        self.notifications_receiver = None
         
         
     def GetTestsToRun(self, job_id):
@@ -203,6 +464,32 @@ class CommunicationThread(threading.Thread):
             return []
 
 
+    def GetFilesToPreload(self):
+        '''
+        @return: list(str)
+            The files with the tests to be run (imported by the zygote before creating the jobs).
+        '''
+        return self.files_to_preload
+
+
+    def GetNotificationsPort(self):
+        '''
+        @return: int
+            The port where the notifications of the job may be sent (see pydev_runfiles_stream).
+        '''
+        if self.notifications_receiver is None:
+            #Only created when requested (a job which doesn't ask for it doesn't leave a listening socket behind).
+            import pydev_runfiles_stream
+            self.notifications_receiver = pydev_runfiles_stream.NotificationsReceiver(self._OnNotification)
+            self.notifications_receiver.start()
+        return self.notifications_receiver.port
+
+
+    def _OnNotification(self, method, args):
+        if method in ('notifyStartTest', 'notifyTest'):
+            getattr(self, method)(None, *args)
+
+
     def notifyCommands(self, job_id, commands):
         #Batch notification.
         for command in commands:
@@ -217,9 +504,16 @@ class CommunicationThread(threading.Thread):
     
     def notifyTest(self, job_id, *args, **kwargs):
         pydev_runfiles_xml_rpc.notifyTest(*args, **kwargs)
+        if self.durations is not None and len(args) == 6:
+            _cond, _captured_output, _error_contents, file, test, elapsed = args
+            self.durations.AddDuration(file+'|'+test, elapsed)
         return True
     
     def shutdown(self):
+        if self.notifications_receiver is not None:
+            #The job already exited, so, wait for the notifications which are still pending to be read.
+            self.notifications_receiver.close(5)
+
         if hasattr(self.server, 'shutdown'):
             self.server.shutdown()
         else:
@@ -227,7 +521,7 @@ class CommunicationThread(threading.Thread):
     
     def run(self):
         if hasattr(self.server, 'shutdown'):
-            self.server.serve_forever()
+            self.server.serve_forever(0.05) #Small poll interval as the shutdown waits for it.
         else:
             self._shutdown = False
             while not self._shutdown:
@@ -240,7 +534,7 @@ class CommunicationThread(threading.Thread):
 #=======================================================================================================================
 class ClientThread(threading.Thread):
     
-    def __init__(self, job_id, port, verbosity, coverage_output_file=None, coverage_include=None):
+    def __init__(self, job_id, port, verbosity, coverage_output_file=None, coverage_include=None, capture='sys'):
         threading.Thread.__init__(self)
         self.setDaemon(True)
         self.port = port
@@ -249,36 +543,44 @@ class ClientThread(threading.Thread):
         self.finished = False
         self.coverage_output_file = coverage_output_file
         self.coverage_include = coverage_include
+        self.capture = capture
 
 
     def _reader_thread(self, pipe, target):
         while True:
             target.write(pipe.read(1))
-            
+
+
+    def _GetArgs(self):
+        import pydev_runfiles_parallel_client
+        #TODO: Support Jython:
+        #
+        #For jython, instead of using sys.executable, we should use:
+        #r'D:\bin\jdk_1_5_09\bin\java.exe',
+        #'-classpath',
+        #'D:/bin/jython-2.2.1/jython.jar',
+        #'org.python.util.jython',
+
+        args = [
+            sys.executable,
+            pydev_runfiles_parallel_client.__file__,
+            str(self.job_id),
+            str(self.port),
+            str(self.verbosity),
+        ]
+
+        if self.coverage_output_file and self.coverage_include:
+            args.append(self.coverage_output_file)
+            args.append(self.coverage_include)
+
+        if self.capture != 'sys':
+            args.append('--capture=%s' % (self.capture,))
+        return args
+
         
     def run(self):
         try:
-            import pydev_runfiles_parallel_client
-            #TODO: Support Jython:
-            #
-            #For jython, instead of using sys.executable, we should use:
-            #r'D:\bin\jdk_1_5_09\bin\java.exe',
-            #'-classpath',
-            #'D:/bin/jython-2.2.1/jython.jar',
-            #'org.python.util.jython',
-                
-            args = [
-                sys.executable, 
-                pydev_runfiles_parallel_client.__file__, 
-                str(self.job_id), 
-                str(self.port), 
-                str(self.verbosity), 
-            ]
-            
-            if self.coverage_output_file and self.coverage_include:
-                args.append(self.coverage_output_file)
-                args.append(self.coverage_include)
-            
+            args = self._GetArgs()
             import subprocess
             if False:
                 proc = subprocess.Popen(args, env=os.environ, shell=False, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
@@ -293,3 +595,33 @@ class ClientThread(threading.Thread):
         finally:
             self.finished = True
 
+
+
+#=======================================================================================================================
+# ZygoteClientThread
+#=======================================================================================================================
+class ZygoteClientThread(ClientThread):
+    '''
+    Starts a single process which imports the modules with the tests and then forks a process for each job (see
+    pydev_runfiles_parallel_client.run_zygote).
+    '''
+
+    def __init__(self, ports, verbosity, capture='sys'):
+        ClientThread.__init__(self, None, None, verbosity, capture=capture)
+        self.ports = ports
+
+
+    def _GetArgs(self):
+        import pydev_runfiles_parallel_client
+        args = [
+            sys.executable,
+            pydev_runfiles_parallel_client.__file__,
+            '--zygote',
+            str(self.verbosity),
+        ]
+        for port in self.ports:
+            args.append(str(port))
+
+        if self.capture != 'sys':
+            args.append('--capture=%s' % (self.capture,))
+        return args
@@ -36,11 +36,11 @@ class ServerComm(threading.Thread):
 
 
     def __init__(self, job_id, server):
-        self.notifications_queue = Queue()
+        import pydev_runfiles_xml_rpc
+        self.notifications_queue = Queue(pydev_runfiles_xml_rpc.MAX_PENDING_NOTIFICATIONS)
         threading.Thread.__init__(self)
         self.setDaemon(False) #Wait for all the notifications to be passed before exiting!
         assert job_id is not None
-        assert port is not None
         self.job_id = job_id
 
         self.finished = False
@@ -106,26 +106,44 @@ class ServerFacade(object):
 
 
     def notifyStartTest(self, *args, **kwargs):
-        self.notifications_queue.put_nowait(ParallelNotification('notifyStartTest', args, kwargs))
+        self.notifications_queue.put(ParallelNotification('notifyStartTest', args, kwargs))
 
 
     def notifyTest(self, *args, **kwargs):
-        self.notifications_queue.put_nowait(ParallelNotification('notifyTest', args, kwargs))
+        self.notifications_queue.put(ParallelNotification('notifyTest', args, kwargs))
 
 
 
 #=======================================================================================================================
 # run_client
 #=======================================================================================================================
-def run_client(job_id, port, verbosity, coverage_output_file, coverage_include):
+def run_client(job_id, port, verbosity, coverage_output_file, coverage_include, modules_cache=None, capture='sys'):
+    '''
+    @param modules_cache: dict
+        The modules already imported for the test files (see pydev_runfiles.PydevTestRunner). The same cache is used
+        for all the batches of tests run by this job.
+    '''
     job_id = int(job_id)
+    if modules_cache is None:
+        modules_cache = {}
 
     import pydev_localhost
     server = xmlrpclib.Server('http://%s:%s' % (pydev_localhost.get_localhost(), port))
     server.lock = threading.Lock()
 
+    #The notifications are sent through a persistent socket if possible (falling back to xml-rpc otherwise).
+    notifications_writer = None
+    try:
+        import pydev_runfiles_stream
+        notifications_writer = pydev_runfiles_stream.ConnectNotificationsWriter(server.GetNotificationsPort())
+    except:
+        traceback.print_exc()
 
-    server_comm = ServerComm(job_id, server)
+    if notifications_writer is not None:
+        notifications_writer.lock = threading.Lock()
+        server_comm = ServerComm(job_id, notifications_writer)
+    else:
+        server_comm = ServerComm(job_id, server)
     server_comm.start()
 
     try:
@@ -176,8 +194,9 @@ def run_client(job_id, port, verbosity, coverage_output_file, coverage_include):
                     #The coverage is handled in this loop.
                     coverage_output_file=None,
                     coverage_include=None,
+                    capture=capture,
                 )
-                test_runner = pydev_runfiles.PydevTestRunner(configuration)
+                test_runner = pydev_runfiles.PydevTestRunner(configuration, modules_cache)
                 sys.stdout.flush()
                 test_runner.run_tests(handle_coverage=False)
         finally:
@@ -188,7 +207,58 @@ def run_client(job_id, port, verbosity, coverage_output_file, coverage_include):
 
     except:
         traceback.print_exc()
-    server_comm.notifications_queue.put_nowait(KillServer())
+    server_comm.notifications_queue.put(KillServer())
+    server_comm.join() #Wait for all the notifications to be passed (a forked job exits right after returning).
+    if notifications_writer is not None:
+        notifications_writer.close()
+
+
+
+#=======================================================================================================================
+# run_zygote
+#=======================================================================================================================
+def run_zygote(verbosity, ports, capture='sys'):
+    '''
+    Imports the modules with the tests to be run and then forks a process for each job (each port is the port of
+    the job with the same index), so, the jobs start with the modules -- and their dependencies -- already imported.
+    '''
+    import pydev_localhost
+    import pydev_runfiles
+    import pydev_runfiles_xml_rpc
+
+    server = xmlrpclib.Server('http://%s:%s' % (pydev_localhost.get_localhost(), ports[0]))
+    files_to_tests = {}
+    for filename in server.GetFilesToPreload():
+        files_to_tests[filename] = []
+
+    #Errors importing some module are not reported here (the module is not cached, so, the job which runs its tests
+    #will try to import it again and will report the error).
+    pydev_runfiles_xml_rpc.SetServer(Null())
+    modules_cache = {}
+    if files_to_tests:
+        configuration = pydev_runfiles.Configuration('', verbosity, None, None, None, files_to_tests, 1, None)
+        test_runner = pydev_runfiles.PydevTestRunner(configuration, modules_cache)
+        try:
+            test_runner.find_modules_from_files(test_runner.find_import_files())
+        except:
+            traceback.print_exc()
+
+    pids = []
+    for job_id, port in enumerate(ports):
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_client(job_id, port, verbosity, None, None, modules_cache, capture)
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(0)
+        pids.append(pid)
+
+    for pid in pids:
+        os.waitpid(pid, 0)
 
 
 
@@ -196,6 +266,18 @@ def run_client(job_id, port, verbosity, coverage_output_file, coverage_include):
 # main
 #=======================================================================================================================
 if __name__ == '__main__':
+    capture = 'sys'
+    for arg in sys.argv[1:]:
+        if arg.startswith('--capture='):
+            capture = arg[len('--capture='):]
+            sys.argv.remove(arg)
+
+    if len(sys.argv) > 1 and sys.argv[1] == '--zygote':
+        verbosity = int(sys.argv[2])
+        ports = [int(port) for port in sys.argv[3:]]
+        run_zygote(verbosity, ports, capture)
+        sys.exit(0)
+
     if len(sys.argv) -1 == 3:
         job_id, port, verbosity = sys.argv[1:]
         coverage_output_file, coverage_include = None, None
@@ -209,6 +291,6 @@ if __name__ == '__main__':
     job_id = int(job_id)
     port = int(port)
     verbosity = int(verbosity)
-    run_client(job_id, port, verbosity, coverage_output_file, coverage_include)
+    run_client(job_id, port, verbosity, coverage_output_file, coverage_include, capture=capture)
 
 
@@ -0,0 +1,255 @@
+'''
+Persistent socket transport for the notifications of the test runner (an alternative to the xml-rpc calls done through
+pydev_runfiles_xml_rpc and pydev_runfiles_parallel_client).
+
+The notifications keep the same names and parameters (notifyStartTest, notifyTest, notifyTestsCollected, ...), but
+instead of a xml-rpc request for each batch, each notification is written to a socket which is kept open during the
+whole run as a length-prefixed message:
+
+    message: the size of the fields as an unsigned 32 bit big-endian integer, followed by the fields
+    field: a byte with the type, the size of the data as an unsigned 32 bit big-endian integer and the data
+        type 's': utf-8 encoded text
+        type 'b': binary data (what would be sent as xmlrpclib.Binary through xml-rpc)
+
+The first field of a message is the name of the notification and the others are its parameters.
+'''
+from pydevd_constants import * #@UnusedWildImport
+from _pydev_imps._pydev_socket import socket, AF_INET, SOCK_STREAM
+from pydev_imports import xmlrpclib
+from _pydev_filesystem_encoding import getfilesystemencoding
+import struct
+import traceback
+
+file_system_encoding = getfilesystemencoding()
+
+SIZE_FORMAT = '!I'
+SIZE_LEN = struct.calcsize(SIZE_FORMAT)
+FIELD_HEADER_FORMAT = '!cI'
+FIELD_HEADER_LEN = struct.calcsize(FIELD_HEADER_FORMAT)
+
+READ_BUFFER_SIZE = 64 * 1024
+
+#Notifications which may be received by a NotificationsReceiver.
+NOTIFICATIONS = ('notifyConnected', 'notifyTestsCollected', 'notifyStartTest', 'notifyTest', 'notifyTestRunFinished')
+
+if IS_PY3K:
+    EMPTY_BYTES = bytes()
+    TEXT_TYPE = 's'.encode('ascii')
+    BINARY_TYPE = 'b'.encode('ascii')
+
+else:
+    EMPTY_BYTES = ''
+    TEXT_TYPE = 's'
+    BINARY_TYPE = 'b'
+
+
+def _EncodeField(obj):
+    if isinstance(obj, xmlrpclib.Binary):
+        return BINARY_TYPE, obj.data
+
+    if IS_PY3K:
+        if isinstance(obj, bytes):
+            return BINARY_TYPE, obj
+        if not isinstance(obj, str):
+            obj = str(obj)
+        return TEXT_TYPE, obj.encode('utf-8')
+
+    if isinstance(obj, unicode):
+        return TEXT_TYPE, obj.encode('utf-8')
+    if not isinstance(obj, str):
+        return TEXT_TYPE, str(obj)
+    try:
+        return TEXT_TYPE, obj.decode(file_system_encoding).encode('utf-8')
+    except:
+        return BINARY_TYPE, obj
+
+
+#=======================================================================================================================
+# EncodeNotification
+#=======================================================================================================================
+def EncodeNotification(method, args):
+    '''
+    @return: bytes
+        The message with the given notification.
+    '''
+    parts = []
+    for obj in (method,) + tuple(args):
+        field_type, data = _EncodeField(obj)
+        parts.append(struct.pack(FIELD_HEADER_FORMAT, field_type, len(data)))
+        parts.append(data)
+    fields = EMPTY_BYTES.join(parts)
+    return struct.pack(SIZE_FORMAT, len(fields)) + fields
+
+
+#=======================================================================================================================
+# DecodeNotification
+#=======================================================================================================================
+def DecodeNotification(fields):
+    '''
+    @param fields: bytes
+        The fields of a message (without its size).
+
+    @return: tuple(method, tuple(args))
+    '''
+    ret = []
+    pos = 0
+    while pos < len(fields):
+        field_type, size = struct.unpack(FIELD_HEADER_FORMAT, fields[pos:pos + FIELD_HEADER_LEN])
+        pos += FIELD_HEADER_LEN
+        data = fields[pos:pos + size]
+        pos += size
+        if field_type == BINARY_TYPE:
+            ret.append(xmlrpclib.Binary(data))
+        else:
+            ret.append(data.decode('utf-8'))
+    return str(ret[0]), tuple(ret[1:])
+
+
+#=======================================================================================================================
+# NotificationsWriter
+#=======================================================================================================================
+class NotificationsWriter(object):
+    '''
+    Used in place of the xml-rpc server by the threads which send the notifications in batches (ServerComm): each
+    batch is sent with a single write to the socket (which blocks if the other side isn't able to keep up).
+    '''
+
+    def __init__(self, sock):
+        self.sock = sock
+
+
+    def notifyCommands(self, *job_id_and_commands):
+        '''
+        @param job_id_and_commands: the commands may be preceded by the job id (which is ignored).
+            Each command is a tuple(method, args) or tuple(method, args, kwargs) -- kwargs must be empty.
+        '''
+        commands = job_id_and_commands[-1]
+        out = []
+        for command in commands:
+            if len(command) > 2 and command[2]:
+                raise AssertionError('Keyword arguments are not supported in: %s' % (command,))
+            out.append(EncodeNotification(command[0], command[1]))
+
+        data = EMPTY_BYTES.join(out)
+        if hasattr(self.sock, 'sendall'):
+            self.sock.sendall(data)
+        else:
+            while data:
+                data = data[self.sock.send(data):]
+        return True
+
+
+    def close(self):
+        try:
+            self.sock.close()
+        except:
+            pass
+
+
+#=======================================================================================================================
+# ConnectNotificationsWriter
+#=======================================================================================================================
+def ConnectNotificationsWriter(port):
+    '''
+    @return: NotificationsWriter or None (if it was not possible to connect to the given port).
+    '''
+    import pydev_localhost
+    sock = socket(AF_INET, SOCK_STREAM)
+    try:
+        sock.connect((pydev_localhost.get_localhost(), port))
+    except:
+        sys.stderr.write('Unable to connect to the notifications port: %s\n' % (port,))
+        try:
+            sock.close()
+        except:
+            pass
+        return None
+    return NotificationsWriter(sock)
+
+
+#=======================================================================================================================
+# NotificationsReceiver
+#=======================================================================================================================
+class NotificationsReceiver(threading.Thread):
+    '''
+    Accepts a single connection and calls on_notification(method, args) for each notification received until the
+    connection is closed.
+    '''
+
+    def __init__(self, on_notification):
+        threading.Thread.__init__(self)
+        self.setDaemon(True)
+        self.on_notification = on_notification
+
+        import pydev_localhost
+        self.server_socket = socket(AF_INET, SOCK_STREAM)
+        self.server_socket.bind((pydev_localhost.get_localhost(), 0))
+        self.server_socket.listen(1)
+        self.port = self.server_socket.getsockname()[1]
+
+
+    def run(self):
+        try:
+            try:
+                sock, _addr = self.server_socket.accept()
+            finally:
+                self.server_socket.close()
+        except:
+            return #Closed without any connection.
+
+        try:
+            try:
+                self._ReadNotifications(sock)
+            except:
+                traceback.print_exc()
+        finally:
+            sock.close()
+
+
+    def _ReadNotifications(self, sock):
+        chunks = []
+        available = 0
+        message_size = None
+        while True:
+            data = sock.recv(READ_BUFFER_SIZE)
+            if not data:
+                return #Connection closed.
+
+            chunks.append(data)
+            available += len(data)
+            if message_size is None and available < SIZE_LEN:
+                continue
+
+            data = EMPTY_BYTES.join(chunks)
+            pos = 0
+            while True:
+                if message_size is None:
+                    if len(data) - pos < SIZE_LEN:
+                        break
+                    message_size = struct.unpack(SIZE_FORMAT, data[pos:pos + SIZE_LEN])[0]
+                    pos += SIZE_LEN
+
+                if len(data) - pos < message_size:
+                    break
+
+                method, args = DecodeNotification(data[pos:pos + message_size])
+                pos += message_size
+                message_size = None
+                if method in NOTIFICATIONS:
+                    self.on_notification(method, args)
+
+            data = data[pos:]
+            chunks = [data]
+            available = len(data)
+
+
+    def close(self, timeout):
+        '''
+        Waits for the notifications to be received from the client (it's expected that the client already closed the
+        connection) -- the listening socket is closed if the client never connected.
+        '''
+        self.join(timeout)
+        try:
+            self.server_socket.close()
+        except:
+            pass
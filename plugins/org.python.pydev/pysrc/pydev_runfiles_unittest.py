@@ -4,6 +4,7 @@ except:
     import unittest as python_unittest
     
 import pydev_runfiles_xml_rpc
+import pydev_runfiles_affected
 import time
 import pydevd_io
 import traceback
@@ -14,22 +15,102 @@ from pydevd_constants import * #@UnusedWildImport
 # PydevTextTestRunner
 #=======================================================================================================================
 class PydevTextTestRunner(python_unittest.TextTestRunner):
+
+    def __init__(self, *args, **kwargs):
+        #capture: 'sys' or 'fd' (see PydevTestResult)
+        self.capture = DictPop(kwargs, 'capture', 'sys')
+        python_unittest.TextTestRunner.__init__(self, *args, **kwargs)
     
     def _makeResult(self):
-        return PydevTestResult(self.stream, self.descriptions, self.verbosity)
+        return PydevTestResult(self.stream, self.descriptions, self.verbosity, self.capture)
 
 
 _PythonTextTestResult = python_unittest.TextTestRunner()._makeResult().__class__
 
+#With capture == 'fd', only the start and the end of the output of a test are kept if it's bigger than this.
+MAX_CAPTURED_OUTPUT = 1024 * 1024
+
+
+#=======================================================================================================================
+# IsFdCaptureAvailable
+#=======================================================================================================================
+def IsFdCaptureAvailable():
+    if IS_JYTHON or not hasattr(os, 'dup2'):
+        return False
+    try:
+        #The streams must write to the file descriptors redirected.
+        return sys.stdout.fileno() == 1 and sys.stderr.fileno() == 2
+    except:
+        return False
+
+
+#=======================================================================================================================
+# _FdStream
+#=======================================================================================================================
+class _FdStream:
+    '''
+    Stream used by the test result while the output is captured in the file descriptor level (writes to the original
+    stdout).
+    '''
+
+    def __init__(self, fd_capture):
+        self.fd_capture = fd_capture
+        self.encoding = getattr(sys.stdout, 'encoding', None) or 'utf-8'
+
+    def write(self, s):
+        if IS_PY3K:
+            if isinstance(s, str):
+                s = s.encode(self.encoding, 'replace')
+        elif isinstance(s, unicode):
+            s = s.encode(self.encoding, 'replace')
+        fd = self.fd_capture.saved_fds[0]
+        while s:
+            s = s[os.write(fd, s):]
+
+    def writeln(self, arg=None):
+        if arg:
+            self.write(arg)
+        self.write('\n')
+
+    def flush(self):
+        pass
+
+
 #=======================================================================================================================
 # PydevTestResult
 #=======================================================================================================================
 class PydevTestResult(_PythonTextTestResult):
+    '''
+    The output of each test is captured and passed in its notification. The capture may be:
+
+    'sys': sys.stdout and sys.stderr are replaced (the output is still shown in the console as it's written).
+
+    'fd': the stdout and stderr file descriptors are redirected to a temporary file (so, the output from C extensions
+        and child processes is also captured and writing is as fast as without any capture). The output is only
+        passed (and shown in the console after the test) for tests which don't pass -- or for all tests if the
+        verbosity is above the default (2) -- and if it's bigger than MAX_CAPTURED_OUTPUT, only its start and end
+        are kept.
+    '''
+
+    def __init__(self, stream, descriptions, verbosity, capture='sys'):
+        _PythonTextTestResult.__init__(self, stream, descriptions, verbosity)
+        self.verbosity = verbosity
+        self._fd_capture = None
+        if capture == 'fd':
+            if IsFdCaptureAvailable():
+                self._fd_capture = pydevd_io.FdCapture()
+            else:
+                sys.stderr.write('Output capture in the file descriptor level not available (using capture=sys).\n')
     
 
     def startTest(self, test):
         _PythonTextTestResult.startTest(self, test)
-        self.buf = pydevd_io.StartRedirect(keep_original_redirection=True, std='both')
+        if self._fd_capture is not None:
+            self._fd_capture.start()
+            self._original_stream = self.stream
+            self.stream = _FdStream(self._fd_capture)
+        else:
+            self.buf = pydevd_io.StartRedirect(keep_original_redirection=True, std='both')
         self.start_time = time.time()
         self._current_errors_stack = []
         self._current_failures_stack = []
@@ -43,6 +124,10 @@ class PydevTestResult(_PythonTextTestResult):
         pydev_runfiles_xml_rpc.notifyStartTest(
             test.__pydev_pyfile__, test_name)
 
+        recorder = pydev_runfiles_affected.GetRecorder()
+        if recorder is not None:
+            recorder.StartTest()
+
 
 
 
@@ -65,14 +150,23 @@ class PydevTestResult(_PythonTextTestResult):
 
     def stopTest(self, test):
         end_time = time.time()
-        pydevd_io.EndRedirect(std='both')
+        if self._fd_capture is not None:
+            captured_output = self._stopFdCapture()
+        else:
+            pydevd_io.EndRedirect(std='both')
         
         _PythonTextTestResult.stopTest(self, test)
         
-        captured_output = self.buf.getvalue()
-        del self.buf
+        if self._fd_capture is None:
+            captured_output = self.buf.getvalue()
+            del self.buf
         error_contents = ''
         test_name = self.getTestName(test)
+
+        recorder = pydev_runfiles_affected.GetRecorder()
+        if recorder is not None:
+            passed = not self._current_errors_stack and not self._current_failures_stack
+            recorder.StopTest(test.__pydev_pyfile__ + '|' + test_name, test.__pydev_pyfile__, passed)
             
         
         diff_time = '%.2f' % (end_time - self.start_time)
@@ -80,9 +174,42 @@ class PydevTestResult(_PythonTextTestResult):
             pydev_runfiles_xml_rpc.notifyTest(
                 'ok', captured_output, error_contents, test.__pydev_pyfile__, test_name, diff_time)
         else:
-            self._reportErrors(self._current_errors_stack, self._current_failures_stack, captured_output, test_name)
+            self._reportErrors(
+                self._current_errors_stack, self._current_failures_stack, captured_output, test_name, diff_time)
             
             
+    def _stopFdCapture(self):
+        fd_capture = self._fd_capture
+        self.stream = self._original_stream
+        del self._original_stream
+
+        fd_capture.stop()
+        if self.verbosity <= 2 and not self._current_errors_stack and not self._current_failures_stack:
+            return '' #Only passed lazily for tests which don't pass.
+
+        captured_output = fd_capture.getvalue(MAX_CAPTURED_OUTPUT)
+        if captured_output:
+            #Show it in the console (as it was not shown while the test ran).
+            try:
+                self.stream.flush()
+            except:
+                pass
+            output = captured_output
+            while output:
+                output = output[os.write(1, output):]
+
+            if IS_PY3K:
+                captured_output = captured_output.decode(getattr(sys.stdout, 'encoding', None) or 'utf-8', 'replace')
+        return captured_output
+
+
+    def stopTestRun(self):
+        _PythonTextTestResult.stopTestRun(self)
+        if self._fd_capture is not None:
+            self._fd_capture.close()
+            self._fd_capture = None
+
+
     def _reportErrors(self, errors, failures, captured_output, test_name, diff_time=''):
         error_contents = []
         for test, s in errors+failures:
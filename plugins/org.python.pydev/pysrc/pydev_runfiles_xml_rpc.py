@@ -15,6 +15,10 @@ warnings.filterwarnings(
 
 file_system_encoding = getfilesystemencoding()
 
+#Maximum number of notifications waiting to be sent (when reached, the tests block until the notifications are sent, so
+#that a slow consumer doesn't make the pending notifications -- with the captured output -- grow unbounded).
+MAX_PENDING_NOTIFICATIONS = 1000
+
 #=======================================================================================================================
 # _ServerHolder
 #=======================================================================================================================
@@ -65,18 +69,18 @@ class ServerFacade(object):
 
 
     def notifyTestsCollected(self, *args):
-        self.notifications_queue.put_nowait(ParallelNotification('notifyTestsCollected', args))
+        self.notifications_queue.put(ParallelNotification('notifyTestsCollected', args))
 
     def notifyConnected(self, *args):
-        self.notifications_queue.put_nowait(ParallelNotification('notifyConnected', args))
+        self.notifications_queue.put(ParallelNotification('notifyConnected', args))
 
 
     def notifyTestRunFinished(self, *args):
-        self.notifications_queue.put_nowait(ParallelNotification('notifyTestRunFinished', args))
+        self.notifications_queue.put(ParallelNotification('notifyTestRunFinished', args))
 
 
     def notifyStartTest(self, *args):
-        self.notifications_queue.put_nowait(ParallelNotification('notifyStartTest', args))
+        self.notifications_queue.put(ParallelNotification('notifyStartTest', args))
 
 
     def notifyTest(self, *args):
@@ -84,7 +88,7 @@ class ServerFacade(object):
         for arg in args:
             new_args.append(_encode_if_needed(arg))
         args = tuple(new_args)
-        self.notifications_queue.put_nowait(ParallelNotification('notifyTest', args))
+        self.notifications_queue.put(ParallelNotification('notifyTest', args))
 
 
 
@@ -97,7 +101,7 @@ class ServerComm(threading.Thread):
 
 
 
-    def __init__(self, notifications_queue, port, daemon=False):
+    def __init__(self, notifications_queue, port, daemon=False, stream_port=None):
         threading.Thread.__init__(self)
         self.setDaemon(daemon) # If False, wait for all the notifications to be passed before exiting!
         self.finished = False
@@ -121,8 +125,15 @@ class ServerComm(threading.Thread):
             # ISO-8859-1 is good enough.
             encoding = "ISO-8859-1"
 
-        self.server = xmlrpclib.Server('http://%s:%s' % (pydev_localhost.get_localhost(), port),
-                                       encoding=encoding)
+        self.server = None
+        if stream_port is not None:
+            #If the connection to the stream port fails (i.e.: not supported in the IDE), fall back to xml-rpc.
+            import pydev_runfiles_stream
+            self.server = pydev_runfiles_stream.ConnectNotificationsWriter(stream_port)
+
+        if self.server is None:
+            self.server = xmlrpclib.Server('http://%s:%s' % (pydev_localhost.get_localhost(), port),
+                                           encoding=encoding)
 
 
     def run(self):
@@ -163,12 +174,17 @@ class ServerComm(threading.Thread):
 #=======================================================================================================================
 # InitializeServer
 #=======================================================================================================================
-def InitializeServer(port, daemon=False):
+def InitializeServer(port, daemon=False, stream_port=None):
+    '''
+    @param stream_port: int
+        If given, the notifications are sent through a persistent socket connected to this port (see
+        pydev_runfiles_stream) -- xml-rpc requests to the given port are still used if it's not possible to connect.
+    '''
     if _ServerHolder.SERVER is None:
         if port is not None:
-            notifications_queue = Queue()
+            notifications_queue = Queue(MAX_PENDING_NOTIFICATIONS)
             _ServerHolder.SERVER = ServerFacade(notifications_queue)
-            _ServerHolder.SERVER_COMM = ServerComm(notifications_queue, port, daemon)
+            _ServerHolder.SERVER_COMM = ServerComm(notifications_queue, port, daemon, stream_port)
             _ServerHolder.SERVER_COMM.start()
         else:
             #Create a null server, so that we keep the interface even without any connection.
@@ -278,4 +294,4 @@ def notifyTestRunFinished(total_time):
 # forceServerKill
 #=======================================================================================================================
 def forceServerKill():
-    _ServerHolder.SERVER_COMM.notifications_queue.put_nowait(KillServer())
+    _ServerHolder.SERVER_COMM.notifications_queue.put(KillServer())
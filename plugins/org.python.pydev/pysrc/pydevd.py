@@ -29,6 +29,8 @@ from pydevd_comm import  CMD_CHANGE_VARIABLE, \
                          CMD_STEP_OVER, \
                          CMD_STEP_RETURN, \
                          CMD_STEP_INTO_MY_CODE, \
+                         CMD_GET_REFERRERS, \
+                         InternalGetReferrers, \
                          CMD_THREAD_KILL, \
                          CMD_THREAD_RUN, \
                          CMD_THREAD_SUSPEND, \
@@ -76,7 +78,10 @@ from pydevd_comm import  CMD_CHANGE_VARIABLE, \
                          InternalRunCustomOperation, \
                          CMD_EVALUATE_CONSOLE_EXPRESSION, \
                          InternalEvaluateConsoleExpression,\
-                         InternalConsoleGetCompletions
+                         InternalConsoleGetCompletions, \
+                         PROTOCOL_QUOTED_LINE, \
+                         PROTOCOL_FRAMED, \
+                         VERSION_OPTION_TRACE_BACKEND
 
 from pydevd_file_utils import NormFileToServer, GetFilenameAndBase
 import pydevd_file_utils
@@ -109,6 +114,13 @@ else:
 threadingEnumerate = threading.enumerate
 threadingCurrentThread = threading.currentThread
 
+# Keeps the (thread, additionalInfo) of the current thread so that PyDB.trace_dispatch doesn't need to get them from
+# threading at each new frame (may not be available in old Jython versions, in which case they're always gotten).
+try:
+    _thread_local_info = threading.local()
+except:
+    _thread_local_info = None
+
 try:
     'dummy'.encode('utf-8') # Added because otherwise Jython 2.2.1 wasn't finding the encoding (if it wasn't loaded in the main thread).
 except:
@@ -185,6 +197,15 @@ bufferStdOutToServer = False
 bufferStdErrToServer = False
 remote = False
 
+# A suspended thread is woken up by an event when some command is posted to it, so, the timeout is just a safety net
+# (i.e.: for a state change which doesn't go through postInternalCommand or FinishDebuggingSession).
+# Note that before Python 3.2 Event.wait(timeout) polls (sleeping up to 50ms at each step), which is still much
+# better than never waking up if some wake-up is missed.
+if sys.version_info >= (3, 2):
+    SUSPEND_EVENT_TIMEOUT = 1.
+else:
+    SUSPEND_EVENT_TIMEOUT = .5
+
 from _pydev_filesystem_encoding import getfilesystemencoding
 file_system_encoding = getfilesystemencoding()
 
@@ -234,6 +255,7 @@ class PyDBCommandThread(PyDBDaemonThread):
         try:
             while not self.killReceived:
                 try:
+                    self.pyDb.updateThreadsAlive()
                     self.pyDb.processInternalCommands()
                 except:
                     PydevdLog(0, 'Finishing debug communication...(2)')
@@ -283,6 +305,9 @@ class CheckOutputThread(PyDBDaemonThread):
 
         while not self.killReceived:
             time.sleep(0.3)
+            if self.pyDb.signature_factory is not None:
+                self.pyDb.signature_factory.flush(self.pyDb)
+
             if not self.pyDb.haveAliveThreads() and self.pyDb.writer.empty() \
                     and not has_data_to_redirect():
                 try:
@@ -335,6 +360,10 @@ class PyDB:
         self.file_to_id_to_line_breakpoint = {}
         self.file_to_id_to_plugin_breakpoint = {}
 
+        # file -> BreakpointsCodeIndex (created along with the line breakpoints for the file and lazily filled
+        # in the tracing to know which code objects may hit some breakpoint).
+        self.file_to_breakpoints_code_index = {}
+
         # Note: breakpoints dict should not be mutated: a copy should be created
         # and later it should be assigned back (to prevent concurrency issues).
         self.break_on_uncaught_exceptions = {}
@@ -345,6 +374,10 @@ class PyDB:
         self._lock_running_thread_ids = _pydev_thread.allocate_lock()
         self._py_db_command_thread_event = threading.Event()
         CustomFramesContainer._py_db_command_thread_event = self._py_db_command_thread_event
+
+        # thread id -> Event for the threads currently waiting in doWaitSuspend (the event is set to wake up
+        # the thread as soon as some internal command is posted to it).
+        self._suspended_thread_id_to_event = {}
         self._finishDebuggingSession = False
         self._terminationEventSent = False
         self.signature_factory = None
@@ -367,6 +400,10 @@ class PyDB:
         #find that thread alive anymore, we must remove it from this list and make the java side know that the thread
         #was killed.
         self._running_thread_ids = {}
+
+        #the ids of the threads whose kill was already sent to the java side but which may still be enumerated (a thread
+        #which finished right after updateThreadsAlive enumerated it must not be created again).
+        self._finished_thread_ids = {}
         self._set_breakpoints_with_id = False
 
         # This attribute holds the file-> lines which have an @IgnoreException.
@@ -424,6 +461,7 @@ class PyDB:
 
     def FinishDebuggingSession(self):
         self._finishDebuggingSession = True
+        self.notifySuspendedThread('*')
 
     def acquire(self):
         if PyDBUseLocks:
@@ -468,17 +506,34 @@ class PyDB:
 
 
     def postInternalCommand(self, int_cmd, thread_id):
-        """ if thread_id is *, post to all """
+        """ if thread_id is *, it's posted to a queue which is checked by all threads (the first one to get it
+        executes it) """
+        queue = self.getInternalQueue(thread_id)
+        queue.put(int_cmd)
+
+        if not self.notifySuspendedThread(thread_id):
+            # The thread is running (so, it'll only process it later on): let the command thread handle it
+            # right away if possible.
+            self._py_db_command_thread_event.set()
+
+    def notifySuspendedThread(self, thread_id):
+        """ wakes up the given thread if it's waiting in doWaitSuspend (if thread_id is *, wakes up all).
+        @return: True if some thread was notified and False otherwise.
+        """
         if thread_id == "*":
-            threads = threadingEnumerate()
-            for t in threads:
-                thread_id = GetThreadId(t)
-                queue = self.getInternalQueue(thread_id)
-                queue.put(int_cmd)
+            events = DictValues(self._suspended_thread_id_to_event)
+            for event in events:
+                event.set()
+            return len(events) > 0
 
-        else:
-            queue = self.getInternalQueue(thread_id)
-            queue.put(int_cmd)
+        if thread_id.startswith('__frame__'):
+            thread_id = thread_id[thread_id.rfind('|') + 1:]
+
+        event = self._suspended_thread_id_to_event.get(thread_id)
+        if event is None:
+            return False
+        event.set()
+        return True
 
     def checkOutputRedirect(self):
         global bufferStdOutToServer
@@ -539,94 +594,135 @@ class PyDB:
 
 
     def processInternalCommands(self):
-        '''This function processes internal commands
+        '''This function processes the internal commands posted to the current thread (and the ones which may be
+        executed by any thread).
         '''
         self._main_lock.acquire()
         try:
 
             self.checkOutputRedirect()
 
-            curr_thread_id = GetThreadId(threadingCurrentThread())
-            program_threads_alive = {}
-            all_threads = threadingEnumerate()
-            program_threads_dead = []
-            self._lock_running_thread_ids.acquire()
-            try:
-                for t in all_threads:
-                    thread_id = GetThreadId(t)
+            curr_thread = threadingCurrentThread()
+            self.notifyThreadCreated(curr_thread)
+            curr_thread_id = GetThreadId(curr_thread)
 
-                    if getattr(t, 'is_pydev_daemon_thread', False):
-                        pass # I.e.: skip the DummyThreads created from pydev daemon threads
-                    elif isinstance(t, PyDBDaemonThread):
-                        pydev_log.error_once('Error in debugger: Found PyDBDaemonThread not marked with is_pydev_daemon_thread=True.\n')
+            # Note: commands are always posted to the queue of the thread which should execute them, so, there's no
+            # need to check the queues of other threads.
+            for queue_id in (curr_thread_id, '*'):
+                queue = self._cmd_queue.get(queue_id)
+                if queue is None:
+                    continue
 
-                    elif isThreadAlive(t):
-                        program_threads_alive[thread_id] = t
+                cmdsToReadd = []  # some commands must be processed by the thread itself... if that's the case,
+                                    # we will re-add the commands to the queue after executing.
+                try:
+                    while True:
+                        int_cmd = queue.get(False)
 
-                        if not DictContains(self._running_thread_ids, thread_id):
-                            if not hasattr(t, 'additionalInfo'):
-                                # see http://sourceforge.net/tracker/index.php?func=detail&aid=1955428&group_id=85796&atid=577329
-                                # Let's create the additional info right away!
-                                t.additionalInfo = PyDBAdditionalThreadInfo()
-                            self._running_thread_ids[thread_id] = t
-                            self.writer.addCommand(self.cmdFactory.makeThreadCreatedMessage(t))
+                        if not self.mpl_hooks_in_debug_console and isinstance(int_cmd, InternalConsoleExec):
+                            # add import hooks for matplotlib patches if only debug console was started
+                            try:
+                                self.init_matplotlib_in_debug_console()
+                                self.mpl_in_use = True
+                            except:
+                                PydevdLog(2, "Matplotlib support in debug console failed", traceback.format_exc())
+                            finally:
+                                self.mpl_hooks_in_debug_console = True
 
+                        if int_cmd.canBeExecutedBy(curr_thread_id):
+                            PydevdLog(2, "processing internal command ", str(int_cmd))
+                            int_cmd.doIt(self)
+                        else:
+                            PydevdLog(2, "NOT processing internal command ", str(int_cmd))
+                            cmdsToReadd.append(int_cmd)
 
-                        queue = self.getInternalQueue(thread_id)
-                        cmdsToReadd = []  # some commands must be processed by the thread itself... if that's the case,
-                                            # we will re-add the commands to the queue after executing.
-                        try:
-                            while True:
-                                int_cmd = queue.get(False)
-
-                                if not self.mpl_hooks_in_debug_console and isinstance(int_cmd, InternalConsoleExec):
-                                    # add import hooks for matplotlib patches if only debug console was started
-                                    try:
-                                        self.init_matplotlib_in_debug_console()
-                                        self.mpl_in_use = True
-                                    except:
-                                        PydevdLog(2, "Matplotlib support in debug console failed", traceback.format_exc())
-                                    finally:
-                                        self.mpl_hooks_in_debug_console = True
-
-                                if int_cmd.canBeExecutedBy(curr_thread_id):
-                                    PydevdLog(2, "processing internal command ", str(int_cmd))
-                                    int_cmd.doIt(self)
-                                else:
-                                    PydevdLog(2, "NOT processing internal command ", str(int_cmd))
-                                    cmdsToReadd.append(int_cmd)
 
+                except _queue.Empty: #@UndefinedVariable
+                    for int_cmd in cmdsToReadd:
+                        queue.put(int_cmd)
+                    # this is how we exit
 
-                        except _queue.Empty: #@UndefinedVariable
-                            for int_cmd in cmdsToReadd:
-                                queue.put(int_cmd)
-                            # this is how we exit
+        finally:
+            self._main_lock.release()
 
 
-                thread_ids = list(self._running_thread_ids.keys())
-                for tId in thread_ids:
-                    if not DictContains(program_threads_alive, tId):
-                        program_threads_dead.append(tId)
-            finally:
-                self._lock_running_thread_ids.release()
+    def notifyThreadCreated(self, t):
+        ''' lets the java side know about the given thread (if it still wasn't notified about it).
+        Called when a thread is traced for the first time (and from updateThreadsAlive for the threads which weren't).
+        '''
+        thread_id = GetThreadId(t)
+        if DictContains(self._running_thread_ids, thread_id):
+            return
 
-            for tId in program_threads_dead:
-                try:
-                    self.processThreadNotAlive(tId)
-                except:
-                    sys.stderr.write('Error iterating through %s (%s) - %s\n' % (
-                        program_threads_alive, program_threads_alive.__class__, dir(program_threads_alive)))
-                    raise
+        if getattr(t, 'is_pydev_daemon_thread', False) or isinstance(t, PyDBDaemonThread):
+            return # I.e.: skip the DummyThreads created from pydev daemon threads
+
+        self._lock_running_thread_ids.acquire()
+        try:
+            if DictContains(self._running_thread_ids, thread_id) or DictContains(self._finished_thread_ids, thread_id):
+                return
+
+            if not hasattr(t, 'additionalInfo'):
+                # see http://sourceforge.net/tracker/index.php?func=detail&aid=1955428&group_id=85796&atid=577329
+                # Let's create the additional info right away!
+                t.additionalInfo = PyDBAdditionalThreadInfo()
+            self._running_thread_ids[thread_id] = t
+            self.writer.addCommand(self.cmdFactory.makeThreadCreatedMessage(t))
+        finally:
+            self._lock_running_thread_ids.release()
+
+
+    def notifyCurrentThreadFinished(self):
+        ''' called by the threads started while debugging right before they finish '''
+        try:
+            t = _thread_local_info.thread_and_info[0]
+        except:
+            return # Never traced in this thread (so, the java side also doesn't know about it).
+        self.processThreadNotAlive(GetThreadId(t))
+
+
+    def updateThreadsAlive(self):
+        ''' Enumerates the threads to find the ones which weren't notified when created or finished (i.e.: threads
+        started before the tracing was set or which never executed traced code) -- called periodically by the
+        PyDBCommandThread.
+        '''
+        # Get the ones known before enumerating (a thread registered later on may not be in the enumeration).
+        self._lock_running_thread_ids.acquire()
+        try:
+            known_thread_ids = list(self._running_thread_ids.keys())
+        finally:
+            self._lock_running_thread_ids.release()
+
+        program_threads_alive = {}
+        all_threads = threadingEnumerate()
+        for t in all_threads:
+            if getattr(t, 'is_pydev_daemon_thread', False):
+                pass # I.e.: skip the DummyThreads created from pydev daemon threads
+            elif isinstance(t, PyDBDaemonThread):
+                pydev_log.error_once('Error in debugger: Found PyDBDaemonThread not marked with is_pydev_daemon_thread=True.\n')
 
+            elif isThreadAlive(t):
+                program_threads_alive[GetThreadId(t)] = t
+                self.notifyThreadCreated(t)
 
-            if len(program_threads_alive) == 0:
-                self.FinishDebuggingSession()
-                for t in all_threads:
-                    if hasattr(t, 'doKillPydevThread'):
-                        t.doKillPydevThread()
+        for tId in known_thread_ids:
+            if not DictContains(program_threads_alive, tId):
+                self.processThreadNotAlive(tId)
 
+        # The finished threads which aren't enumerated anymore can't be notified again.
+        self._lock_running_thread_ids.acquire()
+        try:
+            for tId in list(self._finished_thread_ids.keys()):
+                if not DictContains(program_threads_alive, tId):
+                    del self._finished_thread_ids[tId]
         finally:
-            self._main_lock.release()
+            self._lock_running_thread_ids.release()
+
+        if len(program_threads_alive) == 0:
+            self.FinishDebuggingSession()
+            for t in all_threads:
+                if hasattr(t, 'doKillPydevThread'):
+                    t.doKillPydevThread()
 
 
     def setTracingForUntracedContexts(self, ignore_frame=None, overwrite_prev_trace=False):
@@ -659,6 +755,13 @@ class PyDB:
         for breakpoint_id, pybreakpoint in DictIterItems(id_to_breakpoint):
             break_dict[pybreakpoint.line] = pybreakpoint
 
+        if breakpoints is self.breakpoints:
+            # Only the index for the changed file is recreated (it'll be filled again as code objects are traced).
+            if break_dict:
+                self.file_to_breakpoints_code_index[file] = BreakpointsCodeIndex(break_dict)
+            else:
+                DictPop(self.file_to_breakpoints_code_index, file, None)
+
         breakpoints[file] = break_dict
 
     def add_break_on_exception(
@@ -743,6 +846,12 @@ class PyDB:
                     # Breakpoints can be grouped by 'LINE' or by 'ID'.
                     breakpoints_by = 'LINE'
 
+                    # The protocol may be 'QUOTED' (lines with quoted contents) or 'FRAMED' (see pydevd_comm).
+                    protocol = PROTOCOL_QUOTED_LINE
+
+                    # Any field after the protocol is an option (i.e.: TRACE_BACKEND -- see pydevd_comm).
+                    options = []
+
                     splitted = text.split('\t')
                     if len(splitted) == 1:
                         _local_version = splitted
@@ -753,6 +862,13 @@ class PyDB:
                     elif len(splitted) == 3:
                         _local_version, ide_os, breakpoints_by = splitted
 
+                    elif len(splitted) == 4:
+                        _local_version, ide_os, breakpoints_by, protocol = splitted
+
+                    else:
+                        _local_version, ide_os, breakpoints_by, protocol = splitted[:4]
+                        options = splitted[4:]
+
                     if breakpoints_by == 'ID':
                         self._set_breakpoints_with_id = True
                     else:
@@ -760,7 +876,15 @@ class PyDB:
 
                     pydevd_file_utils.set_ide_os(ide_os)
 
-                    cmd = self.cmdFactory.makeVersionMessage(seq)
+                    cmd = self.cmdFactory.makeVersionMessage(seq, VERSION_OPTION_TRACE_BACKEND in options)
+
+                    if protocol == PROTOCOL_FRAMED:
+                        # The answer is still sent with the current protocol and everything after it is framed
+                        # (the reader changes it for the commands after this one).
+                        self.writer.addCommand(cmd)
+                        cmd = None
+                        self.writer.setProtocolAfterPendingCommands(PROTOCOL_FRAMED)
+                        self.reader.setProtocol(PROTOCOL_FRAMED)
 
                 elif cmd_id == CMD_LIST_THREADS:
                     # response is a list of threads
@@ -869,7 +993,14 @@ class PyDB:
                         else:
                             scope, attrs = (scopeattrs, None)
 
-                        int_cmd = InternalGetVariable(seq, thread_id, frame_id, scope, attrs)
+                        offset = 0
+                        limit = None
+                        if ':' in scope:  # the scope may be followed by :offset:limit to get only a page of the items
+                            scope, offset, limit = scope.split(':')
+                            offset = int(offset)
+                            limit = int(limit)
+
+                        int_cmd = InternalGetVariable(seq, thread_id, frame_id, scope, attrs, offset, limit)
                         self.postInternalCommand(int_cmd, thread_id)
 
                     except:
@@ -886,7 +1017,10 @@ class PyDB:
                         else:
                             scope, attrs = (scopeattrs, None)
 
-                        int_cmd = InternalGetArray(seq, roffset, coffset, rows, cols, format, thread_id, frame_id, scope, attrs)
+                        # The scope may be suffixed with ':compact' and/or ':table' (see pydevd_vars.get_array_options).
+                        scope, compact, table = pydevd_vars.get_array_options(scope)
+
+                        int_cmd = InternalGetArray(seq, roffset, coffset, rows, cols, format, thread_id, frame_id, scope, attrs, compact, table)
                         self.postInternalCommand(int_cmd, thread_id)
 
                     except:
@@ -922,11 +1056,8 @@ class PyDB:
 
                         # We must restore new lines and tabs as done in
                         # AbstractDebugTarget.breakpointAdded
-                        condition = condition.replace("@_@NEW_LINE_CHAR@_@", '\n').\
-                            replace("@_@TAB_CHAR@_@", '\t').strip()
-
-                        expression = expression.replace("@_@NEW_LINE_CHAR@_@", '\n').\
-                            replace("@_@TAB_CHAR@_@", '\t').strip()
+                        condition = unescape_breakpoint_text(condition)
+                        expression, hit_condition = parse_expression_and_hit_condition(expression)
                     else:
                         #Note: this else should be removed after PyCharm migrates to setting
                         #breakpoints by id (and ideally also provides func_name).
@@ -935,11 +1066,8 @@ class PyDB:
                         # the id to be the line.
                         breakpoint_id = line = int(line)
 
-                        condition = condition.replace("@_@NEW_LINE_CHAR@_@", '\n'). \
-                            replace("@_@TAB_CHAR@_@", '\t').strip()
-
-                        expression = expression.replace("@_@NEW_LINE_CHAR@_@", '\n'). \
-                            replace("@_@TAB_CHAR@_@", '\t').strip()
+                        condition = unescape_breakpoint_text(condition)
+                        expression, hit_condition = parse_expression_and_hit_condition(expression)
 
                     if not IS_PY3K:  # In Python 3, the frame object will have unicode for the file, whereas on python 2 it has a byte-array encoded with the filesystem encoding.
                         file = file.encode(file_system_encoding)
@@ -960,7 +1088,7 @@ class PyDB:
 
                     supported_type = False
                     if type == 'python-line':
-                        breakpoint = LineBreakpoint(line, condition, func_name, expression)
+                        breakpoint = LineBreakpoint(line, condition, func_name, expression, hit_condition)
                         breakpoints = self.breakpoints
                         file_to_id_to_breakpoint = self.file_to_id_to_line_breakpoint
                         supported_type = True
@@ -968,7 +1096,7 @@ class PyDB:
                         result = None
                         plugin = self.get_plugin_lazy_init()
                         if plugin is not None:
-                            result = plugin.add_breakpoint('add_line_breakpoint', self, type, file, line, condition, expression, func_name)
+                            result = plugin.add_breakpoint('add_line_breakpoint', self, type, file, line, condition, expression, func_name, hit_condition)
                         if result is not None:
                             supported_type = True
                             breakpoint, breakpoints = result
@@ -979,6 +1107,12 @@ class PyDB:
                     if not supported_type:
                         raise NameError(type)
 
+                    if breakpoint.errors:
+                        # The breakpoint is still added, but the user is warned right away (and not only when it's hit).
+                        msg = 'Breakpoint at %s (line %s): %s' % (file, line, '\n'.join(breakpoint.errors))
+                        sys.stderr.write('pydev debugger: %s\n' % (msg,))
+                        self.writer.addCommand(self.cmdFactory.makeErrorMessage(seq, msg))
+
                     if DebugInfoHolder.DEBUG_TRACE_BREAKPOINTS > 0:
                         pydev_log.debug('Added breakpoint:%s - line:%s - func_name:%s\n' % (file, line, func_name.encode('utf-8')))
                         sys.stderr.flush()
@@ -1295,6 +1429,18 @@ class PyDB:
                                                              style, encoded_code_or_file, fnname)
                         self.postInternalCommand(int_cmd, thread_id)
 
+                elif cmd_id == CMD_GET_REFERRERS:
+                    # the text is: referrers|path_to_root\tthread_id\tframe_id\tFRAME|GLOBAL|BY_ID\tattributes*
+                    mode, thread_id, frame_id, scopeattrs = text.split('\t', 3)
+
+                    if scopeattrs.find('\t') != -1:  # there are attributes beyond scope
+                        scope, attrs = scopeattrs.split('\t', 1)
+                    else:
+                        scope, attrs = (scopeattrs, None)
+
+                    int_cmd = InternalGetReferrers(seq, mode, thread_id, frame_id, scope, attrs)
+                    self.postInternalCommand(int_cmd, thread_id)
+
                 elif cmd_id == CMD_IGNORE_THROWN_EXCEPTION_AT:
                     if text:
                         replace = 'REPLACE:'  # Not all 3.x versions support u'REPLACE:', so, doing workaround.
@@ -1355,6 +1501,8 @@ class PyDB:
             thread = self._running_thread_ids.pop(threadId, None)
             if thread is None:
                 return
+            self._finished_thread_ids[threadId] = threadId
+            DictPop(self._cmd_queue, threadId, None)
 
             wasNotified = thread.additionalInfo.pydev_notify_kill
             if not wasNotified:
@@ -1441,6 +1589,11 @@ class PyDB:
         imported = False
         info = thread.additionalInfo
 
+        thread_id = GetThreadId(thread)
+        suspend_event = threading.Event()
+        self._suspended_thread_id_to_event[thread_id] = suspend_event
+        pydevd_vars.addSuspendedFrames(thread_id, frame)
+
         if info.pydev_state == STATE_SUSPEND and not self._finishDebuggingSession:
             # before every stop check if matplotlib modules were imported inside script code
             if len(self.mpl_modules_for_patching) > 0:
@@ -1450,21 +1603,33 @@ class PyDB:
                         activate_function()
                         self.mpl_in_use = True
 
-        while info.pydev_state == STATE_SUSPEND and not self._finishDebuggingSession:
-            if self.mpl_in_use:
-                # call input hooks if only matplotlib is in use
-                try:
-                    if not imported:
-                        from pydev_ipython.inputhook import get_inputhook
-                        imported = True
-                    inputhook = get_inputhook()
-                    if inputhook:
-                        inputhook()
-                except:
-                    pass
+        try:
+            while info.pydev_state == STATE_SUSPEND and not self._finishDebuggingSession:
+                if self.mpl_in_use:
+                    # call input hooks if only matplotlib is in use
+                    try:
+                        if not imported:
+                            from pydev_ipython.inputhook import get_inputhook
+                            imported = True
+                        inputhook = get_inputhook()
+                        if inputhook:
+                            inputhook()
+                    except:
+                        pass
 
-            self.processInternalCommands()
-            time.sleep(0.01)
+                # Clear before processing: a command posted after that will make the wait return right away.
+                suspend_event.clear()
+                self.processInternalCommands()
+
+                if info.pydev_state == STATE_SUSPEND and not self._finishDebuggingSession:
+                    if self.mpl_in_use:
+                        time.sleep(0.01)  # the input hook must still be called periodically
+                    else:
+                        suspend_event.wait(SUSPEND_EVENT_TIMEOUT)
+        finally:
+            DictPop(self._suspended_thread_id_to_event, thread_id, None)
+            pydevd_vars.removeSuspendedFrames(thread_id)
+            pydevd_vars.clear_array_meta_cache(thread_id)
 
         # process any stepping instructions
         if info.pydev_step_cmd == CMD_STEP_INTO or info.pydev_step_cmd == CMD_STEP_INTO_MY_CODE:
@@ -1589,33 +1754,37 @@ class PyDB:
                     return None
 
             try:
-                #this shouldn't give an exception, but it could happen... (python bug)
-                #see http://mail.python.org/pipermail/python-bugs-list/2007-June/038796.html
-                #and related bug: http://bugs.python.org/issue1733757
-                t = threadingCurrentThread()
+                t, additionalInfo = _thread_local_info.thread_and_info
             except:
-                frame.f_trace = self.trace_dispatch
-                return self.trace_dispatch
+                try:
+                    #this shouldn't give an exception, but it could happen... (python bug)
+                    #see http://mail.python.org/pipermail/python-bugs-list/2007-June/038796.html
+                    #and related bug: http://bugs.python.org/issue1733757
+                    t = threadingCurrentThread()
+                except:
+                    frame.f_trace = self.trace_dispatch
+                    return self.trace_dispatch
+
+                try:
+                    additionalInfo = t.additionalInfo
+                    if additionalInfo is None:
+                        raise AttributeError()
+                except:
+                    t.additionalInfo = PyDBAdditionalThreadInfo()
+                    additionalInfo = t.additionalInfo
 
-            try:
-                additionalInfo = t.additionalInfo
                 if additionalInfo is None:
-                    raise AttributeError()
-            except:
-                t.additionalInfo = PyDBAdditionalThreadInfo()
-                additionalInfo = t.additionalInfo
+                    return None
 
-            if additionalInfo is None:
-                return None
+                if _thread_local_info is not None:
+                    _thread_local_info.thread_and_info = (t, additionalInfo)
+
+                if isThreadAlive(t):
+                    # First time this thread is traced: let the java side know about it.
+                    self.notifyThreadCreated(t)
 
             if additionalInfo.is_tracing:
-                f = frame
-                while f is not None:
-                    if 'trace_dispatch' == f.f_code.co_name:
-                        _fname, bs = GetFilenameAndBase(f)
-                        if bs == 'pydevd_frame.py':
-                            return None  #we don't wan't to trace code invoked from pydevd_frame.trace_dispatch
-                    f = f.f_back
+                return None  #we don't wan't to trace code invoked from pydevd_frame.trace_dispatch
 
             # if thread is not alive, cancel trace_dispatch processing
             if not isThreadAlive(t):
@@ -1623,7 +1792,7 @@ class PyDB:
                 return None  # suspend tracing
 
             # each new frame...
-            return additionalInfo.CreateDbFrame((self, filename, additionalInfo, t, frame)).trace_dispatch(frame, event, arg)
+            return additionalInfo.GetDbFrame((self, filename, additionalInfo, t, frame)).trace_dispatch(frame, event, arg)
 
         except SystemExit:
             return None
@@ -1642,22 +1811,6 @@ class PyDB:
                 pass
             return None
 
-    if USE_PSYCO_OPTIMIZATION:
-        try:
-            import psyco
-            trace_dispatch = psyco.proxy(trace_dispatch)
-            processNetCommand = psyco.proxy(processNetCommand)
-            processInternalCommands = psyco.proxy(processInternalCommands)
-            doWaitSuspend = psyco.proxy(doWaitSuspend)
-            getInternalQueue = psyco.proxy(getInternalQueue)
-        except ImportError:
-            if hasattr(sys, 'exc_clear'):  # jython does not have it
-                sys.exc_clear()  # don't keep the traceback (let's keep it clear for when we go to the point of executing client code)
-
-            if not IS_PY3K and not IS_PY27 and not IS_64_BITS and not sys.platform.startswith("java") and not sys.platform.startswith("cli"):
-                sys.stderr.write("pydev debugger: warning: psyco not available for speedups (the debugger will still work correctly, but a bit slower)\n")
-                sys.stderr.flush()
-
 
 
     def SetTraceForFrameAndParents(self, frame, also_add_to_passed_frame=True, overwrite_prev_trace=False, dispatch_func=None):
@@ -1823,6 +1976,7 @@ def processCommandLine(argv):
     setup['multiproc'] = False #Used by PyCharm (reuses connection: ssh tunneling)
     setup['multiprocess'] = False # Used by PyDev (creates new connection to ide)
     setup['save-signatures'] = False
+    setup['signatures-file'] = ''
     setup['print-in-debugger-startup'] = False
     setup['cmd-line'] = False
     setup['module'] = False
@@ -1863,6 +2017,12 @@ def processCommandLine(argv):
         elif argv[i] == '--save-signatures':
             del argv[i]
             setup['save-signatures'] = True
+        elif argv[i] == '--signatures-file':
+            # Also write the type profile collected to the given file at exit (implies --save-signatures).
+            del argv[i]
+            setup['save-signatures'] = True
+            setup['signatures-file'] = argv[i]
+            del argv[i]
         elif argv[i] == '--print-in-debugger-startup':
             del argv[i]
             setup['print-in-debugger-startup'] = True
@@ -2330,9 +2490,8 @@ if __name__ == '__main__':
         # Run the dev_appserver
         debugger.run(setup['file'], None, None, is_module, set_trace=False)
     else:
-        # as to get here all our imports are already resolved, the psyco module can be
-        # changed and we'll still get the speedups in the debugger, as those functions
-        # are already compiled at this time.
+        # psyco is not used by the debugger, but if the program being debugged uses it, it'd break the
+        # tracing, so, it's changed for a stub.
         try:
             import psyco
         except ImportError:
@@ -2340,7 +2499,7 @@ if __name__ == '__main__':
                 sys.exc_clear()  # don't keep the traceback -- clients don't want to see it
             pass  # that's ok, no need to mock psyco if it's not available anyways
         else:
-            # if it's available, let's change it for a stub (pydev already made use of it)
+            # if it's available, let's change it for a stub
             import pydevd_psyco_stub
             sys.modules['psyco'] = pydevd_psyco_stub
 
@@ -2351,6 +2510,8 @@ if __name__ == '__main__':
                 # Only import it if we're going to use it!
                 from pydevd_signature import SignatureFactory
                 debugger.signature_factory = SignatureFactory()
+                if setup['signatures-file']:
+                    atexit.register(debugger.signature_factory.dump, setup['signatures-file'])
 
         try:
             debugger.connect(host, port)
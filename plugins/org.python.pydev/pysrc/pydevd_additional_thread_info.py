@@ -1,9 +1,12 @@
 import sys
 from pydevd_constants import * #@UnusedWildImport
 from _pydev_imps import _pydev_thread
-from pydevd_frame import PyDBFrame
+from pydevd_tracing import GetTraceBackend
 import weakref
 
+#The class which dispatches the events of each frame (may be a compiled version -- see pydevd_tracing).
+PyDBFrame = GetTraceBackend()[1]
+
 #=======================================================================================================================
 # AbstractPyDBAdditionalThreadInfo
 #=======================================================================================================================
@@ -16,7 +19,7 @@ class AbstractPyDBAdditionalThreadInfo:
         self.pydev_force_stop_at_exception = None
         self.pydev_smart_step_stop = None
         self.pydev_django_resolve_frame = None
-        self.is_tracing = False
+        self.is_tracing = 0 #Note: a counter (pydevd_frame.trace_dispatch may be reentered).
         self.conditional_breakpoint_exception = None
 
 
@@ -27,6 +30,11 @@ class AbstractPyDBAdditionalThreadInfo:
         #args = mainDebugger, filename, base, additionalInfo, t, frame
         raise NotImplementedError()
 
+    def GetDbFrame(self, args):
+        #args = mainDebugger, filename, additionalInfo, t, frame
+        #By default a new db frame is created for each frame (subclasses may reuse it).
+        return self.CreateDbFrame(args)
+
     def __str__(self):
         return 'State:%s Stop:%s Cmd: %s Kill:%s' % (self.pydev_state, self.pydev_step_stop, self.pydev_step_cmd, self.pydev_notify_kill)
 
@@ -36,6 +44,11 @@ class AbstractPyDBAdditionalThreadInfo:
 #=======================================================================================================================
 class PyDBAdditionalThreadInfoWithCurrentFramesSupport(AbstractPyDBAdditionalThreadInfo):
 
+    def __init__(self):
+        AbstractPyDBAdditionalThreadInfo.__init__(self)
+        self._code_to_db_frame = {}
+        self._db_frames_debugger = None
+
     def IterFrames(self):
         #sys._current_frames(): dictionary with thread id -> topmost frame
         return sys._current_frames().values() #return a copy... don't know if it's changed if we did get an iterator
@@ -43,6 +56,25 @@ class PyDBAdditionalThreadInfoWithCurrentFramesSupport(AbstractPyDBAdditionalThr
     #just create the db frame directly
     CreateDbFrame = PyDBFrame
 
+    def GetDbFrame(self, args):
+        #The db frame keeps no state besides its args (the debugger, the filename of the code and the thread), so,
+        #the same instance is reused for all the frames of a given code in this thread (i.e.: recursive calls don't
+        #create a new one at each call).
+        code = args[-1].f_code
+        code_to_db_frame = self._code_to_db_frame
+        if args[0] is not self._db_frames_debugger:
+            #The info is kept in the thread when the debugger is reconnected (settrace after a stoptrace), so, the db
+            #frames created for the previous debugger must not be reused.
+            code_to_db_frame.clear()
+            self._db_frames_debugger = args[0]
+        try:
+            return code_to_db_frame[code]
+        except KeyError:
+            if len(code_to_db_frame) >= MAX_DB_FRAMES_CACHED_PER_THREAD:
+                code_to_db_frame.clear() #Don't keep code objects alive forever (i.e.: code compiled dynamically).
+            db_frame = code_to_db_frame[code] = PyDBFrame(args)
+            return db_frame
+
 #=======================================================================================================================
 # PyDBAdditionalThreadInfoWithoutCurrentFramesSupport
 #=======================================================================================================================
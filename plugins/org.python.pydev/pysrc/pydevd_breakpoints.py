@@ -3,6 +3,7 @@ import pydevd_tracing
 import sys
 import pydev_log
 import pydevd_import_class
+import traceback
 
 _original_excepthook = None
 _handle_exceptions = None
@@ -44,12 +45,202 @@ class ExceptionBreakpoint:
 
 
 class LineBreakpoint(object):
-    def __init__(self, line, condition, func_name, expression):
+    def __init__(self, line, condition, func_name, expression, hit_condition=None):
         self.line = line
         self.condition = condition
         self.func_name = func_name
         self.expression = expression
 
+        #Errors found while compiling the condition/expression or parsing the hit condition (reported to the IDE
+        #when the breakpoint is set).
+        self.errors = []
+
+        #The code objects are compiled only once (if the compilation fails, the source is kept so that the error
+        #is reported again when the breakpoint is hit).
+        self.condition_code = self._compile(condition, 'condition')
+        self.expression_code = self._compile(expression, 'expression')
+
+        self.hit_condition = hit_condition
+        self.hits = 0
+        self.hit_condition_check = None
+        if hit_condition is not None:
+            try:
+                self.hit_condition_check = parse_hit_condition(hit_condition)
+            except ValueError:
+                self.errors.append('Invalid hit condition: %s (expected N, ==N, >=N, >N or %%N)' % (hit_condition,))
+
+    def _compile(self, source, kind):
+        if source is None:
+            return None
+        try:
+            return compile(source, '<breakpoint %s>' % (kind,), 'eval')
+        except:
+            error = ''.join(traceback.format_exception_only(*sys.exc_info()[:2]))
+            self.errors.append('Error compiling breakpoint %s: %s\n%s' % (kind, source, error))
+            return source
+
+    def is_hit_condition_met(self):
+        '''
+        Should be called whenever the breakpoint is reached (and its condition is satisfied): counts the hit and
+        checks whether the hit condition allows stopping at it (no eval is done for the hit condition).
+        '''
+        self.hits += 1
+        check = self.hit_condition_check
+        if check is None:
+            return True
+        op, n = check
+        hits = self.hits
+        if op == '==':
+            return hits == n
+        elif op == '>=':
+            return hits >= n
+        elif op == '>':
+            return hits > n
+        else:  # '%'
+            return hits % n == 0
+
+
+#=======================================================================================================================
+# parse_hit_condition
+#=======================================================================================================================
+def parse_hit_condition(hit_condition):
+    '''
+    :param str hit_condition:
+        One of: 'N' or '==N' (stop only at the Nth hit), '>=N' (stop at the Nth hit and after it), '>N' (stop after
+        the Nth hit) or '%N' (stop at every Nth hit).
+
+    :return tuple(str, int):
+        The operation and the number of hits.
+
+    :raise ValueError: if the hit condition is not valid.
+    '''
+    hit_condition = hit_condition.strip()
+    for op in ('==', '>=', '>', '%'):
+        if hit_condition.startswith(op):
+            n = hit_condition[len(op):]
+            break
+    else:
+        op = '=='
+        n = hit_condition
+
+    n = int(n)
+    if n < 0 or (op == '%' and n == 0):
+        raise ValueError('Invalid hit condition: %s' % (hit_condition,))
+    return op, n
+
+
+#=======================================================================================================================
+# parse_expression_and_hit_condition
+#=======================================================================================================================
+def parse_expression_and_hit_condition(text):
+    '''
+    :param str text:
+        The last field of CMD_SET_BREAK: the expression optionally followed by a tab and the hit condition (with new
+        lines and tabs inside each of them escaped as done in AbstractDebugTarget.breakpointAdded).
+
+    :return tuple(str, str):
+        The unescaped expression and hit condition (None if not given).
+    '''
+    # Split before unescaping: an escaped tab belongs to the expression.
+    if '\t' in text:
+        expression, hit_condition = text.split('\t', 1)
+        hit_condition = unescape_breakpoint_text(hit_condition)
+        if len(hit_condition) <= 0 or hit_condition == "None":
+            hit_condition = None
+    else:
+        expression, hit_condition = text, None
+    return unescape_breakpoint_text(expression), hit_condition
+
+
+def unescape_breakpoint_text(text):
+    return text.replace("@_@NEW_LINE_CHAR@_@", '\n').replace("@_@TAB_CHAR@_@", '\t').strip()
+
+
+#=======================================================================================================================
+# get_code_lines_range
+#=======================================================================================================================
+def get_code_lines_range(code):
+    '''
+    :return tuple(int, int):
+        The first and the last line which may be executed in the given code object. Any of those may be None if
+        it's not possible to determine it (i.e.: Jython/IronPython or custom code objects).
+    '''
+    first_line = getattr(code, 'co_firstlineno', None)
+    if first_line is None:
+        return None, None
+
+    try:
+        co_lines = code.co_lines  # Python 3.10 onwards
+    except AttributeError:
+        pass
+    else:
+        last_line = first_line
+        for _start, _end, line in co_lines():
+            if line is not None and line > last_line:
+                last_line = line
+        return first_line, last_line
+
+    lnotab = getattr(code, 'co_lnotab', None)
+    if lnotab is None:
+        return first_line, None
+
+    if not IS_PY3K:
+        lnotab = map(ord, lnotab)
+
+    # Line increments are signed from Python 3.6 onwards.
+    signed_increments = sys.version_info[0] >= 3 and sys.version_info[1] >= 6
+
+    line = last_line = first_line
+    for i in xrange(1, len(lnotab), 2):
+        increment = lnotab[i]
+        if signed_increments and increment >= 0x80:
+            increment -= 0x100
+        line += increment
+        if line > last_line:
+            last_line = line
+    return first_line, last_line
+
+
+#=======================================================================================================================
+# BreakpointsCodeIndex
+#=======================================================================================================================
+class BreakpointsCodeIndex:
+    '''
+    Answers whether a given code object may ever hit some of the line breakpoints in a file.
+
+    An instance is created along with the (immutable) dict with the breakpoints of a file and the answer
+    is computed only once for each code object, so, after the first check the tracing just needs a dict
+    lookup to know whether a frame may be skipped.
+    '''
+
+    def __init__(self, breakpoints_for_file):
+        self.breakpoints_for_file = breakpoints_for_file
+        self.code_to_has_breakpoint = {}
+
+    def has_breakpoint(self, code):
+        try:
+            return self.code_to_has_breakpoint[code]
+        except KeyError:
+            ret = self.code_to_has_breakpoint[code] = self._compute_has_breakpoint(code)
+            return ret
+
+    def _compute_has_breakpoint(self, code):
+        func_name = code.co_name
+
+        #global context is set with an empty name
+        if func_name in ('?', '<module>'):
+            func_name = ''
+
+        first_line, last_line = get_code_lines_range(code)
+
+        for breakpoint in DictIterValues(self.breakpoints_for_file): #jython does not support itervalues()
+            #will match either global or some function
+            if breakpoint.func_name in ('None', func_name):
+                line = breakpoint.line
+                if first_line is None or (line >= first_line and (last_line is None or line <= last_line)):
+                    return True
+        return False
+
 def get_exception_full_qname(exctype):
     if not exctype:
         return None
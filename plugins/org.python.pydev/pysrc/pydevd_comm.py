@@ -34,7 +34,9 @@ each command has a format:
     109      STEP_RETURN              JAVA      thread_id
 
     110      GET_VARIABLE             JAVA      thread_id \t frame_id \t      GET_VARIABLE with XML of var content
-                                                FRAME|GLOBAL \t attributes*
+                                                FRAME|GLOBAL[:offset:limit]   (only the given page of the items of
+                                                \t attributes*                containers is sent if the offset and
+                                                                              limit are passed)
 
     111      SET_BREAK                JAVA      file/line of the breakpoint
     112      REMOVE_BREAK             JAVA      file/line of the return
@@ -49,6 +51,7 @@ each command has a format:
 
 500 series diagnostics/ok
     501      VERSION                  either      Version string (1.0)        Currently just used at startup
+                                                  (PYDB answers: version -- see TRACE_BACKEND below)
     502      RETURN                   either      Depends on caller    -
 
 900 series: errors
@@ -56,6 +59,17 @@ each command has a format:
 
     * JAVA - remote debugger, the java end
     * PYDB - pydevd, the python end
+
+Framed protocol:
+    If the VERSION command from JAVA has FRAMED as its 4th field (version\tide_os\tbreakpoints_by\tFRAMED), the
+    answer to it is still sent as above, but after it both ends change to a binary protocol where each command is:
+        header: id, sequence-num and the payload size as unsigned 32 bit big-endian integers
+        payload: the text (utf-8 encoded), which isn't urlencoded (the XML attribute values still are).
+
+Trace backend:
+    If the VERSION command from JAVA has TRACE_BACKEND in a field after the 4th one
+    (version\tide_os\tbreakpoints_by\tprotocol\tTRACE_BACKEND), the answer is 'version\tbackend', where the backend is
+    the one used to trace the frames ('python' or 'cython' -- see pydevd_tracing.GetTraceBackend).
 '''
 
 from pydevd_constants import * #@UnusedWildImport
@@ -63,6 +77,7 @@ from _pydev_imps import _pydev_time as time, _pydev_thread
 import _pydev_threading as threading
 from _pydev_imps._pydev_socket import socket, AF_INET, SOCK_STREAM, SHUT_RD, SHUT_WR
 from pydev_imports import _queue
+import struct
 
 try:
     from urllib import quote, quote_plus, unquote, unquote_plus
@@ -135,6 +150,8 @@ CMD_SHOW_CONSOLE = 142
 
 CMD_GET_ARRAY = 143
 CMD_STEP_INTO_MY_CODE = 144
+CMD_GET_REFERRERS = 145
+CMD_GET_REFERRERS_CHUNK = 146
 
 CMD_VERSION = 501
 CMD_RETURN = 502
@@ -190,6 +207,8 @@ ID_TO_MEANING = {
 
     '143':'CMD_GET_ARRAY',
     '144':'CMD_STEP_INTO_MY_CODE',
+    '145':'CMD_GET_REFERRERS',
+    '146':'CMD_GET_REFERRERS_CHUNK',
     }
 
 MAX_IO_MSG_SIZE = 1000  #if the io is too big, we'll not send all (could make the debugger too non-responsive)
@@ -197,11 +216,53 @@ MAX_IO_MSG_SIZE = 1000  #if the io is too big, we'll not send all (could make th
 
 VERSION_STRING = "@@BUILD_NUMBER@@"
 
+PROTOCOL_QUOTED_LINE = 'QUOTED'
+PROTOCOL_FRAMED = 'FRAMED'
+
+# Option in CMD_VERSION to receive the trace backend in its answer.
+VERSION_OPTION_TRACE_BACKEND = 'TRACE_BACKEND'
+
+FRAME_HEADER_FORMAT = '!III'
+FRAME_HEADER_SIZE = struct.calcsize(FRAME_HEADER_FORMAT)
+
+READ_BUFFER_SIZE = 64 * 1024
+
 from _pydev_filesystem_encoding import getfilesystemencoding
 file_system_encoding = getfilesystemencoding()
 
 #--------------------------------------------------------------------------------------------------- UTILITIES
 
+if IS_PY3K:
+    EMPTY_BYTES = bytes()
+    NEW_LINE_BYTES = '\n'.encode('ascii')
+
+    def _to_utf8_bytes(text):
+        return text.encode('utf-8')
+
+else:
+    EMPTY_BYTES = ''
+    NEW_LINE_BYTES = '\n'
+
+    def _to_utf8_bytes(text):
+        if isinstance(text, unicode):
+            return text.encode('utf-8')
+        return text
+
+#=======================================================================================================================
+# SendAll
+#=======================================================================================================================
+def SendAll(sock, data):
+    '''Sends all the data (sock.send does not guarantee that everything is written and old versions of jython
+    don't have sock.sendall).
+    '''
+    if hasattr(sock, 'sendall'):
+        sock.sendall(data)
+        return
+
+    while data:
+        sent = sock.send(data)
+        data = data[sent:]
+
 #=======================================================================================================================
 # PydevdLog
 #=======================================================================================================================
@@ -306,6 +367,11 @@ class ReaderThread(PyDBDaemonThread):
         PyDBDaemonThread.__init__(self)
         self.sock = sock
         self.setName("pydevd.Reader")
+        self.protocol = PROTOCOL_QUOTED_LINE
+
+    def setProtocol(self, protocol):
+        '''Changes the protocol used to read the commands that follow the one currently being processed.'''
+        self.protocol = protocol
 
 
     def doKillPydevThread(self):
@@ -319,47 +385,104 @@ class ReaderThread(PyDBDaemonThread):
 
     def OnRun(self):
         self.stopTrace()
-        buffer = ""
+        chunks = []  # the data received which still doesn't make up a full command
+        pending_size = 0
+        needed_size = -1  # -1 means that the command ends at a new line
         try:
 
             while not self.killReceived:
                 try:
-                    r = self.sock.recv(1024)
+                    r = self.sock.recv(READ_BUFFER_SIZE)
                 except:
                     if not self.killReceived:
                         self.handleExcept()
                     return #Finished communication.
 
-                #Note: the java backend is always expected to pass utf-8 encoded strings. We now work with unicode
-                #internally and thus, we may need to convert to the actual encoding where needed (i.e.: filenames
-                #on python 2 may need to be converted to the filesystem encoding).
-                if hasattr(r, 'decode'):
-                    r = r.decode('utf-8')
-
-                buffer += r
                 if DebugInfoHolder.DEBUG_RECORD_SOCKET_READS:
-                    pydev_log.debug('received >>%s<<\n' % (buffer,))
+                    pydev_log.debug('received >>%s<<\n' % (r,))
 
-                if len(buffer) == 0:
+                if len(r) == 0:
                     self.handleExcept()
                     break
-                while buffer.find('\n') != -1:
-                    command, buffer = buffer.split('\n', 1)
 
-                    args = command.split('\t', 2)
-                    try:
-                        cmd_id = int(args[0])
-                        pydev_log.debug('Received command: %s %s\n' % (ID_TO_MEANING.get(str(cmd_id), '???'), command,))
-                        self.processCommand(cmd_id, int(args[1]), args[2])
-                    except:
-                        traceback.print_exc()
-                        sys.stderr.write("Can't process net command: %s\n" % command)
-                        sys.stderr.flush()
+                chunks.append(r)
+                pending_size += len(r)
+
+                # Only join the chunks when there's some full command (so, that's linear on the size of the data).
+                if needed_size == -1:
+                    if r.find(NEW_LINE_BYTES) == -1:
+                        continue
+                elif pending_size < needed_size:
+                    continue
+
+                data = EMPTY_BYTES.join(chunks)
+                consumed, needed_size = self.processCommands(data)
+                if consumed < len(data):
+                    chunks = [data[consumed:]]
+                else:
+                    chunks = []
+                pending_size = len(data) - consumed
 
         except:
             traceback.print_exc()
             self.handleExcept()
 
+    def processCommands(self, data):
+        '''Processes all the full commands available in the given data.
+
+        @return: a tuple with the number of bytes consumed and the size needed for the next command (-1 if it's
+            delimited by a new line).
+        '''
+        pos = 0
+        size = len(data)
+        while True:
+            if self.protocol == PROTOCOL_FRAMED:
+                if size - pos < FRAME_HEADER_SIZE:
+                    return pos, FRAME_HEADER_SIZE
+
+                cmd_id, seq, payload_size = struct.unpack(FRAME_HEADER_FORMAT, data[pos:pos + FRAME_HEADER_SIZE])
+                end = pos + FRAME_HEADER_SIZE + payload_size
+                if end > size:
+                    return pos, end - pos
+
+                text = data[pos + FRAME_HEADER_SIZE:end]
+                pos = end
+                self.processFramedCommand(cmd_id, seq, text)
+
+            else:
+                end = data.find(NEW_LINE_BYTES, pos)
+                if end == -1:
+                    return pos, -1
+
+                command = data[pos:end]
+                pos = end + 1
+                self.processLine(command)
+
+    def processLine(self, command):
+        #Note: the java backend is always expected to pass utf-8 encoded strings. We now work with unicode
+        #internally and thus, we may need to convert to the actual encoding where needed (i.e.: filenames
+        #on python 2 may need to be converted to the filesystem encoding).
+        try:
+            command = command.decode('utf-8')
+            args = command.split('\t', 2)
+            cmd_id = int(args[0])
+            pydev_log.debug('Received command: %s %s\n' % (ID_TO_MEANING.get(str(cmd_id), '???'), command,))
+            self.processCommand(cmd_id, int(args[1]), args[2])
+        except:
+            traceback.print_exc()
+            sys.stderr.write("Can't process net command: %s\n" % command)
+            sys.stderr.flush()
+
+    def processFramedCommand(self, cmd_id, seq, text):
+        try:
+            text = text.decode('utf-8')
+            pydev_log.debug('Received command: %s %s\n' % (ID_TO_MEANING.get(str(cmd_id), '???'), text,))
+            self.processCommand(cmd_id, seq, text)
+        except:
+            traceback.print_exc()
+            sys.stderr.write("Can't process net command: %s\t%s\t%s\n" % (cmd_id, seq, text))
+            sys.stderr.flush()
+
 
     def handleExcept(self):
         GlobalDebuggerHolder.globalDbg.FinishDebuggingSession()
@@ -369,6 +492,16 @@ class ReaderThread(PyDBDaemonThread):
 
 
 #----------------------------------------------------------------------------------- SOCKET UTILITIES - WRITER
+#=======================================================================================================================
+# _ChangeProtocol
+#=======================================================================================================================
+class _ChangeProtocol:
+    """ marker added to the writer queue to change the protocol used to write the commands that follow it """
+
+    def __init__(self, protocol):
+        self.protocol = protocol
+
+
 #=======================================================================================================================
 # WriterThread
 #=======================================================================================================================
@@ -389,11 +522,17 @@ class WriterThread(PyDBDaemonThread):
         if not self.killReceived: #we don't take new data after everybody die
             self.cmdQueue.put(cmd)
 
+    def setProtocolAfterPendingCommands(self, protocol):
+        """ the commands currently in the queue are still written with the current protocol and the ones added
+        after this call are written with the new protocol. """
+        self.addCommand(_ChangeProtocol(protocol))
+
     def OnRun(self):
         """ just loop and write responses """
 
         self.stopTrace()
         get_has_timeout = sys.hexversion >= 0x02030000 # 2.3 onwards have it.
+        protocol = PROTOCOL_QUOTED_LINE
         try:
             while True:
                 try:
@@ -419,22 +558,40 @@ class WriterThread(PyDBDaemonThread):
                     #when liberating the thread here, we could have errors because we were shutting down
                     #but the thread was still not liberated
                     return
-                out = cmd.getOutgoing()
-
-                if DebugInfoHolder.DEBUG_TRACE_LEVEL >= 1:
-                    out_message = 'sending cmd --> '
-                    out_message += "%20s" % ID_TO_MEANING.get(out[:3], 'UNKNOWN')
-                    out_message += ' '
-                    out_message += unquote(unquote(out)).replace('\n', ' ')
-                    try:
-                        sys.stderr.write('%s\n' % (out_message,))
-                    except:
-                        pass
 
-                if IS_PY3K:
-                    out = bytearray(out, 'utf-8')
-                self.sock.send(out) #TODO: this does not guarantee that all message are sent (and jython does not have a send all)
-                if cmd.id == CMD_EXIT:
+                # Get all the commands which are already available so that they're written all at once.
+                cmds = [cmd]
+                try:
+                    while True:
+                        cmds.append(self.cmdQueue.get(0))
+                except _queue.Empty:
+                    pass
+
+                finish = False
+                out = []
+                for cmd in cmds:
+                    if isinstance(cmd, _ChangeProtocol):
+                        protocol = cmd.protocol
+                        continue
+
+                    if DebugInfoHolder.DEBUG_TRACE_LEVEL >= 1:
+                        out_message = 'sending cmd --> '
+                        out_message += "%20s" % ID_TO_MEANING.get(str(cmd.id), 'UNKNOWN')
+                        out_message += ' '
+                        out_message += unquote(unquote(cmd.getOutgoing())).replace('\n', ' ')
+                        try:
+                            sys.stderr.write('%s\n' % (out_message,))
+                        except:
+                            pass
+
+                    out.append(cmd.getOutgoingBytes(protocol))
+                    if cmd.id == CMD_EXIT:
+                        finish = True
+                        break
+
+                if out:
+                    SendAll(self.sock, EMPTY_BYTES.join(out))
+                if finish:
                     break
                 if time is None:
                     break #interpreter shutdown
@@ -510,8 +667,8 @@ class NetCommand:
         self.id = id
         if (seq == 0): seq = self.getNextSeq()
         self.seq = seq
-        self.text = text
-        self.outgoing = self.makeMessage(id, seq, text)
+        self.text = to_string(text)
+        self.outgoing = None  # only created when needed (i.e.: not used in the framed protocol)
 
     def getNextSeq(self):
         """ returns next sequence number """
@@ -520,8 +677,21 @@ class NetCommand:
 
     def getOutgoing(self):
         """ returns the outgoing message"""
+        if self.outgoing is None:
+            self.outgoing = self.makeMessage(self.id, self.seq, self.text)
         return self.outgoing
 
+    def getOutgoingBytes(self, protocol):
+        """ returns the bytes to be sent for this message in the given protocol """
+        if protocol == PROTOCOL_FRAMED:
+            payload = _to_utf8_bytes(self.text)
+            return struct.pack(FRAME_HEADER_FORMAT, int(self.id), self.seq, len(payload)) + payload
+
+        out = self.getOutgoing()
+        if IS_PY3K:
+            out = out.encode('utf-8')
+        return out
+
     def makeMessage(self, cmd, seq, payload):
         encoded = quote(to_string(payload), '/<>_=" \t')
         return str(cmd) + '\t' + str(seq) + '\t' + encoded + "\n"
@@ -596,8 +766,12 @@ class NetCommandFactory:
 
         return net
 
-    def makeVersionMessage(self, seq):
+    def makeVersionMessage(self, seq, trace_backend=False):
         try:
+            if trace_backend:
+                # Only if requested by the client (VERSION_OPTION_TRACE_BACKEND): the trace backend in use
+                # ('python' or 'cython') is sent along with the version.
+                return NetCommand(CMD_VERSION, seq, VERSION_STRING + '\t' + pydevd_tracing.GetTraceBackend()[0])
             return NetCommand(CMD_VERSION, seq, VERSION_STRING)
         except:
             return self.makeErrorMessage(seq, GetExceptionTracebackStr())
@@ -693,6 +867,18 @@ class NetCommandFactory:
         except Exception:
             return self.makeErrorMessage(seq, GetExceptionTracebackStr())
 
+    def makeGetReferrersMessage(self, seq, payload):
+        try:
+            return NetCommand(CMD_GET_REFERRERS, seq, payload)
+        except Exception:
+            return self.makeErrorMessage(seq, GetExceptionTracebackStr())
+
+    def makeGetReferrersChunkMessage(self, seq, payload):
+        try:
+            return NetCommand(CMD_GET_REFERRERS_CHUNK, seq, payload)
+        except Exception:
+            return self.makeErrorMessage(seq, GetExceptionTracebackStr())
+
     def makeGetFrameMessage(self, seq, payload):
         try:
             return NetCommand(CMD_GET_FRAME, seq, payload)
@@ -920,18 +1106,21 @@ class InternalSetNextStatementThread(InternalThreadCommand):
 #=======================================================================================================================
 class InternalGetVariable(InternalThreadCommand):
     """ gets the value of a variable """
-    def __init__(self, seq, thread_id, frame_id, scope, attrs):
+    def __init__(self, seq, thread_id, frame_id, scope, attrs, offset=0, limit=None):
         self.sequence = seq
         self.thread_id = thread_id
         self.frame_id = frame_id
         self.scope = scope
         self.attributes = attrs
+        self.offset = offset
+        self.limit = limit
 
     def doIt(self, dbg):
         """ Converts request into python variable """
         try:
             xml = "<xml>"
-            valDict = pydevd_vars.resolveCompoundVariable(self.thread_id, self.frame_id, self.scope, self.attributes)
+            valDict = pydevd_vars.resolveCompoundVariable(
+                self.thread_id, self.frame_id, self.scope, self.attributes, self.offset, self.limit)
             if valDict is None:
                 valDict = {}
 
@@ -959,7 +1148,7 @@ class InternalGetVariable(InternalThreadCommand):
 # InternalGetArray
 #=======================================================================================================================
 class InternalGetArray(InternalThreadCommand):
-    def __init__(self, seq, roffset, coffset, rows, cols, format, thread_id, frame_id, scope, attrs):
+    def __init__(self, seq, roffset, coffset, rows, cols, format, thread_id, frame_id, scope, attrs, compact=False, table=False):
         self.sequence = seq
         self.thread_id = thread_id
         self.frame_id = frame_id
@@ -971,6 +1160,8 @@ class InternalGetArray(InternalThreadCommand):
         self.rows = int(rows)
         self.cols = int(cols)
         self.format = format
+        self.compact = compact
+        self.table = table
 
     def doIt(self, dbg):
         try:
@@ -978,14 +1169,8 @@ class InternalGetArray(InternalThreadCommand):
             var = pydevd_vars.evalInContext(self.name, frame.f_globals, frame.f_locals)
 
             xml = "<xml>"
-
-            var, metaxml, rows, cols, format = pydevd_vars.array_to_meta_xml(var, self.name, self.format)
-            xml += metaxml
-            self.format = '%' + format
-            if self.rows == -1 and self.cols == -1:
-                self.rows = rows
-                self.cols = cols
-            xml += pydevd_vars.array_to_xml(var, self.roffset, self.coffset, self.rows, self.cols, self.format)
+            xml += pydevd_vars.array_data_to_xml(
+                var, self.name, self.roffset, self.coffset, self.rows, self.cols, self.format, self.compact, self.table)
             xml += "</xml>"
             cmd = dbg.cmdFactory.makeGetArrayMessage(self.sequence, xml)
             dbg.writer.addCommand(cmd)
@@ -1228,6 +1413,7 @@ class InternalEvaluateConsoleExpression(InternalThreadCommand):
         try:
             frame = pydevd_vars.findFrame(self.thread_id, self.frame_id)
             if frame is not None:
+                pydevd_vars.clear_array_meta_cache(self.thread_id)
                 console_message = pydevd_console.execute_console_command(
                     frame, self.thread_id, self.frame_id, self.line, self.buffer_output)
 
@@ -1275,6 +1461,45 @@ class InternalRunCustomOperation(InternalThreadCommand):
             dbg.writer.addCommand(cmd)
 
 
+#=======================================================================================================================
+# InternalGetReferrers
+#=======================================================================================================================
+class InternalGetReferrers(InternalThreadCommand):
+    """ Get the referrers of a variable (mode: 'referrers') or the path to it from a root (mode: 'path_to_root').
+
+    The referrers are sent as they're found: each chunk (a complete xml, as in pydevd_referrers.get_referrer_info)
+    is sent in a CMD_GET_REFERRERS_CHUNK message and the last one in the CMD_GET_REFERRERS message which finishes
+    the command.
+    """
+    def __init__(self, seq, mode, thread_id, frame_id, scope, attrs):
+        self.sequence = seq
+        self.mode = mode
+        self.thread_id = thread_id
+        self.frame_id = frame_id
+        self.scope = scope
+        self.attrs = attrs
+
+    def doIt(self, dbg):
+        import pydevd_referrers
+        try:
+            var = pydevd_vars.getVariable(self.thread_id, self.frame_id, self.scope, self.attrs)
+            if self.mode == 'path_to_root':
+                last = pydevd_referrers.get_path_to_root_info(var)
+            else:
+                last = None
+                for chunk in pydevd_referrers.iter_referrer_info(var, pydevd_referrers.REFERRERS_CHUNK_SIZE):
+                    if last is not None:
+                        dbg.writer.addCommand(dbg.cmdFactory.makeGetReferrersChunkMessage(self.sequence, quote_plus(last)))
+                    last = chunk
+            var = None
+            cmd = dbg.cmdFactory.makeGetReferrersMessage(self.sequence, quote_plus(last))
+            dbg.writer.addCommand(cmd)
+        except:
+            var = None
+            cmd = dbg.cmdFactory.makeErrorMessage(self.sequence, "Error getting referrers: " + GetExceptionTracebackStr())
+            dbg.writer.addCommand(cmd)
+
+
 #=======================================================================================================================
 # InternalConsoleGetCompletions
 #=======================================================================================================================
@@ -1320,6 +1545,7 @@ class InternalConsoleExec(InternalThreadCommand):
                 #don't trace new threads created by console command
                 disable_trace_thread_modules()
 
+                pydevd_vars.clear_array_meta_cache(self.thread_id)
                 result = pydevconsole.consoleExec(self.thread_id, self.frame_id, self.expression)
                 xml = "<xml>"
                 xml += pydevd_vars.varToXML(result, "")
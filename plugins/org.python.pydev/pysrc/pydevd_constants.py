@@ -22,9 +22,6 @@ class DebugInfoHolder:
     DEBUG_TRACE_LEVEL = -1
     DEBUG_TRACE_BREAKPOINTS = -1
 
-#Optimize with psyco? This gave a 50% speedup in the debugger in tests
-USE_PSYCO_OPTIMIZATION = True
-
 #Hold a reference to the original _getframe (because psyco will change that as soon as it's imported)
 import sys #Note: the sys import must be here anyways (others depend on it)
 try:
@@ -38,6 +35,10 @@ except AttributeError:
 #this value was raised from 200 to 1000.
 MAXIMUM_VARIABLE_REPRESENTATION_SIZE = 1000
 
+#The db frames (which dispatch the trace events) are reused for the frames of the same code in a thread, and this
+#is the maximum number of them kept (per thread) before the cache is cleared.
+MAX_DB_FRAMES_CACHED_PER_THREAD = 2000
+
 import os
 
 import pydevd_vm_type
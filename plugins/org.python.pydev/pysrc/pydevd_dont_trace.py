@@ -2,8 +2,10 @@
 Support for a tag that allows skipping over functions while debugging.
 '''
 import linecache
+import os
 import re
 from pydevd_constants import DictContains
+from _pydev_imps import _pydev_time as time
 
 # To suppress tracing a method, add the tag @DontTrace
 # to a comment either preceding or on the same line as
@@ -24,19 +26,42 @@ DONT_TRACE_TAG = '@DontTrace'
 # of a line).
 RE_DECORATOR = re.compile(r'^\s*@')
 
-# Mapping from code object to bool.
-# If the key exists, the value is the cached result of should_trace_hook
-_filename_to_ignored_lines = {}
+# An exception raised in a line with this tag in a comment doesn't make the
+# debugger stop (when ignoring exceptions in those lines is enabled).
+IGNORE_EXCEPTION_TAG = re.compile('[^#]*#.*@IgnoreException')
 
-def default_should_trace_hook(frame, filename):
+# Seconds during which the decisions cached for a file are used without checking
+# whether it changed.
+FILE_CHECK_INTERVAL = 1.0
+
+
+def _get_file_version(filename):
+    try:
+        stat = os.stat(filename)
+        return stat.st_size, stat.st_mtime
+    except:
+        return None
+
+
+#=======================================================================================================================
+# _FileTags
+#=======================================================================================================================
+class _FileTags:
     '''
-    Return True if this frame should be traced, False if tracing should be blocked.
+    The decisions (@DontTrace and @IgnoreException) for the code in a file, valid while
+    the file has the same version.
     '''
-    # First, check whether this code object has a cached value
-    ignored_lines = _filename_to_ignored_lines.get(filename)
-    if ignored_lines is None:
-        # Now, look up that line of code and check for a @DontTrace
-        # preceding or on the same line as the method.
+
+    def __init__(self, filename, version, now):
+        self.filename = filename
+        self.version = version
+        self.last_check = now
+        self._dont_trace_lines = None
+        self._code_to_should_trace = {}  # code -> bool
+        self._line_to_exception_ignored = {}  # line (1-based) -> bool
+
+    def _get_dont_trace_lines(self):
+        # Look up the lines with a @DontTrace preceding or on the same line as the method.
         # E.g.:
         # #@DontTrace
         # def test():
@@ -45,7 +70,7 @@ def default_should_trace_hook(frame, filename):
         # def test(): #@DontTrace
         #     pass
         ignored_lines = {}
-        lines = linecache.getlines(filename)
+        lines = linecache.getlines(self.filename)
         i_line = 0  # Could use enumerate, but not there on all versions...
         for line in lines:
             j = line.find('#')
@@ -53,7 +78,7 @@ def default_should_trace_hook(frame, filename):
                 comment = line[j:]
                 if DONT_TRACE_TAG in comment:
                     ignored_lines[i_line] = 1
-                    
+
                     #Note: when it's found in the comment, mark it up and down for the decorator lines found.
                     k = i_line - 1
                     while k >= 0:
@@ -62,24 +87,91 @@ def default_should_trace_hook(frame, filename):
                             k -= 1
                         else:
                             break
-                        
+
                     k = i_line + 1
-                    while k <= len(lines):
+                    while k < len(lines):
                         if RE_DECORATOR.match(lines[k]):
                             ignored_lines[k] = 1
                             k += 1
                         else:
                             break
-                        
+
             i_line += 1
-                    
+        return ignored_lines
+
+    def should_trace(self, code):
+        try:
+            return self._code_to_should_trace[code]
+        except KeyError:
+            pass
+
+        ignored_lines = self._dont_trace_lines
+        if ignored_lines is None:
+            ignored_lines = self._dont_trace_lines = self._get_dont_trace_lines()
+
+        func_line = code.co_firstlineno - 1 # co_firstlineno is 1-based, so -1 is needed
+        ret = self._code_to_should_trace[code] = not (
+            DictContains(ignored_lines, func_line - 1) or #-1 to get line before method
+            DictContains(ignored_lines, func_line)) #method line
+        return ret
+
+    def is_exception_ignored(self, line, module_globals=None):
+        try:
+            return self._line_to_exception_ignored[line]
+        except KeyError:
+            pass
+
+        try:
+            contents = linecache.getline(self.filename, line, module_globals)
+        except:
+            #Jython 2.1
+            contents = linecache.getline(self.filename, line)
+        ret = self._line_to_exception_ignored[line] = IGNORE_EXCEPTION_TAG.match(contents) is not None
+        return ret
 
-        _filename_to_ignored_lines[filename] = ignored_lines
 
-    func_line = frame.f_code.co_firstlineno - 1 # co_firstlineno is 1-based, so -1 is needed
-    return not (
-        DictContains(ignored_lines, func_line - 1) or #-1 to get line before method 
-        DictContains(ignored_lines, func_line)) #method line
+# filename -> _FileTags
+_filename_to_tags = {}
+
+
+def get_file_tags(filename):
+    '''
+    @return: the _FileTags for the given file (checking whether the file changed at most
+    once every FILE_CHECK_INTERVAL seconds).
+    '''
+    tags = _filename_to_tags.get(filename)
+    now = time.time()
+    if tags is not None:
+        if now - tags.last_check < FILE_CHECK_INTERVAL:
+            return tags
+        tags.last_check = now
+        version = _get_file_version(filename)
+        if version == tags.version:
+            return tags
+    else:
+        version = _get_file_version(filename)
+
+    try:
+        linecache.checkcache(filename)
+    except:
+        #Jython 2.1
+        linecache.checkcache()
+    tags = _filename_to_tags[filename] = _FileTags(filename, version, now)
+    return tags
+
+
+def default_should_trace_hook(frame, filename):
+    '''
+    Return True if this frame should be traced, False if tracing should be blocked.
+    '''
+    return get_file_tags(filename).should_trace(frame.f_code)
+
+
+def is_exception_ignored_at(filename, line, module_globals=None):
+    '''
+    Return True if the given line (1-based) has an @IgnoreException tag.
+    '''
+    return get_file_tags(filename).is_exception_ignored(line, module_globals)
 
 
 should_trace_hook = None
@@ -93,13 +185,13 @@ def clear_trace_filter_cache():
     global should_trace_hook
     try:
         # Need to temporarily disable a hook because otherwise
-        # _filename_to_ignored_lines.clear() will never complete.
+        # _filename_to_tags.clear() will never complete.
         old_hook = should_trace_hook
         should_trace_hook = None
 
-        # Clear the linecache
-        linecache.clearcache()
-        _filename_to_ignored_lines.clear()
+        # Only the files changed are removed from the linecache.
+        linecache.checkcache()
+        _filename_to_tags.clear()
 
     finally:
         should_trace_hook = old_hook
@@ -1,10 +1,8 @@
-import linecache
 import os.path
-import re
 import traceback  # @Reimport
 
 import pydev_log
-from pydevd_breakpoints import get_exception_breakpoint, get_exception_name
+from pydevd_breakpoints import get_exception_breakpoint, get_exception_name, BreakpointsCodeIndex
 from pydevd_comm import CMD_STEP_CAUGHT_EXCEPTION, CMD_STEP_RETURN, CMD_STEP_OVER, CMD_SET_BREAK, \
     CMD_STEP_INTO, CMD_SMART_STEP_INTO, CMD_RUN_TO_LINE, CMD_SET_NEXT_STATEMENT, CMD_STEP_INTO_MY_CODE
 from pydevd_constants import *  # @UnusedWildImport
@@ -22,7 +20,7 @@ import pydevd_dont_trace
 
 basename = os.path.basename
 
-IGNORE_EXCEPTION_TAG = re.compile('[^#]*#.*@IgnoreException')
+IGNORE_EXCEPTION_TAG = pydevd_dont_trace.IGNORE_EXCEPTION_TAG
 
 
 #=======================================================================================================================
@@ -32,14 +30,10 @@ class PyDBFrame:
     '''This makes the tracing for a given frame, so, the trace_dispatch
     is used initially when we enter into a new context ('call') and then
     is reused for the entire context.
-    '''
-
-    #Note: class (and not instance) attributes.
 
-    #Same thing in the main debugger but only considering the file contents, while the one in the main debugger
-    #considers the user input (so, the actual result must be a join of both).
-    filename_to_lines_where_exceptions_are_ignored = {}
-    filename_to_stat_info = {}
+    Note: the same instance is reused for all the frames of a given code in a thread (see GetDbFrame), so, it must not
+    keep any state besides _args (i.e.: decisions computed for a frame must not be cached in it).
+    '''
 
     def __init__(self, args):
         #args = mainDebugger, filename, base, info, t, frame
@@ -130,62 +124,18 @@ class PyDBFrame:
                     filename = GetFilenameAndBase(check_trace_obj.tb_frame)[0]
 
 
-                    filename_to_lines_where_exceptions_are_ignored = self.filename_to_lines_where_exceptions_are_ignored
-
-
-                    lines_ignored = filename_to_lines_where_exceptions_are_ignored.get(filename)
-                    if lines_ignored is None:
-                        lines_ignored = filename_to_lines_where_exceptions_are_ignored[filename] = {}
-
-                    try:
-                        curr_stat = os.stat(filename)
-                        curr_stat = (curr_stat.st_size, curr_stat.st_mtime)
-                    except:
-                        curr_stat = None
-
-                    last_stat = self.filename_to_stat_info.get(filename)
-                    if last_stat != curr_stat:
-                        self.filename_to_stat_info[filename] = curr_stat
-                        lines_ignored.clear()
-                        try:
-                            linecache.checkcache(filename)
-                        except:
-                            #Jython 2.1
-                            linecache.checkcache()
-
-                    from_user_input = mainDebugger.filename_to_lines_where_exceptions_are_ignored.get(filename)
-                    if from_user_input:
-                        merged = {}
-                        merged.update(lines_ignored)
-                        #Override what we have with the related entries that the user entered
-                        merged.update(from_user_input)
-                    else:
-                        merged = lines_ignored
-
                     exc_lineno = check_trace_obj.tb_lineno
 
-                    # print ('lines ignored', lines_ignored)
-                    # print ('user input', from_user_input)
-                    # print ('merged', merged, 'curr', exc_lineno)
-
-                    if not DictContains(merged, exc_lineno):  #Note: check on merged but update lines_ignored.
-                        try:
-                            line = linecache.getline(filename, exc_lineno, check_trace_obj.tb_frame.f_globals)
-                        except:
-                            #Jython 2.1
-                            line = linecache.getline(filename, exc_lineno)
-
-                        if IGNORE_EXCEPTION_TAG.match(line) is not None:
-                            lines_ignored[exc_lineno] = 1
-                            return
-                        else:
-                            #Put in the cache saying not to ignore
-                            lines_ignored[exc_lineno] = 0
-                    else:
-                        #Ok, dict has it already cached, so, let's check it...
-                        if merged.get(exc_lineno, 0):
+                    #The lines the user entered override the @IgnoreException tags in the file contents.
+                    from_user_input = mainDebugger.filename_to_lines_where_exceptions_are_ignored.get(filename)
+                    if from_user_input and DictContains(from_user_input, exc_lineno):
+                        if from_user_input[exc_lineno]:
                             return
 
+                    elif pydevd_dont_trace.is_exception_ignored_at(
+                        filename, exc_lineno, check_trace_obj.tb_frame.f_globals):
+                        return
+
 
             thread = self._args[3]
 
@@ -225,7 +175,7 @@ class PyDBFrame:
     def trace_dispatch(self, frame, event, arg):
         main_debugger, filename, info, thread = self._args
         try:
-            info.is_tracing = True
+            info.is_tracing += 1
 
             if main_debugger._finishDebuggingSession:
                 return None
@@ -294,19 +244,15 @@ class PyDBFrame:
                             return None
 
                 else:
-                    #checks the breakpoint to see if there is a context match in some function
-                    curr_func_name = frame.f_code.co_name
-
-                    #global context is set with an empty name
-                    if curr_func_name in ('?', '<module>'):
-                        curr_func_name = ''
-
-                    for breakpoint in DictIterValues(breakpoints_for_file): #jython does not support itervalues()
-                        #will match either global or some function
-                        if breakpoint.func_name in ('None', curr_func_name):
-                            break
-
-                    else: # if we had some break, it won't get here (so, that's a context that we want to skip)
+                    #checks the breakpoint to see if there is a context match in some function (the index
+                    #caches the result per code object, so, this is only computed once for each function).
+                    code_index = main_debugger.file_to_breakpoints_code_index.get(filename)
+                    if code_index is None or code_index.breakpoints_for_file is not breakpoints_for_file:
+                        #the breakpoints were just changed and the index still wasn't updated (should be rare).
+                        code_index = BreakpointsCodeIndex(breakpoints_for_file)
+
+                    if not code_index.has_breakpoint(frame.f_code):
+                        # if we had some break, it won't get here (so, that's a context that we want to skip)
                         if can_skip:
                             if has_exception_breakpoints:
                                 return self.trace_exception
@@ -348,7 +294,9 @@ class PyDBFrame:
                         condition = breakpoint.condition
                         if condition is not None:
                             try:
-                                val = eval(condition, new_frame.f_globals, new_frame.f_locals)
+                                #condition_code is already compiled (or the source if it didn't compile, in
+                                #which case the eval will raise the error).
+                                val = eval(breakpoint.condition_code, new_frame.f_globals, new_frame.f_locals)
                                 if not val:
                                     return self.trace_dispatch
 
@@ -387,10 +335,13 @@ class PyDBFrame:
                                     except:
                                         traceback.print_exc()
 
+                        if not breakpoint.is_hit_condition_met():
+                            return self.trace_dispatch
+
                         if breakpoint.expression is not None:
                             try:
                                 try:
-                                    val = eval(breakpoint.expression, new_frame.f_globals, new_frame.f_locals)
+                                    val = eval(breakpoint.expression_code, new_frame.f_globals, new_frame.f_locals)
                                 except:
                                     val = sys.exc_info()[1]
                             finally:
@@ -416,13 +367,9 @@ class PyDBFrame:
             try:
                 should_skip = False
                 if pydevd_dont_trace.should_trace_hook is not None:
-                    if not hasattr(self, 'should_skip'):
-                        # I.e.: cache the result on self.should_skip (no need to evaluate the same frame multiple times).
-                        # Note that on a code reload, we won't re-evaluate this because in practice, the frame.f_code
-                        # Which will be handled by this frame is read-only, so, we can cache it safely.
-                        should_skip = self.should_skip = not pydevd_dont_trace.should_trace_hook(frame, filename)
-                    else:
-                        should_skip = self.should_skip
+                    # Note: not cached here (this instance is reused for all the frames of the code): the hook caches
+                    # the result per code and checks whether the file changed (i.e.: #@DontTrace added/removed).
+                    should_skip = not pydevd_dont_trace.should_trace_hook(frame, filename)
 
                 plugin_stop = False
                 if should_skip:
@@ -548,16 +495,6 @@ class PyDBFrame:
 
             return retVal
         finally:
-            info.is_tracing = False
+            info.is_tracing -= 1
 
         #end trace_dispatch
-
-    if USE_PSYCO_OPTIMIZATION:
-        try:
-            import psyco
-
-            trace_dispatch = psyco.proxy(trace_dispatch)
-        except ImportError:
-            if hasattr(sys, 'exc_clear'): #jython does not have it
-                sys.exc_clear() #don't keep the traceback
-            pass #ok, psyco not available
\ No newline at end of file
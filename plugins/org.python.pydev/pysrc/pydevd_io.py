@@ -60,6 +60,83 @@ class IOBuf:
     def empty(self):
         return len(self.buflist) == 0
 
+class FdCapture:
+    '''Captures what's written to the stdout and stderr file descriptors (so, the output of C extensions and child
+    processes is also captured) in a temporary file (reused for each capture).
+    '''
+
+    def __init__(self):
+        import tempfile
+        self._tmp = tempfile.TemporaryFile()
+        self.saved_fds = None
+
+    def _flush(self):
+        import sys
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except:
+                pass
+
+    def start(self):
+        import os
+        self._flush()
+        self._tmp.seek(0)
+        self._tmp.truncate()
+        fd = self._tmp.fileno()
+        self.saved_fds = (os.dup(1), os.dup(2))
+        os.dup2(fd, 1)
+        os.dup2(fd, 2)
+
+    def stop(self):
+        import os
+        self._flush()
+        saved_fds = self.saved_fds
+        self.saved_fds = None
+        os.dup2(saved_fds[0], 1)
+        os.dup2(saved_fds[1], 2)
+        os.close(saved_fds[0])
+        os.close(saved_fds[1])
+
+    def _read(self, offset, size):
+        import os
+        fd = self._tmp.fileno()
+        os.lseek(fd, offset, 0)
+        chunks = []
+        while size > 0:
+            data = os.read(fd, min(size, 65536))
+            if not data:
+                break
+            chunks.append(data)
+            size -= len(data)
+        return _EMPTY_BYTES.join(chunks)
+
+    def getvalue(self, max_size):
+        '''
+        @return: bytes
+            The contents captured in the last capture (if bigger than max_size, only its start and end are returned).
+        '''
+        import os
+        size = os.fstat(self._tmp.fileno()).st_size
+        if size <= max_size:
+            return self._read(0, size)
+
+        half = max_size // 2
+        message = '\n... (%s bytes of output not shown) ...\n' % (size - 2 * half,)
+        if IS_PY3K:
+            message = message.encode('ascii')
+        return self._read(0, half) + message + self._read(size - half, half)
+
+    def close(self):
+        self._tmp.close()
+
+
+if IS_PY3K:
+    _EMPTY_BYTES = bytes()
+else:
+    _EMPTY_BYTES = ''
+
+
 class _RedirectionsHolder:
     _stack_stdout = []
     _stack_stderr = []
@@ -60,6 +60,45 @@ class PluginManager(object):
         else:
             self.bind_functions(pydevd_trace_api, create_dispatch, self.active_plugins)
 
+        # code -> tuple(active plugins interested in it)
+        self._code_to_plugins = {}
+        if len(self.active_plugins) > 0:
+            # Called for each frame while there are plugin breakpoints: only call the plugins interested in the code.
+            self.can_not_skip = self._can_not_skip
+            self.get_breakpoint = self._get_breakpoint
+
+    def get_code_plugins(self, code):
+        '''
+        @return: the active plugins whose is_plugin_code accepts the given code object.
+        '''
+        try:
+            return self._code_to_plugins[code]
+        except KeyError:
+            plugins = []
+            for plugin in self.active_plugins:
+                is_plugin_code = getattr(plugin, 'is_plugin_code', None)
+                if is_plugin_code is None or is_plugin_code(self, code):
+                    plugins.append(plugin)
+            plugins = self._code_to_plugins[code] = tuple(plugins)
+            return plugins
+
+    def _can_not_skip(self, pydb, pydb_frame, frame):
+        for plugin in self.get_code_plugins(frame.f_code):
+            if plugin.can_not_skip(self, pydb, pydb_frame, frame):
+                return True
+        return False
+
+    def _get_breakpoint(self, pydb, pydb_frame, frame, event, args):
+        result = None
+        for plugin in self.get_code_plugins(frame.f_code):
+            r = plugin.get_breakpoint(self, pydb, pydb_frame, frame, event, args)
+            if r:
+                if r[0]:
+                    return r  # A breakpoint was hit.
+                if result is None:
+                    result = r
+        return result
+
     def bind_functions(self, interface, function_factory, arg):
         for name in dir(interface):
             func = function_factory(arg, name)
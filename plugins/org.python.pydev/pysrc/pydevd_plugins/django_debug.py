@@ -1,5 +1,8 @@
 from pydevd_comm import CMD_SET_BREAK, CMD_ADD_EXCEPTION_BREAK
 import inspect
+import os
+import re
+from bisect import bisect_left
 from pydevd_constants import STATE_SUSPEND, GetThreadId, DictContains, DictIterItems
 from pydevd_file_utils import NormFileToServer, GetFileNameAndBaseFromFile
 from pydevd_breakpoints import LineBreakpoint, get_exception_name
@@ -11,9 +14,9 @@ from pydevd_frame_utils import add_exception_to_frame, FCode, cached_call, just_
 DJANGO_SUSPEND = 2
 
 class DjangoLineBreakpoint(LineBreakpoint):
-    def __init__(self, file, line, condition, func_name, expression):
+    def __init__(self, file, line, condition, func_name, expression, hit_condition=None):
         self.file = file
-        LineBreakpoint.__init__(self, line, condition, func_name, expression)
+        LineBreakpoint.__init__(self, line, condition, func_name, expression, hit_condition)
 
     def is_triggered(self, template_frame_file, template_frame_line):
         return self.file == template_frame_file and self.line == template_frame_line
@@ -22,9 +25,9 @@ class DjangoLineBreakpoint(LineBreakpoint):
         return "DjangoLineBreakpoint: %s-%d" %(self.file, self.line)
 
 
-def add_line_breakpoint(plugin, pydb, type, file, line, condition, expression, func_name):
+def add_line_breakpoint(plugin, pydb, type, file, line, condition, expression, func_name, hit_condition=None):
     if type == 'django-line':
-        breakpoint = DjangoLineBreakpoint(file, line, condition, func_name, expression)
+        breakpoint = DjangoLineBreakpoint(file, line, condition, func_name, expression, hit_condition)
         if not hasattr(pydb, 'django_breakpoints'):
             _init_plugin_breaks(pydb)
         return breakpoint, pydb.django_breakpoints
@@ -57,14 +60,24 @@ def get_breakpoints(plugin, pydb, type):
         return pydb.django_breakpoints
     return None
 
+# (class, names) -> bool
+_inherits_cache = {}
+
 def _inherits(cls, *names):
-    if cls.__name__ in names:
-        return True
+    try:
+        return _inherits_cache[(cls, names)]
+    except KeyError:
+        pass
+
     inherits_node = False
-    for base in inspect.getmro(cls):
-        if base.__name__ in names:
-            inherits_node = True
-            break
+    if cls.__name__ in names:
+        inherits_node = True
+    else:
+        for base in inspect.getmro(cls):
+            if base.__name__ in names:
+                inherits_node = True
+                break
+    _inherits_cache[(cls, names)] = inherits_node
     return inherits_node
 
 
@@ -166,23 +179,38 @@ def _read_file(filename):
     return s
 
 
-def _offset_to_line_number(text, offset):
-    curLine = 1
-    curOffset = 0
-    while curOffset < offset:
-        if curOffset == len(text):
-            return -1
-        c = text[curOffset]
-        if c == '\n':
-            curLine += 1
-        elif c == '\r':
-            curLine += 1
-            if curOffset < len(text) and text[curOffset + 1] == '\n':
-                curOffset += 1
+_RE_NEW_LINE = re.compile('\r\n?|\n')
+
+
+def _get_new_line_offsets(text):
+    '''
+    @return: list with the offset of each new line in the text ('\r\n' is a single new line).
+    '''
+    return [m.start() for m in _RE_NEW_LINE.finditer(text)]
+
+
+def _offset_to_line_number(text, offset, new_line_offsets=None):
+    if offset > len(text):
+        return -1
+    if new_line_offsets is None:
+        new_line_offsets = _get_new_line_offsets(text)
+    return bisect_left(new_line_offsets, offset) + 1
 
-        curOffset += 1
 
-    return curLine
+# template filename -> (mtime, text, new line offsets)
+_template_lines_cache = {}
+
+def _get_template_offset_line(filename, offset):
+    '''
+    @return: the line (1-based) of the given offset in the template (the new lines of the template are computed only
+    once while it has the same mtime).
+    '''
+    mtime = os.stat(filename).st_mtime
+    cached = _template_lines_cache.get(filename)
+    if cached is None or cached[0] != mtime:
+        text = _read_file(filename)
+        cached = _template_lines_cache[filename] = (mtime, text, _get_new_line_offsets(text))
+    return _offset_to_line_number(cached[1], offset, cached[2])
 
 
 def _get_source(frame):
@@ -200,30 +228,42 @@ def _get_source(frame):
         return None
 
 
-def _get_template_file_name(frame):
+# name in the template source -> template filename
+_template_file_names_cache = {}
+
+def _get_template_file_name(frame, source=None):
     try:
-        source = _get_source(frame)
+        if source is None:
+            source = _get_source(frame)
         if source is None:
             pydev_log.debug("Source is None\n")
             return None
         fname = source[0].name
 
+        try:
+            return _template_file_names_cache[fname]
+        except KeyError:
+            pass
+
         if fname == '<unknown source>':
             pydev_log.debug("Source name is %s\n" % fname)
             return None
         else:
             filename, base = GetFileNameAndBaseFromFile(fname)
+            _template_file_names_cache[fname] = filename
             return filename
     except:
         pydev_log.debug(traceback.format_exc())
         return None
 
 
-def _get_template_line(frame):
-    source = _get_source(frame)
-    file_name = _get_template_file_name(frame)
+def _get_template_line(frame, source=None, file_name=None):
+    if source is None:
+        source = _get_source(frame)
+    if file_name is None:
+        file_name = _get_template_file_name(frame, source)
     try:
-        return _offset_to_line_number(_read_file(file_name), source[1][0])
+        return _get_template_offset_line(file_name, source[1][0])
     except:
         return None
 
@@ -276,6 +316,10 @@ def _is_django_exception_break_context(frame):
 # Django Step Commands
 #=======================================================================================================================
 
+def is_plugin_code(plugin, code):
+    # Only the render methods of the nodes may have template breakpoints.
+    return code.co_name == 'render'
+
 def can_not_skip(plugin, mainDebugger, pydb_frame, frame):
     if mainDebugger.django_breakpoints and _is_django_render_call(frame):
         filename = _get_template_file_name(frame)
@@ -345,12 +389,13 @@ def get_breakpoint(plugin, mainDebugger, pydb_frame, frame, event, args):
 
     if event == 'call' and info.pydev_state != STATE_SUSPEND and \
             mainDebugger.django_breakpoints and _is_django_render_call(frame):
-        filename = _get_template_file_name(frame)
+        source = _get_source(frame)
+        filename = _get_template_file_name(frame, source)
         pydev_log.debug("Django is rendering a template: %s\n" % filename)
         django_breakpoints_for_file = mainDebugger.django_breakpoints.get(filename)
         if django_breakpoints_for_file:
             pydev_log.debug("Breakpoints for that file: %s\n" % django_breakpoints_for_file)
-            template_line = _get_template_line(frame)
+            template_line = _get_template_line(frame, source, filename)
             pydev_log.debug("Tracing template line: %d\n" % template_line)
 
             if DictContains(django_breakpoints_for_file, template_line):
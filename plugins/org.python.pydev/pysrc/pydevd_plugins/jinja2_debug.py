@@ -10,9 +10,9 @@ JINJA2_SUSPEND = 3
 
 class Jinja2LineBreakpoint(LineBreakpoint):
 
-    def __init__(self, file, line, condition, func_name, expression):
+    def __init__(self, file, line, condition, func_name, expression, hit_condition=None):
         self.file = file
-        LineBreakpoint.__init__(self, line, condition, func_name, expression)
+        LineBreakpoint.__init__(self, line, condition, func_name, expression, hit_condition)
 
     def is_triggered(self, template_frame_file, template_frame_line):
         return self.file == template_frame_file and self.line == template_frame_line
@@ -21,10 +21,10 @@ class Jinja2LineBreakpoint(LineBreakpoint):
         return "Jinja2LineBreakpoint: %s-%d" %(self.file, self.line)
 
 
-def add_line_breakpoint(plugin, pydb, type, file, line, condition, expression, func_name):
+def add_line_breakpoint(plugin, pydb, type, file, line, condition, expression, func_name, hit_condition=None):
     result = None
     if type == 'jinja2-line':
-        breakpoint = Jinja2LineBreakpoint(file, line, condition, func_name, expression)
+        breakpoint = Jinja2LineBreakpoint(file, line, condition, func_name, expression, hit_condition)
         if not hasattr(pydb, 'jinja2_breakpoints'):
             _init_plugin_breaks(pydb)
         result = breakpoint, pydb.jinja2_breakpoints
@@ -179,30 +179,44 @@ def _find_render_function_frame(frame):
     except:
         return old_frame
 
+# _debug_info of a template -> dict(line in the generated code -> line in the template)
+_debug_info_to_lines = {}
+
 def _get_jinja2_template_line(frame):
-    debug_info = None
-    if DictContains(frame.f_globals,'__jinja_template__'):
-        _debug_info = frame.f_globals['__jinja_template__']._debug_info
-        if _debug_info != '':
-            #sometimes template contains only plain text
-            debug_info = frame.f_globals['__jinja_template__'].debug_info
-
-    if debug_info is None:
+    template = frame.f_globals.get('__jinja_template__')
+    if template is None:
+        return None
+
+    _debug_info = template._debug_info
+    if _debug_info == '':
+        #sometimes template contains only plain text
         return None
 
-    lineno = frame.f_lineno
+    # Note: template.debug_info parses _debug_info on each access, so, the mapping is cached (a new compilation of
+    # the template has a new _debug_info).
+    lines = _debug_info_to_lines.get(_debug_info)
+    if lines is None:
+        lines = {}
+        for template_lineno, code_lineno in template.debug_info:
+            if code_lineno not in lines:  # The first match is the one used.
+                lines[code_lineno] = template_lineno
+        _debug_info_to_lines[_debug_info] = lines
 
-    for pair in debug_info:
-        if pair[1] == lineno:
-            return pair[0]
+    return lines.get(frame.f_lineno)
 
-    return None
+
+# filename of the template -> normalized filename
+_template_filenames_cache = {}
 
 def _get_jinja2_template_filename(frame):
     if DictContains(frame.f_globals, '__jinja_template__'):
         fname = frame.f_globals['__jinja_template__'].filename
-        filename, base = GetFileNameAndBaseFromFile(fname)
-        return filename
+        try:
+            return _template_filenames_cache[fname]
+        except KeyError:
+            filename, base = GetFileNameAndBaseFromFile(fname)
+            _template_filenames_cache[fname] = filename
+            return filename
     return None
 
 
@@ -222,6 +236,11 @@ def has_line_breaks(plugin):
             return True
     return False
 
+def is_plugin_code(plugin, code):
+    # Only the functions generated for the templates may have template breakpoints (see _is_jinja2_render_call).
+    name = code.co_name
+    return name in ("root", "loop", "macro") or name.startswith("block_")
+
 def can_not_skip(plugin, pydb, pydb_frame, frame):
     if pydb.jinja2_breakpoints and _is_jinja2_render_call(frame):
         filename = _get_jinja2_template_filename(frame)
@@ -332,10 +351,9 @@ def get_breakpoint(plugin, pydb, pydb_frame, frame, event, args):
             pydb.jinja2_breakpoints and _is_jinja2_render_call(frame):
         filename = _get_jinja2_template_filename(frame)
         jinja2_breakpoints_for_file = pydb.jinja2_breakpoints.get(filename)
-        new_frame = Jinja2TemplateFrame(frame)
 
+        # Only create the template frame (which collects the context) if a breakpoint is hit.
         if jinja2_breakpoints_for_file:
-            lineno = frame.f_lineno
             template_lineno = _get_jinja2_template_line(frame)
             if template_lineno is not None and DictContains(jinja2_breakpoints_for_file, template_lineno):
                 jinja2_breakpoint = jinja2_breakpoints_for_file[template_lineno]
@@ -3,6 +3,7 @@ import sys
 import pydevd_vars
 from os.path import basename
 import traceback
+from _pydev_imps import _pydev_time as time
 try:
     from urllib import quote, quote_plus, unquote, unquote_plus
 except:
@@ -59,182 +60,333 @@ def print_referrers(obj, stream=None):
     return result
 
 
+#===================================================================================================
+# Limits for the searches (the heap may be huge, so, the searches must not freeze the debugged process)
+#===================================================================================================
+REFERRERS_CHUNK_SIZE = 100  # Max number of referrers in each document of iter_referrer_info.
+PATH_TO_ROOT_MAX_OBJECTS = 100000  # Max number of objects visited in find_path_to_root.
+PATH_TO_ROOT_TIMEOUT = 5.0  # Max time (in seconds) spent in find_path_to_root.
+
+
+def _get_ignore_frames():
+    '''
+    @return: dict(frame -> 1) with the frames of the debugger in the current stack (which may have references we
+        add ourselves).
+    '''
+    curr_frame = sys._getframe()
+    ignore_frames = {}  #Should be a set, but it's not available on all python versions.
+    while curr_frame is not None:
+        if basename(curr_frame.f_code.co_filename).startswith('pydev'):
+            ignore_frames[curr_frame] = 1
+        curr_frame = curr_frame.f_back
+    return ignore_frames
+
+
+def _is_ignored_frame(ignore_frames, r):
+    try:
+        return DictContains(ignore_frames, r)
+    except:
+        return False  #Ok: unhashable type checked...
+
+
+def _get_dict_owners(dicts):
+    '''
+    Computes the objects which have the given dicts as their __dict__ with a single pass over the heap (checking each
+    dict against all the objects in the heap is O(dicts * heap)).
+
+    @return: dict(id(dict) -> object whose __dict__ is that dict)
+    '''
+    owners = {}
+    if not dicts:
+        return owners
+
+    import gc
+    wanted = {}
+    for d in dicts:
+        wanted[id(d)] = d
+
+    for x in gc.get_referrers(*dicts):
+        if x.__class__ in (dict, list, tuple):
+            continue  # Can't have a __dict__ (and the arguments are also found here).
+        for r in gc.get_referents(x):
+            d = wanted.get(id(r))
+            if d is r and not DictContains(owners, id(d)):
+                try:
+                    if getattr(x, '__dict__', None) is d:
+                        owners[id(d)] = x
+                except:
+                    pass  #Just ignore any error here (i.e.: ReferenceError, etc.)
+    return owners
+
+
+def _get_found_as(r, searched_obj, frame_type):
+    '''
+    @return: how searched_obj is referenced in r (or '' if it's not known).
+    '''
+    r_type = type(r)
+    if r_type == frame_type:
+        for key, val in r.f_locals.items():
+            if val is searched_obj:
+                return key
+
+    elif r_type == dict:
+        # Check if it's a value in the dict (and under which key it was found)
+        for key, val in r.items():
+            if val is searched_obj:
+                return key
+
+    elif r_type in (tuple, list):
+        #Don't use enumerate() because not all Python versions have it.
+        i = 0
+        for x in r:
+            if x is searched_obj:
+                return '%s[%s]' % (r_type.__name__, i)
+            i += 1
+
+    else:
+        # Instances may reference the attributes directly (i.e.: when their __dict__ is not created).
+        try:
+            d = getattr(r, '__dict__', None)
+            if d is searched_obj:
+                return '__dict__'
+            if type(d) == dict:
+                for key, val in d.items():
+                    if val is searched_obj:
+                        return key
+        except:
+            pass
+    return ''
+
+
+def _var_to_xml(r, found_as, representation=None):
+    if found_as:
+        if not isinstance(found_as, str):
+            found_as = str(found_as)
+        found_as = ' found_as="%s"' % (pydevd_vars.makeValidXmlValue(found_as),)
+
+    if representation is None:
+        representation = str(type(r))
+    return pydevd_vars.varToXML(r, representation, additionalInXml=' id="%s"%s' % (id(r), found_as))
+
+
+def _for_to_xml(searched_obj, msg, add_id=True):
+    if add_id:
+        return '<for>\n%s</for>\n' % (pydevd_vars.varToXML(
+            searched_obj, msg, additionalInXml=' id="%s"' % (id(searched_obj),)),)
+    return '<for>\n%s</for>\n' % (pydevd_vars.varToXML(searched_obj, msg),)
+
+
+def _iter_referrers(searched_obj):
+    '''
+    @return: iterator(tuple(referrer, found_as)) for the referrers of the given object (dicts which are the __dict__
+        of some object are reported as that object).
+    '''
+    import gc
+    referrers = gc.get_referrers(searched_obj)
+    try:
+        frame_type = type(sys._getframe())
+
+        #Ignore this frame and any caller frame of this frame
+        ignore_frames = _get_ignore_frames()
+
+        dicts = []
+        for r in referrers:
+            if type(r) == dict:
+                dicts.append(r)
+        # Many times we find it in a dict from an instance, but with this we don't directly have the instance,
+        # only the dict (this is computed at once for all the dicts).
+        dict_owners = _get_dict_owners(dicts)
+        dicts = None
+
+        for r in referrers:
+            if r is referrers or _is_ignored_frame(ignore_frames, r):
+                continue  #Skip the references we may add ourselves
+
+            found_as = _get_found_as(r, searched_obj, frame_type)
+            if type(r) == dict:
+                r = dict_owners.get(id(r), r)
+            yield r, found_as
+    finally:
+        #Don't keep dangling references from this frame to any of our objects.
+        referrers = None
+        searched_obj = None
+        dict_owners = None
+        ignore_frames = None
+        r = None
+
+
+#===================================================================================================
+# iter_referrer_info
+#===================================================================================================
+def iter_referrer_info(searched_obj, chunk_size=REFERRERS_CHUNK_SIZE):
+    '''
+    Same as get_referrer_info, but the referrers are given incrementally: each yielded string is a complete xml with
+    the <for> and up to chunk_size referrers (so that they can be shown while they're still being computed).
+    '''
+    if searched_obj is None:
+        yield '<xml>\n%s</xml>' % (_for_to_xml(searched_obj, 'Skipping getting referrers for None'),)
+        return
+
+    try:
+        for_xml = _for_to_xml(searched_obj, 'Referrers of obj with id="%s"' % (id(searched_obj),), add_id=False)
+        ret = []
+        yielded = False
+        for r, found_as in _iter_referrers(searched_obj):
+            ret.append(_var_to_xml(r, found_as))
+            if len(ret) >= chunk_size:
+                yield '<xml>\n%s%s</xml>' % (for_xml, ''.join(ret))
+                yielded = True
+                ret = []
+        r = None
+    except:
+        traceback.print_exc()
+        r = None
+        yield '<xml>\n%s</xml>' % (_for_to_xml(searched_obj, 'Error getting referrers for:'),)
+        return
+
+    if ret or not yielded:
+        yield '<xml>\n%s%s</xml>' % (for_xml, ''.join(ret))
+
+
 #===================================================================================================
 # get_referrer_info
 #===================================================================================================
 def get_referrer_info(searched_obj):
-    DEBUG = 0
-    if DEBUG:
-        sys.stderr.write('Getting referrers info.\n')
+    if searched_obj is None:
+        return '<xml>\n%s</xml>' % (_for_to_xml(searched_obj, 'Skipping getting referrers for None'),)
+
     try:
-        try:
-            if searched_obj is None:
-                ret = ['<xml>\n']
-
-                ret.append('<for>\n')
-                ret.append(pydevd_vars.varToXML(
-                    searched_obj,
-                    'Skipping getting referrers for None',
-                    additionalInXml=' id="%s"' % (id(searched_obj),)))
-                ret.append('</for>\n')
-                ret.append('</xml>')
-                ret = ''.join(ret)
-                return ret
-
-            obj_id = id(searched_obj)
-
-            try:
-                if DEBUG:
-                    sys.stderr.write('Getting referrers...\n')
-                import gc
-                referrers = gc.get_referrers(searched_obj)
-            except:
-                traceback.print_exc()
-                ret = ['<xml>\n']
-
-                ret.append('<for>\n')
-                ret.append(pydevd_vars.varToXML(
-                    searched_obj,
-                    'Exception raised while trying to get_referrers.',
-                    additionalInXml=' id="%s"' % (id(searched_obj),)))
-                ret.append('</for>\n')
-                ret.append('</xml>')
-                ret = ''.join(ret)
-                return ret
-
-            if DEBUG:
-                sys.stderr.write('Found %s referrers.\n' % (len(referrers),))
-
-            curr_frame = sys._getframe()
-            frame_type = type(curr_frame)
-
-            #Ignore this frame and any caller frame of this frame
-
-            ignore_frames = {}  #Should be a set, but it's not available on all python versions.
-            while curr_frame is not None:
-                if basename(curr_frame.f_code.co_filename).startswith('pydev'):
-                    ignore_frames[curr_frame] = 1
-                curr_frame = curr_frame.f_back
-
-
-            ret = ['<xml>\n']
-
-            ret.append('<for>\n')
-            if DEBUG:
-                sys.stderr.write('Searching Referrers of obj with id="%s"\n' % (obj_id,))
-
-            ret.append(pydevd_vars.varToXML(
-                searched_obj,
-                'Referrers of obj with id="%s"' % (obj_id,)))
-            ret.append('</for>\n')
-
-            all_objects = None
+        ret = ['<xml>\n', _for_to_xml(searched_obj, 'Referrers of obj with id="%s"' % (id(searched_obj),), add_id=False)]
+        for r, found_as in _iter_referrers(searched_obj):
+            ret.append(_var_to_xml(r, found_as))
+        r = None
+    except:
+        traceback.print_exc()
+        r = None
+        return '<xml>\n%s</xml>' % (_for_to_xml(searched_obj, 'Error getting referrers for:'),)
+
+    ret.append('</xml>')
+    return ''.join(ret)
 
+
+#===================================================================================================
+# find_path_to_root
+#===================================================================================================
+def find_path_to_root(searched_obj, max_objects=PATH_TO_ROOT_MAX_OBJECTS, timeout=PATH_TO_ROOT_TIMEOUT):
+    '''
+    Breadth-first search over the referrers of the given object until a root (a module or a frame which is not from
+    the debugger) is found. Each level of the search is done with a single gc.get_referrers call (i.e.: a single
+    pass over the heap).
+
+    @return: tuple(path, complete) where path is a list(tuple(obj, found_as)) from the root to the object which
+        references the searched object (found_as is how the next object in the path is referenced). If no root is
+        found, the path ends at the object without referrers closest to the searched object (or is empty). complete
+        is False if the search was stopped because of max_objects or timeout.
+    '''
+    import gc
+    from types import ModuleType
+    initial_time = time.time()
+    frame_type = type(sys._getframe())
+    ignore_frames = _get_ignore_frames()
+
+    # Only ints are kept in the dicts (so that they don't appear as referrers of the visited objects).
+    visited = [searched_obj]
+    children = [-1]  # index in visited -> index (in visited) of the object it references
+    index = {id(searched_obj): 0}
+
+    root = -1
+    no_referrers = -1
+    complete = True
+    frontier = (searched_obj,)
+    try:
+        while frontier:
+            if len(visited) >= max_objects or time.time() - initial_time > timeout:
+                complete = False
+                break
+
+            frontier_index = {}
+            for x in frontier:
+                frontier_index[id(x)] = index[id(x)]
+            has_referrers = {}
+            next_frontier = []
+
+            referrers = gc.get_referrers(*frontier)
             for r in referrers:
-                try:
-                    if DictContains(ignore_frames, r):
-                        continue  #Skip the references we may add ourselves
-                except:
-                    pass  #Ok: unhashable type checked...
+                if r is frontier or r is visited or r is next_frontier or r is referrers or \
+                    _is_ignored_frame(ignore_frames, r):
+                    continue
+
+                # Which object from the frontier does it reference?
+                for x in gc.get_referents(r):
+                    j = frontier_index.get(id(x))
+                    if j is not None and visited[j] is x:
+                        break
+                else:
+                    continue
+                has_referrers[j] = 1
 
-                if r is referrers:
+                if DictContains(index, id(r)):
                     continue
+                index[id(r)] = len(visited)
+                visited.append(r)
+                children.append(j)
 
-                r_type = type(r)
-                r_id = str(id(r))
-
-                representation = str(r_type)
-
-                found_as = ''
-                if r_type == frame_type:
-                    if DEBUG:
-                        sys.stderr.write('Found frame referrer: %r\n' % (r,))
-                    for key, val in r.f_locals.items():
-                        if val is searched_obj:
-                            found_as = key
-                            break
-
-                elif r_type == dict:
-                    if DEBUG:
-                        sys.stderr.write('Found dict referrer: %r\n' % (r,))
-
-                    # Try to check if it's a value in the dict (and under which key it was found)
-                    for key, val in r.items():
-                        if val is searched_obj:
-                            found_as = key
-                            if DEBUG:
-                                sys.stderr.write('    Found as %r in dict\n' % (found_as,))
-                            break
-
-                    #Ok, there's one annoying thing: many times we find it in a dict from an instance,
-                    #but with this we don't directly have the class, only the dict, so, to workaround that
-                    #we iterate over all reachable objects ad check if one of those has the given dict.
-                    if all_objects is None:
-                        all_objects = gc.get_objects()
-
-                    for x in all_objects:
-                        try:
-                            if getattr(x, '__dict__', None) is r:
-                                r = x
-                                r_type = type(x)
-                                r_id = str(id(r))
-                                representation = str(r_type)
-                                break
-                        except:
-                            pass  #Just ignore any error here (i.e.: ReferenceError, etc.)
-
-                elif r_type in (tuple, list):
-                    if DEBUG:
-                        sys.stderr.write('Found tuple referrer: %r\n' % (r,))
-
-                    #Don't use enumerate() because not all Python versions have it.
-                    i = 0
-                    for x in r:
-                        if x is searched_obj:
-                            found_as = '%s[%s]' % (r_type.__name__, i)
-                            if DEBUG:
-                                sys.stderr.write('    Found as %s in tuple: \n' % (found_as,))
-                            break
-                        i += 1
-
-                if found_as:
-                    if not isinstance(found_as, str):
-                        found_as = str(found_as)
-                    found_as = ' found_as="%s"' % (pydevd_vars.makeValidXmlValue(found_as),)
-
-                ret.append(pydevd_vars.varToXML(
-                    r,
-                    representation,
-                    additionalInXml=' id="%s"%s' % (r_id, found_as)))
-        finally:
-            if DEBUG:
-                sys.stderr.write('Done searching for references.\n')
-
-            #If we have any exceptions, don't keep dangling references from this frame to any of our objects.
-            all_objects = None
-            referrers = None
-            searched_obj = None
-            r = None
-            x = None
-            key = None
-            val = None
-            curr_frame = None
-            ignore_frames = None
+                if type(r) == frame_type or isinstance(r, ModuleType):
+                    root = len(visited) - 1
+                    break
+                next_frontier.append(r)
+
+            if root != -1:
+                break
+
+            if no_referrers == -1:
+                for j in sorted(frontier_index.values()):
+                    if not DictContains(has_referrers, j):
+                        no_referrers = j
+                        break
+
+            frontier = tuple(next_frontier)
+            next_frontier = referrers = r = x = None
+
+        if root == -1:
+            root = no_referrers
+
+        path = []
+        i = root
+        while i > 0:
+            path.append((visited[i], _get_found_as(visited[i], visited[children[i]], frame_type)))
+            i = children[i]
+        return path, complete
+    finally:
+        #Don't keep dangling references from this frame to any of our objects.
+        visited = frontier = next_frontier = referrers = r = x = searched_obj = ignore_frames = None
+
+
+#===================================================================================================
+# get_path_to_root_info
+#===================================================================================================
+def get_path_to_root_info(searched_obj):
+    '''
+    @return: xml with the path from a root (see find_path_to_root) to the given object (in the same format of
+        get_referrer_info).
+    '''
+    try:
+        path, complete = find_path_to_root(searched_obj)
+        if not path:
+            msg = 'No referrers found for obj with id="%s"'
+        elif complete:
+            msg = 'Path to root of obj with id="%s"'
+        else:
+            msg = 'Path to root of obj with id="%s" (search limit reached)'
+
+        ret = ['<xml>\n', _for_to_xml(searched_obj, msg % (id(searched_obj),), add_id=False)]
+        for obj, found_as in path:
+            ret.append(_var_to_xml(obj, found_as))
+        path = obj = None
     except:
         traceback.print_exc()
-        ret = ['<xml>\n']
-
-        ret.append('<for>\n')
-        ret.append(pydevd_vars.varToXML(
-            searched_obj,
-            'Error getting referrers for:',
-            additionalInXml=' id="%s"' % (id(searched_obj),)))
-        ret.append('</for>\n')
-        ret.append('</xml>')
-        ret = ''.join(ret)
-        return ret
+        path = obj = None
+        return '<xml>\n%s</xml>' % (_for_to_xml(searched_obj, 'Error getting path to root for:'),)
 
     ret.append('</xml>')
-    ret = ''.join(ret)
-    return ret
-
+    return ''.join(ret)
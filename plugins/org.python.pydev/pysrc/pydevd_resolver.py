@@ -15,9 +15,24 @@ except:
 import pydevd_constants
 from pydevd_constants import DictIterItems, DictKeys, xrange
 
+try:
+    from itertools import islice
+except:
+    def islice(iterable, start, stop):
+        ret = []
+        i = 0
+        for item in iterable:
+            if i >= stop:
+                break
+            if i >= start:
+                ret.append(item)
+            i += 1
+        return ret
+
 
 # Note: 300 is already a lot to see in the outline (after that the user should really use the shell to get things)
 # and this also means we'll pass less information to the client side (which makes debugging faster).
+# The client may still ask for other pages (see getDictionaryPage).
 MAX_ITEMS_TO_HANDLE = 300 
 
 TOO_LARGE_MSG = 'Too large to show contents. Max items to show: ' + str(MAX_ITEMS_TO_HANDLE)
@@ -88,6 +103,18 @@ class AbstractResolver:
         '''
         raise NotImplementedError
 
+    def getDictionaryPage(self, var, offset, limit):
+        '''
+            Optional: resolvers for containers (whose children are its items) may implement it so that the client
+            is able to get the items in pages (only the items requested should be visited).
+
+            @param offset: the index of the first item to be returned.
+            @param limit: the maximum number of items to be returned.
+
+            @return: the same as getDictionary (with '__len__' having the total number of items).
+        '''
+        raise NotImplementedError
+
 
 #=======================================================================================================================
 # DefaultResolver
@@ -246,19 +273,21 @@ class DictResolver:
             return key
 
     def getDictionary(self, dict):
+        return self.getDictionaryPage(dict, 0, MAX_ITEMS_TO_HANDLE)
+
+    def getDictionaryPage(self, dict, offset, limit):
         ret = {}
 
-        i = 0
-        for key, val in DictIterItems(dict):
-            i += 1
+        for key, val in islice(DictIterItems(dict), offset, offset + limit):
             #we need to add the id because otherwise we cannot find the real object to get its contents later on.
             key = '%s (%s)' % (self.keyStr(key), id(key))
             ret[key] = val
-            if i > MAX_ITEMS_TO_HANDLE:
-                ret[TOO_LARGE_ATTR] = TOO_LARGE_MSG
-                break
 
-        ret['__len__'] = len(dict)
+        length = len(dict)
+        if offset + limit < length:
+            ret[TOO_LARGE_ATTR] = TOO_LARGE_MSG
+
+        ret['__len__'] = length
         # in case if the class extends built-in type and has some additional fields
         additional_fields = defaultResolver.getDictionary(dict)
         ret.update(additional_fields)
@@ -283,21 +312,28 @@ class TupleResolver: #to enumerate tuples and lists
             return getattr(var, attribute)
 
     def getDictionary(self, var):
+        return self.getDictionaryPage(var, 0, MAX_ITEMS_TO_HANDLE)
+
+    def getDictionaryPage(self, var, offset, limit):
         l = len(var)
         d = {}
 
         format_str = '%0' + str(int(len(str(l)))) + 'd'
 
-        i = 0
-        for item in var:
+        if var.__class__ in (list, tuple):
+            items = var[offset:offset + limit]
+        else:
+            items = islice(var, offset, offset + limit) #i.e.: deque or subclasses (which may not handle slices)
+
+        i = offset
+        for item in items:
             d[format_str % i] = item
             i += 1
-            
-            if i > MAX_ITEMS_TO_HANDLE:
-                d[TOO_LARGE_ATTR] = TOO_LARGE_MSG
-                break
-                
-        d['__len__'] = len(var)
+
+        if offset + limit < l:
+            d[TOO_LARGE_ATTR] = TOO_LARGE_MSG
+
+        d['__len__'] = l
         # in case if the class extends built-in type and has some additional fields
         additional_fields = defaultResolver.getDictionary(var)
         d.update(additional_fields)
@@ -329,18 +365,18 @@ class SetResolver:
         raise UnableToResolveVariableException('Unable to resolve %s in %s' % (attribute, var))
 
     def getDictionary(self, var):
+        return self.getDictionaryPage(var, 0, MAX_ITEMS_TO_HANDLE)
+
+    def getDictionaryPage(self, var, offset, limit):
         d = {}
-        i = 0
-        for item in var:
-            i+= 1
+        for item in islice(var, offset, offset + limit):
             d[id(item)] = item
-            
-            if i > MAX_ITEMS_TO_HANDLE:
-                d[TOO_LARGE_ATTR] = TOO_LARGE_MSG
-                break
 
-            
-        d['__len__'] = len(var)
+        length = len(var)
+        if offset + limit < length:
+            d[TOO_LARGE_ATTR] = TOO_LARGE_MSG
+
+        d['__len__'] = length
         # in case if the class extends built-in type and has some additional fields
         additional_fields = defaultResolver.getDictionary(var)
         d.update(additional_fields)
@@ -482,20 +518,19 @@ class MultiValueDictResolver(DictResolver):
 
         raise UnableToResolveVariableException()
 
-    def getDictionary(self, dict):
+    def getDictionaryPage(self, dict, offset, limit):
         ret = {}
-        i = 0
-        for key in DictKeys(dict):
+        for key in islice(DictKeys(dict), offset, offset + limit):
             val = dict.getlist(key)
-            i += 1
             #we need to add the id because otherwise we cannot find the real object to get its contents later on.
             key = '%s (%s)' % (self.keyStr(key), id(key))
             ret[key] = val
-            if i > MAX_ITEMS_TO_HANDLE:
-                ret[TOO_LARGE_ATTR] = TOO_LARGE_MSG
-                break
 
-        ret['__len__'] = len(dict)
+        length = len(dict)
+        if offset + limit < length:
+            ret[TOO_LARGE_ATTR] = TOO_LARGE_MSG
+
+        ret['__len__'] = length
         return ret
 
 
@@ -503,8 +538,8 @@ class MultiValueDictResolver(DictResolver):
 # DequeResolver
 #=======================================================================================================================
 class DequeResolver(TupleResolver):
-    def getDictionary(self, var):
-        d = TupleResolver.getDictionary(self, var)
+    def getDictionaryPage(self, var, offset, limit):
+        d = TupleResolver.getDictionaryPage(self, var, offset, limit)
         d['maxlen'] = getattr(var, 'maxlen', None)
         return d
 
@@ -13,6 +13,20 @@ import gc
 from pydevd_comm import CMD_SIGNATURE_CALL_TRACE, NetCommand
 import pydevd_vars
 from pydevd_constants import xrange
+from _pydev_imps import _pydev_time as time
+import _pydev_threading as threading
+
+try:
+    from types import InstanceType
+except ImportError:
+    InstanceType = None  # Python 3 has no old-style classes.
+
+# A function called with more combinations of argument types than this only has the first ones collected.
+MAX_VARIANTS_PER_FUNCTION = 32
+
+# The new signatures are sent to the IDE in batches (at most once in this interval, besides the flushes done by the
+# CheckOutputThread).
+FLUSH_INTERVAL = 0.5
 
 class Signature(object):
     def __init__(self, file, name):
@@ -29,31 +43,144 @@ class Signature(object):
         return "%s %s(%s)"%(self.file, self.name, ", ".join(self.args_str))
 
 
+def _get_arg_types(frame):
+    code = frame.f_code
+    f_locals = frame.f_locals
+    types = []
+    for i in xrange(0, code.co_argcount):
+        value = f_locals[code.co_varnames[i]]
+        tp = type(value)
+        if tp is InstanceType:  # old-style classes
+            tp = value.__class__
+        types.append(tp)
+    return tuple(types)
+
+
 class SignatureFactory(object):
-    def __init__(self):
+    '''
+    Collects the types of the arguments each function is called with. Each code object keeps the combinations of
+    types already seen (with the number of calls for each one), so, only new combinations are sent to the IDE
+    (see collect and flush) and the whole type profile may be written to a file (see dump).
+    '''
+
+    def __init__(self, max_variants=MAX_VARIANTS_PER_FUNCTION):
         self._caller_cache = {}
+        self._function_cache = {}  # code -> tuple(filename, modulename, funcname)
+        self._class_names = {}  # type -> name shown in the signature
+        self._in_scope = {}  # code -> bool
+        self._variants = {}  # code -> dict(arg types -> [Signature, calls])
+        self.max_variants = max_variants
+        self.dropped_variants = 0
+
+        self._pending = []  # new signatures not sent yet
+        self._pending_lock = threading.Lock()
+        self._last_flush = time.time()
 
     def is_in_scope(self, filename):
         return pydevd_utils.is_in_project_roots(filename)
 
+    def collect(self, frame, filename):
+        '''
+        Registers the call of the given frame.
+
+        @return: the Signature if it's a new combination of types for its function (which is then pending to be sent
+        in the next flush) or None otherwise.
+        '''
+        code = frame.f_code
+        in_scope = self._in_scope.get(code)
+        if in_scope is None:
+            in_scope = self._in_scope[code] = self.is_in_scope(filename)
+        if not in_scope:
+            return None
+
+        try:
+            types = _get_arg_types(frame)
+        except KeyError:
+            return None  # An argument was already deleted (i.e.: a generator being resumed).
+
+        variants = self._variants.get(code)
+        if variants is None:
+            variants = self._variants[code] = {}
+        else:
+            variant = variants.get(types)
+            if variant is not None:
+                variant[1] += 1
+                return None
+
+        if len(variants) >= self.max_variants:
+            self.dropped_variants += 1
+            return None
+
+        signature = self._create_signature(frame, types)
+        if signature is None:
+            return None
+        variants[types] = [signature, 1]
+
+        self._pending_lock.acquire()
+        try:
+            self._pending.append(signature)
+        finally:
+            self._pending_lock.release()
+        return signature
+
+    def flush(self, dbg, interval=0):
+        '''
+        Sends the signatures collected since the last flush (if at least interval seconds passed since then).
+        '''
+        if not self._pending or time.time() - self._last_flush < interval:
+            return
+        self._pending_lock.acquire()
+        try:
+            pending = self._pending
+            self._pending = []
+            self._last_flush = time.time()
+        finally:
+            self._pending_lock.release()
+
+        for signature in pending:
+            dbg.writer.addCommand(create_signature_message(signature))
+
+    def dump(self, filename):
+        '''
+        Writes the type profile collected to the given file: a line for each combination of types a function was called
+        with, having the file, the function, the number of calls and the arguments (separated by tabs).
+        '''
+        lines = []
+        for variants in list(self._variants.values()):
+            for signature, calls in list(variants.values()):
+                lines.append('%s\t%s\t%s\t%s\n' % (signature.file, signature.name, calls, ', '.join(signature.args_str)))
+        lines.sort()
+
+        stream = open(filename, 'w')
+        try:
+            stream.write(''.join(lines))
+        finally:
+            stream.close()
+
+    def get_class_name(self, tp):
+        try:
+            return self._class_names[tp]
+        except KeyError:
+            class_name = tp.__name__
+            if tp.__module__ and tp.__module__ != '__main__':
+                class_name = "%s.%s"%(tp.__module__, class_name)
+            self._class_names[tp] = class_name
+            return class_name
+
     def create_signature(self, frame):
+        try:
+            return self._create_signature(frame, _get_arg_types(frame))
+        except:
+            import traceback
+            traceback.print_exc()
+
+    def _create_signature(self, frame, types):
         try:
             code = frame.f_code
-            locals = frame.f_locals
             filename, modulename, funcname = self.file_module_function_of(frame)
             res = Signature(filename, funcname)
             for i in xrange(0, code.co_argcount):
-                name = code.co_varnames[i]
-                tp = type(locals[name])
-                class_name = tp.__name__
-                if class_name == 'instance':  # old-style classes
-                    tp = locals[name].__class__
-                    class_name = tp.__name__
-
-                if tp.__module__ and tp.__module__ != '__main__':
-                    class_name = "%s.%s"%(tp.__module__, class_name)
-
-                res.add_arg(name, class_name)
+                res.add_arg(code.co_varnames[i], self.get_class_name(types[i]))
             return res
         except:
             import traceback
@@ -62,9 +189,15 @@ class SignatureFactory(object):
 
     def file_module_function_of(self, frame): #this code is take from trace module and fixed to work with new-style classes
         code = frame.f_code
+        try:
+            return self._function_cache[code]
+        except KeyError:
+            pass
+
         filename = code.co_filename
         if filename:
-            modulename = trace.modname(filename)
+            # Same as trace.modname (which isn't available in newer versions of Python).
+            modulename = os.path.splitext(os.path.basename(filename))[0]
         else:
             modulename = None
 
@@ -107,7 +240,8 @@ class SignatureFactory(object):
         if clsname is not None:
             funcname = "%s.%s" % (clsname, funcname)
 
-        return filename, modulename, funcname
+        ret = self._function_cache[code] = (filename, modulename, funcname)
+        return ret
 
 def create_signature_message(signature):
     cmdTextList = ["<xml>"]
@@ -122,8 +256,42 @@ def create_signature_message(signature):
     return NetCommand(CMD_SIGNATURE_CALL_TRACE, 0, cmdText)
 
 def sendSignatureCallTrace(dbg, frame, filename):
-    if dbg.signature_factory.is_in_scope(filename):
-        dbg.writer.addCommand(create_signature_message(dbg.signature_factory.create_signature(frame)))
+    signature_factory = dbg.signature_factory
+    if signature_factory.collect(frame, filename) is not None:
+        signature_factory.flush(dbg, FLUSH_INTERVAL)
+
+
+
+
+
+def _create_call_tracer(signature_factory):
+    def trace_calls(frame, event, arg):
+        if event == 'call':
+            signature_factory.collect(frame, frame.f_code.co_filename)
+        return None  # No line tracing.
+    return trace_calls
+
 
+if __name__ == '__main__':
+    # Collects the type profile of a script without the IDE:
+    # python pydevd_signature.py <profile file> <script> [script args]
+    # Only the calls of functions in the directory of the script (and below it) are collected.
+    import sys
+    import pydev_imports
+    profile_file = sys.argv[1]
+    script = os.path.abspath(sys.argv[2])
+    del sys.argv[:2]
+    sys.path[0] = os.path.dirname(script)
 
+    script_dir = os.path.normcase(os.path.dirname(script)) + os.sep
+    factory = SignatureFactory()
+    factory.is_in_scope = lambda filename: os.path.normcase(os.path.abspath(filename)).startswith(script_dir)
 
+    tracer = _create_call_tracer(factory)
+    threading.settrace(tracer)
+    sys.settrace(tracer)
+    try:
+        pydev_imports.execfile(script, {'__name__': '__main__', '__file__': script})
+    finally:
+        sys.settrace(None)
+        factory.dump(profile_file)
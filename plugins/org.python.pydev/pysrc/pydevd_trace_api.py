@@ -10,6 +10,13 @@ def remove_exception_breakpoint(plugin, pydb, type, exception):
 def get_breakpoints(plugin, pydb):
     return None
 
+def is_plugin_code(plugin, code):
+    '''
+    Whether the frames of the given code object may have breakpoints of the plugin (can_not_skip and get_breakpoint
+    are only called for those). Called once for each code object.
+    '''
+    return True
+
 def can_not_skip(plugin, pydb, pydb_frame, frame):
     return False
 
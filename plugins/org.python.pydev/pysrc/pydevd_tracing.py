@@ -92,3 +92,72 @@ def RestoreSysSetTraceFunc():
         TracingFunctionHolder._original_tracing = None
 
     
+
+
+#=======================================================================================================================
+# Trace backends
+#=======================================================================================================================
+# The dispatch of the events of each frame (PyDBFrame) may be provided by an optional compiled module
+# (pydevd_frame_speedups: pydevd_frame.py compiled with Cython -- see setup_cython.py), which has the same semantics
+# of the pure-Python version (used when the compiled one is not available).
+#
+# The PYDEVD_TRACE_BACKEND environment variable may be used to choose it ('python' or 'cython'). The default is
+# using the compiled one if available and built from the current pydevd_frame.py (the hash of its source is embedded
+# in the compiled module as PYDEVD_FRAME_SOURCE_HASH).
+TRACE_BACKEND_PYTHON = 'python'
+TRACE_BACKEND_CYTHON = 'cython'
+
+
+def GetFrameSourceHash():
+    '''
+    @return str: the hash of pydevd_frame.py (or None if it can't be read).
+    '''
+    try:
+        import hashlib
+        f = open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pydevd_frame.py'), 'rb')
+        try:
+            return hashlib.sha1(f.read()).hexdigest()
+        finally:
+            f.close()
+    except:
+        return None
+
+
+class TraceBackendHolder:
+    '''Keeps the trace backend loaded (only computed once).
+    '''
+    backend = None
+    frame_class = None
+
+
+def _LoadTraceBackend():
+    requested = os.environ.get('PYDEVD_TRACE_BACKEND', '').strip().lower()
+
+    if requested != TRACE_BACKEND_PYTHON:
+        try:
+            from pydevd_frame_speedups import PyDBFrame, PYDEVD_FRAME_SOURCE_HASH
+        except ImportError:
+            if hasattr(sys, 'exc_clear'): #jython does not have it
+                sys.exc_clear() #don't keep the traceback
+            if requested == TRACE_BACKEND_CYTHON:
+                sys.stderr.write('pydev debugger: warning: the cython trace backend is not available (using the python one).\n')
+                sys.stderr.flush()
+        else:
+            if PYDEVD_FRAME_SOURCE_HASH == GetFrameSourceHash():
+                return TRACE_BACKEND_CYTHON, PyDBFrame
+            sys.stderr.write('pydev debugger: warning: the cython trace backend was not built from the current '
+                'pydevd_frame.py (using the python one -- rebuild it with setup_cython.py).\n')
+            sys.stderr.flush()
+
+    from pydevd_frame import PyDBFrame
+    return TRACE_BACKEND_PYTHON, PyDBFrame
+
+
+def GetTraceBackend():
+    '''
+    @return tuple(str, class): the name of the trace backend being used and the class that dispatches the events
+        for each frame (PyDBFrame).
+    '''
+    if TraceBackendHolder.backend is None:
+        TraceBackendHolder.backend, TraceBackendHolder.frame_class = _LoadTraceBackend()
+    return TraceBackendHolder.backend, TraceBackendHolder.frame_class
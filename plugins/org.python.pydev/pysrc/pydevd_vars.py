@@ -80,6 +80,27 @@ def removeAdditionalFrameById(thread_id):
     del AdditionalFramesContainer.additional_frames[thread_id]
 
 
+#===============================================================================
+# SuspendedFramesContainer
+#===============================================================================
+class SuspendedFramesContainer:
+    frames_by_id = {} #thread_id -> dict(frame_id -> frame) for the threads which are suspended
+
+
+def addSuspendedFrames(thread_id, frame):
+    ''' Registers the frames of a suspended thread (the given frame and its parents), so that findFrame doesn't
+    have to go through the whole stack at each request (must be removed when the thread is resumed). '''
+    frames_by_id = {}
+    while frame is not None:
+        frames_by_id[id(frame)] = frame
+        frame = frame.f_back
+    SuspendedFramesContainer.frames_by_id[thread_id] = frames_by_id
+
+
+def removeSuspendedFrames(thread_id):
+    DictPop(SuspendedFramesContainer.frames_by_id, thread_id, None)
+
+
 
 
 def findFrame(thread_id, frame_id):
@@ -103,6 +124,12 @@ def findFrame(thread_id, frame_id):
                 if frame is not None:
                     return frame
 
+        frames_by_id = SuspendedFramesContainer.frames_by_id.get(thread_id)
+        if frames_by_id is not None:
+            frame = frames_by_id.get(lookingFor)
+            if frame is not None:
+                return frame
+
         curFrame = GetFrame()
         if frame_id == "*":
             return curFrame  # any frame is specified with "*"
@@ -126,22 +153,8 @@ def findFrame(thread_id, frame_id):
         del curFrame
 
         if frameFound is None:
-            msgFrames = ''
-            i = 0
-
-            for frame in iterFrames(GetFrame()):
-                i += 1
-                msgFrames += str(id(frame))
-                if i % 5 == 0:
-                    msgFrames += '\n'
-                else:
-                    msgFrames += '  -  '
-
-            errMsg = '''findFrame: frame not found.
-    Looking for thread_id:%s, frame_id:%s
-    Current     thread_id:%s, available frames:
-    %s\n
-    ''' % (thread_id, lookingFor, curr_thread_id, msgFrames)
+            errMsg = 'findFrame: frame not found. Looking for thread_id:%s, frame_id:%s (available frames: %s)\n' % (
+                thread_id, lookingFor, len(iterFrames(GetFrame())))
 
             sys.stderr.write(errMsg)
             return None
@@ -228,21 +241,31 @@ def getVariable(thread_id, frame_id, scope, attrs):
     return var
 
 
-def resolveCompoundVariable(thread_id, frame_id, scope, attrs):
-    """ returns the value of the compound variable as a dictionary"""
+def _getDictionary(var, offset, limit):
+    _type, _typeName, resolver = getType(var)
+    if limit is not None and hasattr(resolver, 'getDictionaryPage'):
+        return resolver.getDictionaryPage(var, offset, limit)
+    return resolver.getDictionary(var)
+
+
+def resolveCompoundVariable(thread_id, frame_id, scope, attrs, offset=0, limit=None):
+    """ returns the value of the compound variable as a dictionary
+
+    :offset, limit: if a limit is given, only the items from offset to offset + limit are gotten (if the variable
+                    is a container whose items may be paged).
+    """
 
     var = getVariable(thread_id, frame_id, scope, attrs)
 
     try:
-        _type, _typeName, resolver = getType(var)
-        return resolver.getDictionary(var)
+        return _getDictionary(var, offset, limit)
     except:
         sys.stderr.write('Error evaluating: thread_id: %s\nframe_id: %s\nscope: %s\nattrs: %s\n' % (
             thread_id, frame_id, scope, attrs,))
         traceback.print_exc()
 
 
-def resolveVar(var, attrs):
+def resolveVar(var, attrs, offset=0, limit=None):
     attrList = attrs.split('\t')
 
     for k in attrList:
@@ -251,8 +274,7 @@ def resolveVar(var, attrs):
         var = resolver.resolve(var, k)
 
     try:
-        type, _typeName, resolver = getType(var)
-        return resolver.getDictionary(var)
+        return _getDictionary(var, offset, limit)
     except:
         traceback.print_exc()
 
@@ -265,6 +287,7 @@ def customOperation(thread_id, frame_id, scope, attrs, style, code_or_file, oper
     operation_fn_name: the name of the operation to execute after the exec (i.e.: pprint)
     """
     expressionValue = getVariable(thread_id, frame_id, scope, attrs)
+    clear_array_meta_cache(thread_id)
 
     try:
         namespace = {'__name__': '<customOperation>'}
@@ -324,6 +347,7 @@ def evaluateExpression(thread_id, frame_id, expression, doExec):
     frame = findFrame(thread_id, frame_id)
     if frame is None:
         return
+    clear_array_meta_cache(thread_id)  # the code executed may change the arrays shown
 
     #Not using frame.f_globals because of https://sourceforge.net/tracker2/?func=detail&aid=2541355&group_id=85796&atid=577329
     #(Names not resolved in generator expression in method)
@@ -362,6 +386,7 @@ def changeAttrExpression(thread_id, frame_id, attr, expression, dbg):
     frame = findFrame(thread_id, frame_id)
     if frame is None:
         return
+    clear_array_meta_cache(thread_id)  # the code executed may change the arrays shown
 
     try:
         expression = expression.replace('@LINE@', '\n')
@@ -394,10 +419,104 @@ def changeAttrExpression(thread_id, frame_id, attr, expression, dbg):
 MAXIMUM_ARRAY_SIZE = 100
 MAX_SLICE_SIZE = 1000
 
-def array_to_xml(array, roffset, coffset, rows, cols, format):
-    xml = ""
-    rows = min(rows, MAXIMUM_ARRAY_SIZE)
-    cols = min(cols, MAXIMUM_ARRAY_SIZE)
+#------------------------------------------------------------------------------------------------------ array meta cache
+# thread_id -> dict with the meta information (slice, bounds, dtype, shape) computed for the arrays shown while the
+# thread is suspended (so that it's not recomputed at each page the client asks for). It's cleared when the thread
+# is resumed or when some code is evaluated in it (as the arrays could be changed).
+_array_meta_cache = {}
+
+
+def clear_array_meta_cache(thread_id=None):
+    ''' @param thread_id: the thread whose cache should be cleared (if None, the current thread) '''
+    if thread_id is None:
+        thread_id = GetThreadId(threading.currentThread())
+    DictPop(_array_meta_cache, thread_id, None)
+
+
+def _get_cached_array_meta(array, key, compute):
+    thread_id = GetThreadId(threading.currentThread())
+    try:
+        cache = _array_meta_cache[thread_id]
+    except KeyError:
+        cache = _array_meta_cache[thread_id] = {}
+
+    key = (id(array),) + key
+    entry = cache.get(key)
+    # Note: the array is kept in the cache, so, its id can't be reused while the entry is there.
+    if entry is None or entry[0] is not array:
+        entry = cache[key] = (array, compute())
+    return entry[1]
+
+
+#------------------------------------------------------------------------------------------------------ array data
+def _format_column(values, format):
+    ''' formats all the values of a 1-dimensional column at once (falling back to formatting each value if numpy
+    isn't able to do it for the given values) '''
+    try:
+        import numpy
+        if values.ndim == 1 and values.dtype.kind != 'O':
+            return numpy.char.mod(format, values).tolist()
+    except:
+        pass
+    ret = []
+    for value in values:
+        ret.append(format % (value,))
+    return ret
+
+
+def _format_block(block, format):
+    ''' formats a 2-dimensional block at once and returns a list with the rows (each a list of strings) '''
+    try:
+        import numpy
+        if block.dtype.kind != 'O':
+            return numpy.char.mod(format, block).tolist()
+    except:
+        pass
+    ret = []
+    for row in block:
+        ret.append([format % (value,) for value in row])
+    return ret
+
+
+def _cells_to_xml(cells, rows, cols, compact, needs_quoting):
+    ''' @param cells: list with the rows (each a list with the formatted values of the row) '''
+    if compact:
+        # Row-major: the rows are separated by new lines and the values in a row by tabs (values which may contain
+        # those -- i.e.: not numbers -- are quoted).
+        lines = []
+        for row in cells:
+            if needs_quoting:
+                row = [quote(value, '/>_= ') for value in row]
+            lines.append('\t'.join(row))
+        return '<arraydata rows="%s" cols="%s" compact="True">%s</arraydata>' % (rows, cols, '\n'.join(lines))
+
+    xml = ['<arraydata rows="%s" cols="%s"/>' % (rows, cols)]
+    for row in range(rows):
+        xml.append('<row index="%s"/>' % to_string(row))
+        for value in cells[row]:
+            if value.__class__ is str:
+                # Same as varToXML(value, '') (which is too slow to be called for each value).
+                value = 'str: ' + value
+                if len(value) > MAXIMUM_VARIABLE_REPRESENTATION_SIZE:
+                    value = value[0:MAXIMUM_VARIABLE_REPRESENTATION_SIZE] + '...'
+                xml.append('<var name="" type="str" value="%s" />\n' % (makeValidXmlValue(quote(value, '/>_= ')),))
+            else:
+                xml.append(varToXML(value, ''))
+    return ''.join(xml)
+
+
+def array_to_xml(array, roffset, coffset, rows, cols, format, compact=False):
+    ''' Formats the given block of the array.
+
+    @param compact: if True, the values are sent in a single arraydata element (see _cells_to_xml), otherwise,
+        there's a var element for each value.
+    '''
+    if compact:
+        rows = min(rows, MAX_SLICE_SIZE)
+        cols = min(cols, MAX_SLICE_SIZE)
+    else:
+        rows = min(rows, MAXIMUM_ARRAY_SIZE)
+        cols = min(cols, MAXIMUM_ARRAY_SIZE)
 
 
     #there is no obvious rule for slicing (at least 5 choices)
@@ -417,30 +536,21 @@ def array_to_xml(array, roffset, coffset, rows, cols, format):
             array = array[roffset:]
             rows = min(rows, len(array))
 
-    xml += "<arraydata rows=\"%s\" cols=\"%s\"/>" % (rows, cols)
-    for row in range(rows):
-        xml += "<row index=\"%s\"/>" % to_string(row)
-        for col in range(cols):
-            value = array
-            if rows == 1 or cols == 1:
-                if rows == 1 and cols == 1:
-                    value = array[0]
-                else:
-                    if rows == 1:
-                        dim = col
-                    else:
-                        dim = row
-                    value = array[dim]
-                    if "ndarray" in str(type(value)):
-                        value = value[0]
-            else:
-                value = array[row][col]
-            value = format % value
-            xml += varToXML(value, '')
-    return xml
+    # Get the block with the values to be shown (as a rows x cols array).
+    if rows == 1 or cols == 1:
+        if array.ndim == 1:
+            block = array[:rows * cols]
+        else:
+            block = array[:rows * cols, 0]  #i.e.: the first item of each row
+        block = block.reshape((rows, cols))
+    else:
+        block = array[:rows, :cols]
 
+    cells = _format_block(block, format)
+    return _cells_to_xml(cells, rows, cols, compact, array.dtype.kind not in 'biufc')
 
-def array_to_meta_xml(array, name, format):
+
+def _compute_array_meta(array, name, format):
     type = array.dtype.kind
     slice = name
     l = len(array.shape)
@@ -502,4 +612,134 @@ def array_to_meta_xml(array, name, format):
     return array, xml, rows, cols, format
 
 
+def array_to_meta_xml(array, name, format):
+    ''' @return tuple(array slice to be shown, xml with the meta information, rows, cols, format) -- cached while
+    the thread is suspended '''
+    return _get_cached_array_meta(array, ('array', name, format), lambda: _compute_array_meta(array, name, format))
+
+
+#------------------------------------------------------------------------------------------------------ tables
+def is_table(var):
+    ''' @return whether the given variable is shown as a table (with headers for the columns): i.e.: a pandas
+    DataFrame or a numpy structured (record) array '''
+    if hasattr(var, 'iloc') and hasattr(var, 'columns') and hasattr(var, 'dtypes'):
+        return True
+    dtype = getattr(var, 'dtype', None)
+    return dtype is not None and getattr(dtype, 'names', None) is not None
+
+
+def _get_table_label(label):
+    if isinstance(label, tuple):
+        return '/'.join([str(l) for l in label])  # i.e.: MultiIndex
+    return str(label)
+
+
+def _get_table_columns(table, name):
+    ''' @return tuple(slice, num_rows, num_cols, get_column(col) -> values, get_column_label(col),
+    get_row_labels(start, end)) '''
+    if hasattr(table, 'iloc'):
+        num_rows, num_cols = table.shape
+        get_column = lambda col: table.iloc[:, col].values
+        get_column_label = lambda col: _get_table_label(table.columns[col])
+        get_row_labels = lambda start, end: [_get_table_label(label) for label in table.index[start:end]]
+        slice_format = '%s.iloc[0:%s, 0:%s]'
+    else:
+        if len(table.shape) != 1:
+            raise Exception("%s: only structured arrays with 1 dimension are supported." % name)
+        names = table.dtype.names
+        num_rows, num_cols = len(table), len(names)
+        get_column = lambda col: table[names[col]]
+        get_column_label = lambda col: names[col]
+        get_row_labels = lambda start, end: [str(i) for i in range(start, min(end, num_rows))]
+        slice_format = '%s[0:%s]'
+
+    slice = name
+    if num_rows > MAX_SLICE_SIZE or num_cols > MAX_SLICE_SIZE:
+        slice = slice_format % (name, min(num_rows, MAX_SLICE_SIZE), min(num_cols, MAX_SLICE_SIZE))
+    return (slice, min(num_rows, MAX_SLICE_SIZE), min(num_cols, MAX_SLICE_SIZE), get_column, get_column_label,
+            get_row_labels)
+
+
+def _compute_column_meta(values, format):
+    kind = values.dtype.kind
+    if kind == 'f' and format and format != '%':
+        fmt = format.replace('%', '')
+    elif kind == 'f':
+        fmt = '.5f'
+    elif kind == 'i' or kind == 'u':
+        fmt = 'd'
+    else:
+        fmt = 's'
+
+    bounds = (0, 0)
+    if kind in 'biufc' and len(values) > 0:
+        bounds = (values.min(), values.max())
+    return kind, fmt, bounds
+
+
+def table_to_xml(table, name, roffset, coffset, rows, cols, format, compact=False):
+    ''' Creates the xml for a block of a pandas DataFrame or a numpy structured array (with the meta information,
+    the column/row headers and the data). '''
+    slice, num_rows, num_cols, get_column, get_column_label, get_row_labels = _get_cached_array_meta(
+        table, ('table', name), lambda: _get_table_columns(table, name))
+
+    if rows == -1 and cols == -1:
+        rows, cols = num_rows, num_cols
+
+    max_size = MAXIMUM_ARRAY_SIZE
+    if compact:
+        max_size = MAX_SLICE_SIZE
+    rows = max(0, min(rows, max_size, num_rows - roffset))
+    cols = max(0, min(cols, max_size, num_cols - coffset))
+
+    xml = ['<array slice="%s" rows="%s" cols="%s" format="" type="" max="0" min="0"/>\n' % (
+        makeValidXmlValue(slice), num_rows, num_cols)]
+
+    xml.append('<headerdata rows="%s" cols="%s">\n' % (rows, cols))
+    columns = []
+    needs_quoting = False
+    for col in range(coffset, coffset + cols):
+        values = get_column(col)
+        kind, fmt, bounds = _get_cached_array_meta(
+            table, ('column', name, col, format), lambda: _compute_column_meta(values, format))
+        if kind not in 'biufc':
+            needs_quoting = True
+        columns.append(_format_column(values[roffset:roffset + rows], '%' + fmt))
+        xml.append('<colheader index="%s" label="%s" type="%s" format="%s" max="%s" min="%s" />\n' % (
+            col - coffset, makeValidXmlValue(get_column_label(col)), kind, fmt, bounds[1], bounds[0]))
+
+    for i, label in enumerate(get_row_labels(roffset, roffset + rows)):
+        xml.append('<rowheader index="%s" label="%s"/>\n' % (i, makeValidXmlValue(label)))
+    xml.append('</headerdata>\n')
+
+    cells = []
+    for row in range(rows):
+        cells.append([column[row] for column in columns])
+    xml.append(_cells_to_xml(cells, rows, cols, compact, needs_quoting))
+    return ''.join(xml)
+
+
+def get_array_options(scope):
+    ''' The scope of CMD_GET_ARRAY may be suffixed with ':compact' (values in a single arraydata element) and/or
+    ':table' (DataFrames/structured arrays sent with table_to_xml) -- both are opt-in for the clients which support
+    them.
+
+    @return tuple(scope, compact, table) '''
+    options = scope.split(':')
+    return options[0], 'compact' in options[1:], 'table' in options[1:]
+
+
+def array_data_to_xml(var, name, roffset, coffset, rows, cols, format, compact=False, table=False):
+    ''' @return the xml (without the enclosing xml element) for a block of the given array (or table if table=True
+    and it's a DataFrame/structured array) '''
+    if table and is_table(var):
+        return table_to_xml(var, name, roffset, coffset, rows, cols, format, compact)
+
+    var, metaxml, r, c, f = array_to_meta_xml(var, name, format)
+    if rows == -1 and cols == -1:
+        rows = r
+        cols = c
+    return metaxml + array_to_xml(var, roffset, coffset, rows, cols, '%' + f, compact)
+
+
 
@@ -26,6 +26,102 @@ class ExceptionOnEvaluate:
     def __init__(self, result):
         self.result = result
 
+
+#------------------------------------------------------------------------------------------------------ bounded repr
+# The builtin containers have their representation computed only with the items needed to fill the preview (their
+# str() is the same as their repr(), but would visit all the items -- which is slow for huge containers).
+if IS_PY3K:
+    _BOUNDED_REPR_DELIMITERS = {list: ('[', ']'), tuple: ('(', ')'), dict: ('{', '}'), set: ('{', '}'),
+                                frozenset: ('frozenset({', '})')}
+else:
+    _BOUNDED_REPR_DELIMITERS = {list: ('[', ']'), tuple: ('(', ')'), dict: ('{', '}')}
+    try:
+        _BOUNDED_REPR_DELIMITERS[set] = ('set([', '])')
+        _BOUNDED_REPR_DELIMITERS[frozenset] = ('frozenset([', '])')
+    except NameError:
+        pass  #Not available in Python 2.3/Jython 2.1
+
+_BOUNDED_REPR_MAX_LEVEL = 3
+
+# Subclasses (i.e.: OrderedDict, defaultdict, Counter, namedtuple) are shown as ClassName(<builtin repr>).
+_BOUNDED_REPR_BASES = list(_BOUNDED_REPR_DELIMITERS.keys())
+
+
+def _getBoundedReprDelimiters(v, cls):
+    '''
+    @return tuple(base, start, end) or None if v is not a builtin container (or a subclass of one)
+    '''
+    delimiters = _BOUNDED_REPR_DELIMITERS.get(cls)
+    if delimiters is not None:
+        return cls, delimiters[0], delimiters[1]
+
+    for base in _BOUNDED_REPR_BASES:
+        if isinstance(v, base):
+            name = getattr(cls, '__name__', None) or base.__name__
+            if base is tuple and hasattr(v, '_fields'):
+                return base, name + '(', ')' #namedtuple: items shown as field=value
+            start, end = _BOUNDED_REPR_DELIMITERS[base]
+            return base, name + '(' + start, end + ')'
+    return None
+
+
+def getBoundedRepr(v, max_size=MAXIMUM_VARIABLE_REPRESENTATION_SIZE, level=_BOUNDED_REPR_MAX_LEVEL):
+    ''' Similar to repr(v), but it stops visiting the items of (builtin) containers when max_size is reached (in which
+    case '...' is added -- note that the result may still be a bit larger than max_size).
+    '''
+    cls = getattr(v, '__class__', None)
+    delimiters = None
+    if v:
+        delimiters = _getBoundedReprDelimiters(v, cls)
+    if delimiters is None:
+        if cls is str:
+            v = v[:max_size] #Don't repr a huge string to use only its start.
+        r = repr(v)
+        if len(r) > max_size:
+            r = r[:max_size] + '...'
+        return r
+
+    base, start, end = delimiters
+    if level <= 0:
+        return start + '...' + end #Too deep: the items aren't visited.
+
+    is_dict = base is dict
+    fields = None
+    if is_dict:
+        items = DictIterItems(v)
+    else:
+        items = v
+        if base is tuple and cls is not tuple:
+            fields = getattr(v, '_fields', None)
+
+    pieces = [start]
+    size = len(start)
+    i = 0
+    for item in items:
+        if size >= max_size:
+            pieces.append(', ...')
+            break
+
+        if is_dict:
+            r = '%s: %s' % (getBoundedRepr(item[0], max_size - size, level - 1),
+                getBoundedRepr(item[1], max_size - size, level - 1))
+        else:
+            r = getBoundedRepr(item, max_size - size, level - 1)
+            if fields is not None and i < len(fields):
+                r = '%s=%s' % (fields[i], r)
+        i += 1
+
+        if len(pieces) > 1:
+            r = ', ' + r
+        pieces.append(r)
+        size += len(r)
+    else:
+        if base is tuple and fields is None and len(v) == 1:
+            pieces.append(',')
+
+    pieces.append(end)
+    return ''.join(pieces)
+
 #------------------------------------------------------------------------------------------------------ resolvers in map
 
 _TYPE_MAP = None
@@ -187,10 +283,7 @@ def varToXML(val, name, doTrim=True, additionalInXml=''):
                 value = pydevd_resolver.frameResolver.getFrameName(v)
                 
             elif v.__class__ in (list, tuple):
-                if len(v) > 300:
-                    value = '%s: %s' % (str(v.__class__), '<Too big to print. Len: %s>' % (len(v),))
-                else:
-                    value = '%s: %s' % (str(v.__class__), v)
+                value = '%s: %s' % (str(v.__class__), getBoundedRepr(v))
             else:
                 try:
                     cName = str(v.__class__)
@@ -204,7 +297,11 @@ def varToXML(val, name, doTrim=True, additionalInXml=''):
                         cName = cName[:-2]
                 except:
                     cName = str(v.__class__)
-                value = '%s: %s' % (cName, v)
+
+                if DictContains(_BOUNDED_REPR_DELIMITERS, v.__class__):
+                    value = '%s: %s' % (cName, getBoundedRepr(v))
+                else:
+                    value = '%s: %s' % (cName, v)
         else:
             value = str(v)
     except:
@@ -245,16 +342,13 @@ def varToXML(val, name, doTrim=True, additionalInXml=''):
     else:
         if resolver is not None:
             xmlCont = ' isContainer="True"'
+            if hasattr(resolver, 'getDictionaryPage'):
+                # The number of children is sent so that the client knows which pages it may ask for.
+                try:
+                    xmlCont += ' len="%s"' % (len(v),)
+                except:
+                    pass
         else:
             xmlCont = ''
 
     return ''.join((xml, xmlValue, xmlCont, additionalInXml, ' />\n'))
-
-if USE_PSYCO_OPTIMIZATION:
-    try:
-        import psyco
-
-        varToXML = psyco.proxy(varToXML)
-    except ImportError:
-        if hasattr(sys, 'exc_clear'): #jython does not have it
-            sys.exc_clear() #don't keep the traceback -- clients don't want to see it
@@ -0,0 +1,44 @@
+'''
+Builds the optional compiled trace backend (pydevd_frame_speedups), which is pydevd_frame.py compiled with Cython
+(so, its semantics are the same of the pure-Python version, which is used as a fallback -- see pydevd_tracing).
+
+Usage:
+    python setup_cython.py build_ext --inplace
+
+Note: it must be rebuilt whenever pydevd_frame.py changes (and for each python version used) -- the hash of the
+pydevd_frame.py it was built from is embedded in it and it's not used if that doesn't match the current one.
+'''
+import os
+import shutil
+import sys
+
+from distutils.core import setup
+from distutils.extension import Extension
+
+from Cython.Build import cythonize
+
+pysrc_dir = os.path.dirname(os.path.abspath(__file__))
+build_dir = os.path.join(pysrc_dir, 'build', 'cython')
+if not os.path.exists(build_dir):
+    os.makedirs(build_dir)
+
+sys.path.insert(0, pysrc_dir)
+from pydevd_tracing import GetFrameSourceHash
+
+# The module must be compiled with its own name (so, a copy of pydevd_frame.py is used as the source).
+pyx_file = os.path.join(build_dir, 'pydevd_frame_speedups.pyx')
+shutil.copyfile(os.path.join(pysrc_dir, 'pydevd_frame.py'), pyx_file)
+f = open(pyx_file, 'a')
+try:
+    f.write('\n\nPYDEVD_FRAME_SOURCE_HASH = %r\n' % (GetFrameSourceHash(),))
+finally:
+    f.close()
+
+os.chdir(pysrc_dir)
+setup(
+    name='pydevd_frame_speedups',
+    ext_modules=cythonize(
+        [Extension('pydevd_frame_speedups', [pyx_file])],
+        compiler_directives={'language_level': sys.version_info[0], 'binding': True},
+    ),
+)
@@ -117,6 +117,40 @@ class Test(unittest.TestCase):
         assert 'MyThread' in result
 
 
+    def testIterReferrerInfo(self):
+        contained = [1, 2]
+        containers = [[contained] for _i in range(5)]
+
+        chunks = list(pydevd_referrers.iter_referrer_info(contained, chunk_size=2))
+        assert len(chunks) >= 3
+        from xml.dom.minidom import parseString
+        found = 0
+        for chunk in chunks:
+            xml = parseString(chunk).getElementsByTagName('xml')[0]
+            assert len(xml.getElementsByTagName('for')) == 1
+            found += chunk.count('found_as="list[0]"')
+        assert found == 5, containers
+
+
+    def testPathToRoot(self):
+        container = {'key': [1]}
+
+        path, complete = pydevd_referrers.find_path_to_root(container['key'])
+        assert complete
+        assert (container, 'key') == path[-1], path
+        if len(path) > 1:
+            # Note: the frame may not be found as a referrer of its locals (i.e.: in Python 3.11).
+            assert [(sys._getframe(), 'container')] == path[:-1], path
+
+        result = pydevd_referrers.get_path_to_root_info(container['key'])
+        assert 'found_as="key"' in result
+
+        # Stopped because of the budget.
+        path, complete = pydevd_referrers.find_path_to_root(container['key'], max_objects=1)
+        assert not complete
+        assert [] == path
+
+
 if __name__ == "__main__":
     #this is so that we can run it frem the jython tests -- because we don't actually have an __main__ module
     #(so, it won't try importing the __main__ module)
@@ -0,0 +1,87 @@
+import sys
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+try:
+    import interpreterInfo
+except:
+    sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+    import interpreterInfo
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        unittest.TestCase.setUp(self)
+        self.tempdir = tempfile.mkdtemp()
+        self.index_file = os.path.join(self.tempdir, 'modules.index')
+        self.root = os.path.join(self.tempdir, 'root')
+        self.createFile('root/mod1.py')
+        self.createFile('root/pack1/__init__.py')
+        self.createFile('root/pack1/mod2.py')
+        self.createFile('root/pack1/ext%s' % interpreterInfo.getExtensionSuffixes()[0])
+        self.createFile('root/pack1/not_pack/mod3.py')
+        self.createFile('root/not-a-module.py')
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+        unittest.TestCase.tearDown(self)
+
+    def createFile(self, relative):
+        path = os.path.join(self.tempdir, *relative.split('/'))
+        if not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        open(path, 'w').close()
+
+    def getModules(self):
+        ret = {}
+        for entry in interpreterInfo.loadModulesIndex(self.index_file).values():
+            for module, f, _mtime, compiled in entry.modules:
+                ret[module] = (os.path.relpath(f, self.root), compiled)
+        return ret
+
+    def testModulesIndex(self):
+        for workers in (1, 4):
+            self.assertEqual(3, interpreterInfo.createModulesIndex([self.root], self.index_file, workers))
+            self.assertEqual({
+                'mod1': ('mod1.py', 0),
+                'pack1.mod2': (os.path.join('pack1', 'mod2.py'), 0),
+                'pack1.ext': (os.path.join('pack1', 'ext%s' % interpreterInfo.getExtensionSuffixes()[0]), 1),
+            }, self.getModules())
+
+    def testModulesIndexNestedRoots(self):
+        src = os.path.join(self.root, 'pack1', 'not_pack')
+        for _i in range(2):
+            self.assertEqual(3, interpreterInfo.createModulesIndex([self.root, src], self.index_file))
+            lines = open(self.index_file).read().splitlines()
+            self.assertEqual(1, len([line for line in lines if line.startswith('D\t%s\t' % (src,))]), lines)
+            self.assertEqual(1, len([line for line in lines if line.startswith('M\tmod3\t')]), lines)
+            self.assert_('mod3' in self.getModules())
+
+    def testModulesIndexRefresh(self):
+        interpreterInfo.createModulesIndex([self.root], self.index_file)
+        listed = []
+        original_list_dir = interpreterInfo.listDir
+        def listDir(directory):
+            listed.append(directory)
+            return original_list_dir(directory)
+        interpreterInfo.listDir = listDir
+        try:
+            interpreterInfo.createModulesIndex([self.root], self.index_file)
+            self.assertEqual([], listed)
+
+            time.sleep(.01)
+            self.createFile('root/pack1/not_pack/__init__.py')
+            os.utime(os.path.join(self.root, 'pack1', 'not_pack'), (time.time() + 5, time.time() + 5))
+            interpreterInfo.createModulesIndex([self.root], self.index_file)
+            self.assertEqual([os.path.join(self.root, 'pack1', 'not_pack')], listed)
+        finally:
+            interpreterInfo.listDir = original_list_dir
+        self.assert_('pack1.not_pack.mod3' in self.getModules())
+
+
+if __name__ == '__main__':
+    unittest.main()
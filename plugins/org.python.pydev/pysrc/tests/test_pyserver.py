@@ -49,8 +49,19 @@ if sys.platform.find('java') == -1:
     
         def setUp(self):
             unittest.TestCase.setUp(self)
+            #Don't use (nor change) the disk cache of the user.
+            import tempfile
+            self.cache_dir = tempfile.mkdtemp()
+            self.initial_cache_dir = os.environ.get('PYDEV_COMPLETION_CACHE_DIR')
+            os.environ['PYDEV_COMPLETION_CACHE_DIR'] = self.cache_dir
     
         def tearDown(self):
+            import shutil
+            if self.initial_cache_dir is None:
+                del os.environ['PYDEV_COMPLETION_CACHE_DIR']
+            else:
+                os.environ['PYDEV_COMPLETION_CACHE_DIR'] = self.initial_cache_dir
+            shutil.rmtree(self.cache_dir)
             unittest.TestCase.tearDown(self)
         
         def testMessage(self):
@@ -176,6 +187,141 @@ if sys.platform.find('java') == -1:
                 except:
                     pass
             
+        def testPipelinedRequests(self):
+            server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            server.bind((pycompletionserver.HOST, 0))
+            server.listen(1)
+
+            t = pycompletionserver.CompletionServer(server.getsockname()[1])
+            t.exit_process_on_kill = False
+            blocked = []
+            original_handle_message = t.handleMessage
+            def handleMessage(data, log):
+                if data.startswith('@@SEARCH'):
+                    blocked.append(data)
+                    import time
+                    time.sleep(.5) # Slow request which will be superseded.
+                return original_handle_message(data, log)
+            t.handleMessage = handleMessage
+            start_new_thread(t.run, ())
+
+            self.socket, _addr = server.accept()
+            try:
+                # All sent at once (and the END@@ of the last message split in another send).
+                send(self.socket, ''.join([
+                    '@@REQUEST:1:search|@@SEARCH%sEND@@' % quote_plus('inspect.ismodule'),
+                    '@@REQUEST:2|@@IMPORTS:%sEND@@' % quote_plus('math'),
+                    '@@REQUEST:3:search|@@SEARCH%sEND@@' % quote_plus('inspect.CO_NEWLOCALS'),
+                    '@@CANCEL:4END@@', # Unknown: just ignored.
+                    '@@REQUEST:5|@@CHANGE_DIR:%sEN' % quote_plus(os.path.dirname(__file__)),
+                ]))
+                send(self.socket, 'D@@')
+
+                responses = {}
+                buf = ''
+                while len(responses) < 4:
+                    m = self.socket.recv(1024 * 4)
+                    if IS_PYTHON_3K:
+                        m = m.decode('utf-8')
+                    buf += m
+                    while 'END@@' in buf:
+                        i = buf.index('END@@') + len('END@@')
+                        msg, buf = buf[:i], buf[i:]
+                        self.assert_(msg.startswith('@@RESPONSE:'), msg)
+                        request_id, response = msg[len('@@RESPONSE:'):].split('|', 1)
+                        responses[request_id] = response
+
+                self.assertEqual('@@CANCELLED_END@@', responses['1'])
+                self.assert_('@@COMPLETIONS' in responses['2'])
+                self.assert_('CO_NEWLOCALS' in responses['3'])
+                self.assertEqual('@@MSG_OK_END@@', responses['5'])
+            finally:
+                try:
+                    self.sendKillMsg(self.socket)
+                    self.socket.close()
+                    server.close()
+                except:
+                    pass
+
+        def testChangeStateIsBarrier(self):
+            t = pycompletionserver.CompletionServer(0)
+            import threading
+            import time
+            release = threading.Event()
+            handled = []
+            def handleMessage(data, log):
+                if 'slow' in data:
+                    release.wait(5)
+                handled.append(data)
+                return pycompletionserver.MSG_OK
+            t.handleMessage = handleMessage
+            responses = []
+            t.sendResponse = lambda request, msg: responses.append(request.request_id)
+
+            try:
+                t.addRequest('@@REQUEST:1|@@IMPORTS:slowEND@@')
+                t.addRequest('@@REQUEST:2|@@CHANGE_PYTHONPATH:pathEND@@')
+                t.addRequest('@@REQUEST:3|@@IMPORTS:fastEND@@')
+                time.sleep(.3)
+                # The change waits for the request received before it and the one after it waits for the change.
+                self.assertEqual([], responses)
+            finally:
+                release.set()
+
+            for _i in range(50):
+                if len(responses) == 3:
+                    break
+                time.sleep(.1)
+            t.stopWorkers()
+            self.assertEqual(['1', '2', '3'], responses)
+            self.assertEqual(['@@IMPORTS:slowEND@@', '@@CHANGE_PYTHONPATH:pathEND@@', '@@IMPORTS:fastEND@@'], handled)
+
+        def testBulkTips(self):
+            t = pycompletionserver.CompletionServer(0)
+            original_handle_message = t.handleMessage
+            def handleMessage(data, log, *args):
+                if 'inspect' in data:
+                    import time
+                    time.sleep(.5) # Over the budget.
+                return original_handle_message(data, log, *args)
+            t.handleMessage = handleMessage
+
+            results = list(t.generateTips(['inspect', 'math', 'os.path', 'math'], budget=.2))
+            self.assertEqual(['math', 'os.path', 'inspect'], sorted([name for name, _msg in results], key=len))
+            results = dict(results)
+            self.assertEqual(pycompletionserver.MSG_BULK_TIMEOUT, results['inspect'])
+            self.assert_('(pi,' in results['math'], results['math'])
+            self.assert_('(join,' in results['os.path'], results['os.path'])
+
+            sent = []
+            t.sendBulkTips('@@BULK_IMPORTS:%sEND@@' % quote_plus('math|unexistent_module'), sent.append)
+            sent.sort()
+            self.assertEqual(2, len(sent))
+            self.assert_(sent[0].startswith('@@BULK_TIP:math|@@COMPLETIONS('), sent[0])
+            self.assert_(sent[1].startswith('@@BULK_TIP:unexistent_module|@@COMPLETIONS(None,(ERROR%3A,'), sent[1])
+
+        def testBulkTipsHanging(self):
+            t = pycompletionserver.CompletionServer(0)
+            import threading
+            release = threading.Event()
+            original_handle_message = t.handleMessage
+            def handleMessage(data, log, *args):
+                if 'slow' in data:
+                    release.wait(10) # Hangs (until the end of the test).
+                return original_handle_message(data, log, *args)
+            t.handleMessage = handleMessage
+
+            import time
+            initial_time = time.time()
+            try:
+                results = dict(t.generateTips(['slow1', 'slow2', 'math'], budget=.3, workers=2))
+            finally:
+                release.set()
+            self.assert_(time.time() - initial_time < 5)
+            self.assertEqual(pycompletionserver.MSG_BULK_TIMEOUT, results['slow1'])
+            self.assertEqual(pycompletionserver.MSG_BULK_TIMEOUT, results['slow2'])
+            self.assert_('(pi,' in results['math'], results['math'])
+
         def sendKillMsg(self, socket):
             socket.send(pycompletionserver.MSG_KILL_SERVER)
 
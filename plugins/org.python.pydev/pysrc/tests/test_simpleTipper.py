@@ -25,6 +25,25 @@ if sys.platform.find('java') == -1:
 
     class Test(unittest.TestCase):
 
+        def setUp(self):
+            unittest.TestCase.setUp(self)
+            #Don't use (nor change) the disk cache of the user.
+            import tempfile
+            self.cache_dir = tempfile.mkdtemp()
+            self.initial_cache_dir = os.environ.get('PYDEV_COMPLETION_CACHE_DIR')
+            os.environ['PYDEV_COMPLETION_CACHE_DIR'] = self.cache_dir
+            _pydev_imports_tipper.ClearTipsCache()
+
+        def tearDown(self):
+            import shutil
+            if self.initial_cache_dir is None:
+                del os.environ['PYDEV_COMPLETION_CACHE_DIR']
+            else:
+                os.environ['PYDEV_COMPLETION_CACHE_DIR'] = self.initial_cache_dir
+            _pydev_imports_tipper.ClearTipsCache()
+            shutil.rmtree(self.cache_dir)
+            unittest.TestCase.tearDown(self)
+
         def p(self, t):
             for a in t:
                 sys.stdout.write('%s\n' % (a,))
@@ -183,6 +202,41 @@ if sys.platform.find('java') == -1:
             self.assert_(line > 0)
 
 
+        def testTipsCache(self):
+            cache_dir = self.cache_dir
+            f, tips = _pydev_imports_tipper.GenerateTip('os')
+            self.assert_(_pydev_imports_tipper.GenerateTip('os')[1] is tips)
+
+            #Not in memory anymore: gotten from the disk.
+            _pydev_imports_tipper.ClearTipsCache()
+            self.assertEquals(1, len(os.listdir(os.path.join(cache_dir, os.listdir(cache_dir)[0]))))
+            self.assertEquals((f, tips), _pydev_imports_tipper.GenerateTip('os'))
+
+            #Modules outside of the standard library and site-packages are not cached on disk.
+            _pydev_imports_tipper.GenerateTip('_pydev_imports_tipper')
+            self.assertEquals(1, len(os.listdir(os.path.join(cache_dir, os.listdir(cache_dir)[0]))))
+
+
+        def testCompleteInfoOnlyWhenRequested(self):
+            import types
+            mod = types.ModuleType('_pydev_tipper_big_module')
+            for i in range(1500):
+                exec('class C%s(object):\n    "doc %s"\n' % (i, i), mod.__dict__)
+            sys.modules[mod.__name__] = mod
+            try:
+                #A single request for a big module doesn't get the docs (it'd be too slow).
+                tip = _pydev_imports_tipper.GenerateTip(mod.__name__)
+                self.assertEquals(('C1', '', '', '1'), self.assertIn('C1', tip))
+
+                #A bulk request gets the complete info (which is then reused).
+                tip = _pydev_imports_tipper.GenerateTip(mod.__name__, max_complete_info=None)
+                self.assertEquals(('C1', 'doc 1', '', '1'), self.assertIn('C1', tip))
+                tip = _pydev_imports_tipper.GenerateTip(mod.__name__)
+                self.assertEquals(('C1', 'doc 1', '', '1'), self.assertIn('C1', tip))
+            finally:
+                del sys.modules[mod.__name__]
+
+
         def testDotNetLibraries(self):
             if sys.platform == 'cli':
                 tip = _pydev_imports_tipper.GenerateTip('System.Drawing')
@@ -0,0 +1,121 @@
+'''
+Benchmark for the overhead of the debugger plugins (see pydevd_plugin_utils.PluginManager): measures the time per call
+(where the plugins are asked whether the frame can be skipped) and per line executed in a function which has a
+breakpoint (so, its lines are traced and the plugins are asked for their breakpoints) with 0, 1 (django) and 2 (django
+and jinja2) active plugins with template breakpoints.
+
+Usage: python benchmark_plugins.py
+'''
+import sys
+import os
+sys.path.insert(0, os.path.split(os.path.split(os.path.abspath(__file__))[0])[0])
+
+import time
+
+import pydevd
+import pydevd_tracing
+from pydevd_breakpoints import LineBreakpoint
+from pydevd_file_utils import GetFilenameAndBase
+
+
+CALLS = 20000
+LINES = 200000
+
+
+#=======================================================================================================================
+# _NullWriter
+#=======================================================================================================================
+class _NullWriter:
+
+    def addCommand(self, cmd):
+        pass
+
+
+def _call_target(i):
+    return i + 1
+
+
+def _run_calls():
+    for i in range(CALLS):
+        _call_target(i)
+
+
+def _run_lines():
+    i = 0
+    while i < LINES:
+        i += 1
+    return i # FALSE CONDITION
+
+
+def _find_line(text):
+    f = open(os.path.abspath(__file__).replace('.pyc', '.py'), 'r')
+    try:
+        lines = f.readlines()
+    finally:
+        f.close()
+    for i, line in enumerate(lines):
+        if line.rstrip().endswith('# ' + text):
+            return i + 1
+    raise AssertionError('Unable to find: %s' % (text,))
+
+
+def _set_breakpoint(debugger):
+    filename = GetFilenameAndBase(sys._getframe())[0]
+    id_to_breakpoint = {0: LineBreakpoint(_find_line('FALSE CONDITION'), 'i < 0', 'None', None)}
+    debugger.file_to_id_to_line_breakpoint[filename] = id_to_breakpoint
+    debugger.consolidate_breakpoints(filename, id_to_breakpoint, debugger.breakpoints)
+
+
+def _add_template_breakpoint(debugger, breakpoint_type):
+    plugin = debugger.get_plugin_lazy_init()
+    template = os.path.abspath('template.html')
+    breakpoint, breakpoints = plugin.add_breakpoint(
+        'add_line_breakpoint', debugger, breakpoint_type, template, 1, None, None, None)
+    breakpoints[template] = {1: breakpoint}
+    debugger.has_plugin_line_breaks = plugin.has_line_breaks()
+
+
+def _measure(debugger, func, count):
+    if debugger is not None:
+        pydevd_tracing.SetTrace(debugger.trace_dispatch)
+    try:
+        initial_time = time.time()
+        func()
+        elapsed = time.time() - initial_time
+    finally:
+        if debugger is not None:
+            pydevd_tracing.SetTrace(None)
+    return elapsed / count
+
+
+def main():
+    debugger = pydevd.PyDB()
+    debugger.writer = _NullWriter()
+    if debugger.get_plugin_lazy_init() is None:
+        sys.stdout.write('Plugins not supported in this interpreter.\n')
+        return
+    _set_breakpoint(debugger)
+
+    scenarios = [
+        ('0 active plugins', None),
+        ('1 active plugin', 'django-line'),
+        ('2 active plugins', 'jinja2-line'),
+    ]
+
+    print('Trace backend: %s' % (pydevd_tracing.GetTraceBackend()[0],))
+    print('%25s %18s %18s' % ('scenario', 'per call (us)', 'per line (us)'))
+
+    per_call = _measure(None, _run_calls, CALLS)
+    per_line = _measure(None, _run_lines, LINES)
+    print('%25s %18.3f %18.3f' % ('untraced', per_call * 1e6, per_line * 1e6))
+
+    for name, breakpoint_type in scenarios:
+        if breakpoint_type is not None:
+            _add_template_breakpoint(debugger, breakpoint_type)
+        per_call = _measure(debugger, _run_calls, CALLS)
+        per_line = _measure(debugger, _run_lines, LINES)
+        print('%25s %18.3f %18.3f' % (name, per_call * 1e6, per_line * 1e6))
+
+
+if __name__ == '__main__':
+    main()
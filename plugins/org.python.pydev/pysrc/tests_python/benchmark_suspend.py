@@ -0,0 +1,116 @@
+'''
+Benchmark for threads suspended in PyDB.doWaitSuspend: measures the latency of a step over (from posting the
+command until the thread resumes) and the CPU used while the threads are idle (suspended) for 1, 10 and 100
+suspended threads.
+
+Usage: python benchmark_suspend.py
+'''
+import sys
+import os
+sys.path.insert(0, os.path.split(os.path.split(os.path.abspath(__file__))[0])[0])
+
+import threading
+import time
+
+import pydevd
+from pydevd_comm import GetThreadId, InternalStepThread, CMD_STEP_OVER, CMD_THREAD_SUSPEND
+from pydevd_constants import STATE_SUSPEND
+from pydevd_additional_thread_info import PyDBAdditionalThreadInfo
+
+
+IDLE_TIME = 2.
+STEPS = 20
+
+
+#=======================================================================================================================
+# _NullWriter
+#=======================================================================================================================
+class _NullWriter:
+
+    def addCommand(self, cmd):
+        pass
+
+
+#=======================================================================================================================
+# _SuspendedThread
+#=======================================================================================================================
+class _SuspendedThread(threading.Thread):
+    '''
+    Suspends itself in the debugger until finish is set (and registers when it was resumed at each step).
+    '''
+
+    def __init__(self, debugger):
+        threading.Thread.__init__(self)
+        self.setDaemon(True)
+        self.debugger = debugger
+        self.additionalInfo = PyDBAdditionalThreadInfo()
+        self.resumed = threading.Event()
+        self.resumed_at = None
+        self.finish = False
+
+    def run(self):
+        frame = sys._getframe()
+        while not self.finish:
+            self.debugger.setSuspend(self, CMD_THREAD_SUSPEND)
+            self.debugger.doWaitSuspend(self, frame, 'line', None)
+            self.resumed_at = time.time()
+            self.resumed.set()
+
+
+def _wait_suspended(threads):
+    for t in threads:
+        while t.additionalInfo.pydev_state != STATE_SUSPEND:
+            time.sleep(0.001)
+    # Give some time for the threads to actually get into the wait.
+    time.sleep(0.1)
+
+
+def _cpu_time():
+    user, system = os.times()[:2]
+    return user + system
+
+
+def run_benchmark(debugger, n_threads):
+    threads = [_SuspendedThread(debugger) for _i in range(n_threads)]
+    for t in threads:
+        t.start()
+    _wait_suspended(threads)
+
+    initial_cpu = _cpu_time()
+    time.sleep(IDLE_TIME)
+    idle_cpu = (_cpu_time() - initial_cpu) / IDLE_TIME
+
+    target = threads[0]
+    thread_id = GetThreadId(target)
+    latencies = []
+    for _i in range(STEPS):
+        _wait_suspended([target])
+        target.resumed.clear()
+        posted_at = time.time()
+        debugger.postInternalCommand(InternalStepThread(thread_id, CMD_STEP_OVER), thread_id)
+        target.resumed.wait(5.)
+        latencies.append(target.resumed_at - posted_at)
+
+    for t in threads:
+        t.finish = True
+    debugger.FinishDebuggingSession()
+    for t in threads:
+        t.join(5.)
+    debugger._finishDebuggingSession = False
+
+    latencies.sort()
+    return idle_cpu, latencies[len(latencies) // 2], latencies[-1]
+
+
+def main():
+    debugger = pydevd.PyDB()
+    debugger.writer = _NullWriter()
+
+    print('%10s %18s %20s %20s' % ('threads', 'idle cpu (%)', 'median step (ms)', 'max step (ms)'))
+    for n_threads in (1, 10, 100):
+        idle_cpu, median, maximum = run_benchmark(debugger, n_threads)
+        print('%10s %18.1f %20.2f %20.2f' % (n_threads, idle_cpu * 100, median * 1000, maximum * 1000))
+
+
+if __name__ == '__main__':
+    main()
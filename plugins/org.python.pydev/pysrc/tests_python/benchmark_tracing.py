@@ -0,0 +1,114 @@
+'''
+Benchmark for the overhead of the trace backend (see pydevd_tracing.GetTraceBackend): measures the time per call and
+per line executed with the debugger tracing with no breakpoints, with a breakpoint in another function of the same
+file and with a conditional breakpoint (whose condition is never true) in the line being executed.
+
+Usage: python benchmark_tracing.py
+
+The PYDEVD_TRACE_BACKEND environment variable may be used to choose the backend to be measured ('python' or 'cython').
+'''
+import sys
+import os
+sys.path.insert(0, os.path.split(os.path.split(os.path.abspath(__file__))[0])[0])
+
+import time
+
+import pydevd
+import pydevd_tracing
+from pydevd_breakpoints import LineBreakpoint
+from pydevd_file_utils import GetFilenameAndBase
+
+
+CALLS = 20000
+LINES = 200000
+
+
+#=======================================================================================================================
+# _NullWriter
+#=======================================================================================================================
+class _NullWriter:
+
+    def addCommand(self, cmd):
+        pass
+
+
+def _call_target(i):
+    return i + 1
+
+
+def _run_calls():
+    for i in range(CALLS):
+        _call_target(i)
+
+
+def _run_lines():
+    i = 0
+    while i < LINES:
+        i += 1 # HOT LINE
+
+
+def _other_function():
+    return None # BREAK IN OTHER FUNCTION
+
+
+def _find_line(text):
+    f = open(os.path.abspath(__file__).replace('.pyc', '.py'), 'r')
+    try:
+        lines = f.readlines()
+    finally:
+        f.close()
+    for i, line in enumerate(lines):
+        if line.rstrip().endswith('# ' + text):
+            return i + 1
+    raise AssertionError('Unable to find: %s' % (text,))
+
+
+def _set_breakpoints(debugger, line_breakpoints):
+    filename = GetFilenameAndBase(sys._getframe())[0]
+    id_to_breakpoint = {}
+    for i, breakpoint in enumerate(line_breakpoints):
+        id_to_breakpoint[i] = breakpoint
+    debugger.file_to_id_to_line_breakpoint[filename] = id_to_breakpoint
+    debugger.consolidate_breakpoints(filename, id_to_breakpoint, debugger.breakpoints)
+
+
+def _measure(debugger, func, count):
+    if debugger is not None:
+        pydevd_tracing.SetTrace(debugger.trace_dispatch)
+    try:
+        initial_time = time.time()
+        func()
+        elapsed = time.time() - initial_time
+    finally:
+        if debugger is not None:
+            pydevd_tracing.SetTrace(None)
+    return elapsed / count
+
+
+def main():
+    debugger = pydevd.PyDB()
+    debugger.writer = _NullWriter()
+
+    scenarios = [
+        ('no breakpoints', []),
+        ('break in other function', [LineBreakpoint(_find_line('BREAK IN OTHER FUNCTION'), None, 'None', None)]),
+        ('false condition', [LineBreakpoint(_find_line('HOT LINE'), 'i < 0', 'None', None)]),
+    ]
+
+    print('Trace backend: %s' % (pydevd_tracing.GetTraceBackend()[0],))
+    print('%25s %18s %18s' % ('scenario', 'per call (us)', 'per line (us)'))
+
+    # Without the debugger (so that the overhead may be compared).
+    per_call = _measure(None, _run_calls, CALLS)
+    per_line = _measure(None, _run_lines, LINES)
+    print('%25s %18.3f %18.3f' % ('untraced', per_call * 1e6, per_line * 1e6))
+
+    for name, line_breakpoints in scenarios:
+        _set_breakpoints(debugger, line_breakpoints)
+        per_call = _measure(debugger, _run_calls, CALLS)
+        per_line = _measure(debugger, _run_lines, LINES)
+        print('%25s %18.3f %18.3f' % (name, per_call * 1e6, per_line * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -48,8 +48,74 @@ class TestCase(unittest.TestCase):
         
         for i in range(times):
             self.assertEqual(times, len(info.IterFrames()))
-            
-            
+
+
+    def testGetDbFrameReusedForCode(self):
+        from pydevd_additional_thread_info import PyDBAdditionalThreadInfoWithCurrentFramesSupport
+        info = PyDBAdditionalThreadInfoWithCurrentFramesSupport()
+
+        frames = []
+        def recurse(n):
+            frames.append(sys._getframe())
+            if n > 0:
+                recurse(n - 1)
+        recurse(2)
+
+        main_debugger = Null()
+        db_frames = [info.GetDbFrame((main_debugger, '', info, Null(), frame)) for frame in frames]
+        self.assertTrue(db_frames[0] is db_frames[1] is db_frames[2])
+        self.assertTrue(db_frames[0] is not info.GetDbFrame((main_debugger, '', info, Null(), sys._getframe())))
+
+        # Not reused for another debugger.
+        self.assertTrue(db_frames[0] is not info.GetDbFrame((Null(), '', info, Null(), frames[0])))
+
+
+    def testGetDbFrameAfterReconnect(self):
+        import pydevd
+        import pydevd_tracing
+        from pydevd_breakpoints import LineBreakpoint
+        from pydevd_comm import CMD_SET_BREAK
+        from pydevd_file_utils import GetFilenameAndBase
+
+        class NullWriter:
+            def addCommand(self, cmd):
+                pass
+
+        def target():
+            a = 1
+            return a
+
+        filename = GetFilenameAndBase(sys._getframe())[0]
+        line = target.__code__.co_firstlineno + 2
+        def create_debugger():
+            debugger = pydevd.PyDB()
+            debugger.writer = NullWriter()
+            id_to_breakpoint = {0: LineBreakpoint(line, None, 'None', None)}
+            debugger.file_to_id_to_line_breakpoint[filename] = id_to_breakpoint
+            debugger.consolidate_breakpoints(filename, id_to_breakpoint, debugger.breakpoints)
+            stops = []
+            debugger.setSuspend = lambda thread, stop_reason: stops.append(stop_reason)
+            return debugger, stops
+
+        # The thread info (with its db frames) is kept when a new debugger is connected (settrace after stoptrace).
+        import pydevd_dont_trace
+        original_hook = pydevd_dont_trace.should_trace_hook
+        for _i in range(2):
+            debugger, stops = create_debugger()
+            pydevd_dont_trace.trace_filter(True)
+            pydevd_tracing.SetTrace(debugger.trace_dispatch)
+            try:
+                target()
+            finally:
+                pydevd_tracing.SetTrace(None)
+                pydevd_dont_trace.should_trace_hook = original_hook
+            self.assertEqual([CMD_SET_BREAK], stops)
+
+            # Reused for all the frames of the code: no state may be kept for a given frame.
+            db_frame = pydevd.threadingCurrentThread().additionalInfo._code_to_db_frame[target.__code__]
+            self.assertEqual(['_args'], list(db_frame.__dict__.keys()))
+
+
     def testStartNewThread(self):
         pydev_monkey.patch_thread_modules()
         try:
@@ -0,0 +1,122 @@
+import sys
+import os
+sys.path.insert(0, os.path.split(os.path.split(__file__)[0])[0])
+
+import unittest
+
+import pydevd_vars
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import pandas
+except ImportError:
+    pandas = None
+
+
+#=======================================================================================================================
+# TestArrayToXml
+#=======================================================================================================================
+class TestArrayToXml(unittest.TestCase):
+
+    def setUp(self):
+        if numpy is None:
+            self.skipTest('numpy not available')
+        pydevd_vars.clear_array_meta_cache()
+
+    def tearDown(self):
+        pydevd_vars.clear_array_meta_cache()
+
+    def testArrayToXml(self):
+        arr = numpy.arange(12).reshape((3, 4))
+        xml = pydevd_vars.array_to_xml(arr, 0, 0, 2, 2, '%d')
+        self.assertTrue(xml.startswith('<arraydata rows="2" cols="2"/><row index="0"/><var '), xml)
+        self.assertEqual(4, xml.count('<var '))
+        self.assertTrue('value="%s"' % (pydevd_vars.quote('str: 5', '/>_= '),) in xml, xml)
+
+        # 1 dimension: shown as a row.
+        xml = pydevd_vars.array_to_xml(numpy.arange(5.), 0, 1, 1, 10, '%.1f')
+        self.assertTrue(xml.startswith('<arraydata rows="1" cols="4"/>'), xml)
+        self.assertTrue(pydevd_vars.quote('str: 4.0', '/>_= ') in xml, xml)
+
+    def testCompact(self):
+        arr = numpy.arange(300 * 2).reshape((300, 2))
+        xml = pydevd_vars.array_to_xml(arr, 0, 0, 300, 2, '%d', compact=True)
+        self.assertTrue(xml.startswith('<arraydata rows="300" cols="2" compact="True">0\t1\n2\t3\n'), xml[:100])
+        self.assertTrue(xml.endswith('598\t599</arraydata>'), xml[-100:])
+
+        xml = pydevd_vars.array_to_xml(numpy.array(['a b', 'c\t']), 0, 0, 1, 2, '%s', compact=True)
+        self.assertEqual('<arraydata rows="1" cols="2" compact="True">a b\tc%09</arraydata>', xml)
+
+    def testMetaCache(self):
+        arr = numpy.arange(10)
+        meta = pydevd_vars.array_to_meta_xml(arr, 'arr', '%')
+        self.assertTrue('max="9" min="0"' in meta[1], meta[1])
+        self.assertTrue(meta is pydevd_vars.array_to_meta_xml(arr, 'arr', '%'))
+
+        arr[0] = 20
+        pydevd_vars.clear_array_meta_cache()
+        meta = pydevd_vars.array_to_meta_xml(arr, 'arr', '%')
+        self.assertTrue('max="20" min="1"' in meta[1], meta[1])
+
+    def testStructuredArray(self):
+        arr = numpy.array([(1, 2.5, 'a'), (2, 3.5, 'b')], dtype=[('x', 'i4'), ('y', 'f8'), ('name', 'S5')])
+        self.assertTrue(pydevd_vars.is_table(arr))
+        self.assertFalse(pydevd_vars.is_table(numpy.arange(3)))
+
+        xml = pydevd_vars.table_to_xml(arr, 'arr', 0, 0, -1, -1, '%', compact=True)
+        self.assertTrue('<colheader index="1" label="y" type="f" format=".5f" max="3.5" min="2.5" />' in xml, xml)
+        self.assertTrue('<rowheader index="1" label="1"/>' in xml, xml)
+        self.assertTrue('1\t2.50000\t' in xml, xml)
+
+    def testDataFrame(self):
+        if pandas is None:
+            self.skipTest('pandas not available')
+        df = pandas.DataFrame({'a': range(2000), 'b': ['s%s' % i for i in range(2000)]}, index=range(10, 2010))
+        self.assertTrue(pydevd_vars.is_table(df))
+
+        xml = pydevd_vars.table_to_xml(df, 'df', 5, 1, 3, 1, '%')
+        self.assertTrue(xml.startswith(
+            '<array slice="df.iloc[0:1000, 0:2]" rows="1000" cols="2" format="" type="" max="0" min="0"/>'), xml)
+        self.assertTrue('<colheader index="0" label="b" type="O" format="s"' in xml, xml)
+        self.assertTrue('<rowheader index="0" label="15"/>' in xml, xml)
+        self.assertTrue('<arraydata rows="3" cols="1"/>' in xml, xml)
+        self.assertEqual(3, xml.count('<var '))
+
+    def testTableIsOptIn(self):
+        self.assertEqual(('arr', False, False), pydevd_vars.get_array_options('arr'))
+        self.assertEqual(('arr', True, True), pydevd_vars.get_array_options('arr:table:compact'))
+        self.assertEqual(('arr', False, True), pydevd_vars.get_array_options('arr:table'))
+
+        arr = numpy.array([(1, 2.5), (2, 3.5)], dtype=[('x', 'i4'), ('y', 'f8')])
+        xml = pydevd_vars.array_data_to_xml(arr, 'arr', 0, 0, -1, -1, '%')
+        self.assertFalse('<headerdata' in xml, xml)
+        self.assertEqual(pydevd_vars.array_to_meta_xml(arr, 'arr', '%')[1], xml[:xml.index('<arraydata')])
+
+        xml = pydevd_vars.array_data_to_xml(arr, 'arr', 0, 0, -1, -1, '%', table=True)
+        self.assertTrue('<headerdata' in xml, xml)
+
+    def testConsoleGetArray(self):
+        from pydev_console_utils import BaseInterpreterInterface
+
+        class Interpreter(BaseInterpreterInterface):
+            def __init__(self, namespace):
+                self.namespace = namespace
+
+            def getNamespace(self):
+                return self.namespace
+
+        arr = numpy.array([(1, 2.5), (2, 3.5)], dtype=[('x', 'i4'), ('y', 'f8')])
+        interpreter = Interpreter({'arr': arr})
+        xml = interpreter.getArray('arr', 0, 0, -1, -1, '%')
+        self.assertFalse('<headerdata' in xml, xml)
+        xml = interpreter.getArray('arr', 0, 0, -1, -1, '%', ':table:compact')
+        self.assertTrue('<headerdata' in xml, xml)
+        self.assertTrue('1\t2.50000' in xml, xml)
+
+
+if __name__ == '__main__':
+    unittest.main()
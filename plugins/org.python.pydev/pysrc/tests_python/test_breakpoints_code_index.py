@@ -0,0 +1,73 @@
+import sys
+import os
+sys.path.insert(0, os.path.split(os.path.split(__file__)[0])[0])
+
+import unittest
+
+from pydevd_breakpoints import BreakpointsCodeIndex, LineBreakpoint, get_code_lines_range
+
+
+def _get_code(func):
+    try:
+        return func.func_code
+    except AttributeError:
+        return func.__code__
+
+
+def method1():
+    a = 1
+    b = 2
+    return a + b
+
+
+def method2():
+    c = 1
+    return c
+
+
+#=======================================================================================================================
+# TestBreakpointsCodeIndex
+#=======================================================================================================================
+class TestBreakpointsCodeIndex(unittest.TestCase):
+
+    def _create_index(self, *breakpoints):
+        breakpoints_for_file = {}
+        for breakpoint in breakpoints:
+            breakpoints_for_file[breakpoint.line] = breakpoint
+        return BreakpointsCodeIndex(breakpoints_for_file)
+
+    def testCodeLinesRange(self):
+        code = _get_code(method1)
+        first_line, last_line = get_code_lines_range(code)
+        self.assertEqual(code.co_firstlineno, first_line)
+        self.assertEqual(code.co_firstlineno + 3, last_line)
+
+    def testMatchLineRange(self):
+        first_line = _get_code(method1).co_firstlineno
+        index = self._create_index(LineBreakpoint(first_line + 2, None, 'None', None))
+
+        self.assert_(index.has_breakpoint(_get_code(method1)))
+        self.assert_(not index.has_breakpoint(_get_code(method2)))
+
+    def testMatchFuncName(self):
+        first_line = _get_code(method1).co_firstlineno
+        index = self._create_index(LineBreakpoint(first_line + 2, None, 'method2', None))
+
+        # The line is in method1 but the breakpoint is only for method2.
+        self.assert_(not index.has_breakpoint(_get_code(method1)))
+        self.assert_(not index.has_breakpoint(_get_code(method2)))
+
+        index = self._create_index(LineBreakpoint(first_line + 2, None, 'method1', None))
+        self.assert_(index.has_breakpoint(_get_code(method1)))
+
+    def testCached(self):
+        first_line = _get_code(method1).co_firstlineno
+        index = self._create_index(LineBreakpoint(first_line + 1, None, 'None', None))
+        code = _get_code(method1)
+
+        self.assert_(index.has_breakpoint(code))
+        self.assertEqual({code: True}, index.code_to_has_breakpoint)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -62,6 +62,13 @@ import time
 from pydev_imports import quote_plus, quote, unquote_plus
 
 
+def _get_line_with(received, text):
+    for line in received.splitlines():
+        if text in line:
+            return line
+    return received
+
+
 #=======================================================================================================================
 # ReaderThread
 #=======================================================================================================================
@@ -84,8 +91,10 @@ class ReaderThread(threading.Thread):
                 buf += l
 
                 if '\n' in buf:
-                    self.lastReceived = buf
-                    buf = ''
+                    # Keep a partial message (split among recv calls) until it's complete.
+                    i = buf.rindex('\n') + 1
+                    self.lastReceived = buf[:i]
+                    buf = buf[i:]
 
                 if SHOW_WRITES_AND_READS:
                     if last_printed != self.lastReceived.strip():
@@ -174,7 +183,7 @@ class AbstractWriterThread(threading.Thread):
                 raise AssertionError('After %s seconds, a thread was not created.' % i)
 
         # we have something like <xml><thread name="MainThread" id="12103472" /></xml>
-        splitted = self.readerThread.lastReceived.split('"')
+        splitted = _get_line_with(self.readerThread.lastReceived, '<xml><thread name="').split('"')
         threadId = splitted[3]
         return threadId
 
@@ -197,7 +206,8 @@ class AbstractWriterThread(threading.Thread):
                     (i, reason, last))
 
         # we have something like <xml><thread id="12152656" stop_reason="111"><frame id="12453120" ...
-        splitted = last.split('"')
+        # (other messages may be received along with it, so, get only its line).
+        splitted = _get_line_with(last, 'stop_reason="%s"' % reason).split('"')
         threadId = splitted[1]
         frameId = splitted[7]
         if get_line:
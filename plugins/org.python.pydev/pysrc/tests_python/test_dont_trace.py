@@ -0,0 +1,114 @@
+import sys
+import os
+sys.path.insert(0, os.path.split(os.path.split(__file__)[0])[0])
+
+import shutil
+import tempfile
+import unittest
+
+import pydevd_dont_trace
+
+
+_SOURCE = '''
+#@DontTrace
+def not_traced():
+    return sys._getframe()
+
+def traced():
+    return sys._getframe()
+
+def raises():
+    raise KeyError() #@IgnoreException
+'''
+
+
+#=======================================================================================================================
+# TestDontTrace
+#=======================================================================================================================
+class TestDontTrace(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tempdir, 'dont_trace_module.py')
+        self.write(_SOURCE)
+        self.namespace = {'sys': sys}
+        exec(compile(_SOURCE, self.filename, 'exec'), self.namespace)
+
+        self.stats = []
+        self.original_get_file_version = pydevd_dont_trace._get_file_version
+        def _get_file_version(filename):
+            self.stats.append(filename)
+            return self.original_get_file_version(filename)
+        pydevd_dont_trace._get_file_version = _get_file_version
+        pydevd_dont_trace.clear_trace_filter_cache()
+
+    def tearDown(self):
+        pydevd_dont_trace._get_file_version = self.original_get_file_version
+        pydevd_dont_trace.clear_trace_filter_cache()
+        shutil.rmtree(self.tempdir)
+
+    def write(self, contents):
+        stream = open(self.filename, 'w')
+        try:
+            stream.write(contents)
+        finally:
+            stream.close()
+
+    def testDecisionsCached(self):
+        for _i in range(10):
+            self.assertFalse(pydevd_dont_trace.default_should_trace_hook(self.namespace['not_traced'](), self.filename))
+            self.assertTrue(pydevd_dont_trace.default_should_trace_hook(self.namespace['traced'](), self.filename))
+            self.assertTrue(pydevd_dont_trace.is_exception_ignored_at(self.filename, 10))
+            self.assertFalse(pydevd_dont_trace.is_exception_ignored_at(self.filename, 9))
+        self.assertEqual([self.filename], self.stats) # Only checked once in the interval.
+
+    def testFileChanged(self):
+        self.assertTrue(pydevd_dont_trace.is_exception_ignored_at(self.filename, 10))
+
+        self.write(_SOURCE.replace('#@IgnoreException', '#Changed'))
+        os.utime(self.filename, (1, 1))
+        self.assertTrue(pydevd_dont_trace.is_exception_ignored_at(self.filename, 10)) # Not checked yet.
+
+        pydevd_dont_trace.get_file_tags(self.filename).last_check = 0
+        self.assertFalse(pydevd_dont_trace.is_exception_ignored_at(self.filename, 10))
+        self.assertEqual(2, len(self.stats))
+
+    def testDecisionNotKeptInDbFrame(self):
+        # The db frame is reused for all the frames of a code, so, it must ask the hook again at each frame.
+        import pydevd
+        import pydevd_tracing
+        from pydevd_comm import CMD_STEP_INTO
+        from pydevd_constants import Null
+
+        debugger = pydevd.PyDB()
+        debugger.writer = Null()
+        stops = []
+        debugger.setSuspend = lambda thread, stop_reason: stops.append(stop_reason)
+
+        should_trace = []
+        original_hook = pydevd_dont_trace.should_trace_hook
+        pydevd_dont_trace.should_trace_hook = lambda frame, filename: should_trace[0]
+
+        target = self.namespace['traced']
+        t = pydevd.threadingCurrentThread()
+        info = getattr(t, 'additionalInfo', None)
+        if info is None:
+            info = t.additionalInfo = pydevd.PyDBAdditionalThreadInfo()
+        info.pydev_step_cmd = CMD_STEP_INTO
+        try:
+            for trace in (False, True):
+                should_trace[:] = [trace]
+                del stops[:]
+                pydevd_tracing.SetTrace(debugger.trace_dispatch)
+                try:
+                    target()
+                finally:
+                    pydevd_tracing.SetTrace(None)
+                self.assertEqual(trace, len(stops) > 0, stops)
+        finally:
+            pydevd_dont_trace.should_trace_hook = original_hook
+            info.pydev_step_cmd = None
+
+
+if __name__ == '__main__':
+    unittest.main()
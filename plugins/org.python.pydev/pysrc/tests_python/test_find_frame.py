@@ -0,0 +1,43 @@
+import sys
+import os
+sys.path.insert(0, os.path.split(os.path.split(__file__)[0])[0])
+
+import threading
+import unittest
+
+import pydevd_vars
+from pydevd_comm import GetThreadId
+
+
+#=======================================================================================================================
+# TestFindFrame
+#=======================================================================================================================
+class TestFindFrame(unittest.TestCase):
+
+    def testFindSuspendedFrame(self):
+        thread_id = GetThreadId(threading.currentThread())
+        frames = []
+        def recurse(n):
+            frames.append(sys._getframe())
+            if n > 0:
+                recurse(n - 1)
+            else:
+                pydevd_vars.addSuspendedFrames(thread_id, sys._getframe())
+        recurse(3)
+
+        try:
+            for frame in frames:
+                self.assertTrue(frame is pydevd_vars.findFrame(thread_id, str(id(frame))))
+            self.assertEqual(4, len([f for f in pydevd_vars.SuspendedFramesContainer.frames_by_id[thread_id].values()
+                                     if f.f_code is recurse.__code__]))
+        finally:
+            pydevd_vars.removeSuspendedFrames(thread_id)
+        self.assertFalse(thread_id in pydevd_vars.SuspendedFramesContainer.frames_by_id)
+
+        # Not suspended: still found in the current stack.
+        frame = sys._getframe()
+        self.assertTrue(frame is pydevd_vars.findFrame(thread_id, str(id(frame))))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import sys
+import os
+sys.path.insert(0, os.path.split(os.path.split(__file__)[0])[0])
+
+import unittest
+
+from pydevd_breakpoints import LineBreakpoint, parse_hit_condition, parse_expression_and_hit_condition
+
+
+#=======================================================================================================================
+# TestLineBreakpoint
+#=======================================================================================================================
+class TestLineBreakpoint(unittest.TestCase):
+
+    def _get_stops(self, breakpoint, hits):
+        stops = []
+        for i in range(1, hits + 1):
+            if breakpoint.is_hit_condition_met():
+                stops.append(i)
+        return stops
+
+    def testCompiled(self):
+        breakpoint = LineBreakpoint(1, 'a == 1', 'None', 'a + 1')
+        self.assertEqual([], breakpoint.errors)
+        self.assert_(eval(breakpoint.condition_code, {}, {'a': 1}))
+        self.assertEqual(2, eval(breakpoint.expression_code, {}, {'a': 1}))
+
+    def testCompileError(self):
+        breakpoint = LineBreakpoint(1, 'a ==', 'None', None)
+        self.assertEqual(1, len(breakpoint.errors))
+        self.assert_('a ==' in breakpoint.errors[0])
+
+        # The source is kept so that the error is raised again when the breakpoint is hit.
+        self.assertEqual('a ==', breakpoint.condition_code)
+        self.assertRaises(SyntaxError, eval, breakpoint.condition_code, {}, {})
+
+    def testParseHitCondition(self):
+        self.assertEqual(('==', 3), parse_hit_condition('3'))
+        self.assertEqual(('==', 3), parse_hit_condition(' ==3 '))
+        self.assertEqual(('>=', 3), parse_hit_condition('>=3'))
+        self.assertEqual(('>', 3), parse_hit_condition('>3'))
+        self.assertEqual(('%', 3), parse_hit_condition('%3'))
+        self.assertRaises(ValueError, parse_hit_condition, '%0')
+        self.assertRaises(ValueError, parse_hit_condition, 'a')
+
+    def testParseExpressionAndHitCondition(self):
+        self.assertEqual(('a + 1', None), parse_expression_and_hit_condition(' a + 1 '))
+        self.assertEqual(('a + 1', '>=3'), parse_expression_and_hit_condition('a + 1\t>=3'))
+        self.assertEqual(('None', None), parse_expression_and_hit_condition('None\tNone'))
+        # Escaped tabs/new lines are part of the expression.
+        self.assertEqual(("'a\tb'\n'c'", None), parse_expression_and_hit_condition(
+            "'a@_@TAB_CHAR@_@b'@_@NEW_LINE_CHAR@_@'c'"))
+        self.assertEqual(("'a\tb'", '%2'), parse_expression_and_hit_condition("'a@_@TAB_CHAR@_@b'\t%2"))
+
+    def testHitCondition(self):
+        self.assertEqual([1, 2, 3], self._get_stops(LineBreakpoint(1, None, 'None', None), 3))
+        self.assertEqual([3], self._get_stops(LineBreakpoint(1, None, 'None', None, '3'), 6))
+        self.assertEqual([3, 4, 5], self._get_stops(LineBreakpoint(1, None, 'None', None, '>=3'), 5))
+        self.assertEqual([4, 5], self._get_stops(LineBreakpoint(1, None, 'None', None, '>3'), 5))
+        self.assertEqual([2, 4, 6], self._get_stops(LineBreakpoint(1, None, 'None', None, '%2'), 6))
+
+    def testInvalidHitCondition(self):
+        breakpoint = LineBreakpoint(1, None, 'None', None, '>=a')
+        self.assertEqual(1, len(breakpoint.errors))
+        self.assertEqual([1, 2], self._get_stops(breakpoint, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
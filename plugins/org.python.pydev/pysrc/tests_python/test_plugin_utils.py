@@ -0,0 +1,81 @@
+import sys
+import os
+sys.path.insert(0, os.path.split(os.path.split(__file__)[0])[0])
+
+import unittest
+
+from pydevd_plugin_utils import PluginManager
+
+
+class _Node:
+
+    def render(self, context):
+        return sys._getframe()
+
+
+def root(context):
+    return sys._getframe()
+
+
+def other():
+    return sys._getframe()
+
+
+#=======================================================================================================================
+# TestPluginManager
+#=======================================================================================================================
+class TestPluginManager(unittest.TestCase):
+
+    def setUp(self):
+        self.plugin_manager = PluginManager(None)
+        self.plugins = dict((plugin.__name__.split('.')[-1], plugin) for plugin in self.plugin_manager.plugins)
+
+    def testCodePlugins(self):
+        plugin_manager = self.plugin_manager
+        django, jinja2 = self.plugins['django_debug'], self.plugins['jinja2_debug']
+        plugin_manager.activate(django)
+        self.assertEqual((django,), plugin_manager.get_code_plugins(_Node.render.__code__))
+        self.assertEqual((), plugin_manager.get_code_plugins(root.__code__))
+
+        plugin_manager.activate(jinja2)
+        self.assertEqual((django,), plugin_manager.get_code_plugins(_Node.render.__code__))
+        self.assertEqual((jinja2,), plugin_manager.get_code_plugins(root.__code__))
+        self.assertEqual((), plugin_manager.get_code_plugins(other.__code__))
+
+    def testOnlyInterestedPluginsCalled(self):
+        plugin_manager = self.plugin_manager
+        called = []
+        class Plugin:
+            def __init__(self, name, is_plugin_code):
+                self.name = name
+                self.is_plugin_code = lambda plugin, code: is_plugin_code(code)
+
+            def can_not_skip(self, plugin, pydb, pydb_frame, frame):
+                called.append(self.name)
+                return False
+
+            def get_breakpoint(self, plugin, pydb, pydb_frame, frame, event, args):
+                called.append(self.name)
+                return (self.name == 'hit', self.name, frame, self.name)
+
+        plugin_manager.active_plugins = [
+            Plugin('miss', lambda code: True),
+            Plugin('hit', lambda code: code.co_name == 'root'),
+        ]
+        plugin_manager.rebind_methods()
+
+        frame = other()
+        self.assertFalse(plugin_manager.can_not_skip(None, None, frame))
+        self.assertEqual('miss', plugin_manager.get_breakpoint(None, None, frame, 'line', None)[1])
+        self.assertEqual(['miss', 'miss'], called)
+
+        del called[:]
+        frame = root(None)
+        self.assertFalse(plugin_manager.can_not_skip(None, None, frame))
+        # The plugin which hit the breakpoint has precedence.
+        self.assertEqual('hit', plugin_manager.get_breakpoint(None, None, frame, 'line', None)[1])
+        self.assertEqual(['miss', 'hit', 'miss', 'hit'], called)
+
+
+if __name__ == '__main__':
+    unittest.main()
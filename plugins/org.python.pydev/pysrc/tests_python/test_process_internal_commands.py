@@ -0,0 +1,118 @@
+import sys
+import os
+sys.path.insert(0, os.path.split(os.path.split(__file__)[0])[0])
+
+import threading
+import unittest
+
+import pydevd
+from pydevd_comm import GetThreadId, InternalThreadCommand, CMD_THREAD_CREATE, CMD_THREAD_KILL
+
+
+#=======================================================================================================================
+# _ListWriter
+#=======================================================================================================================
+class _ListWriter:
+
+    def __init__(self):
+        self.commands = []
+
+    def addCommand(self, cmd):
+        self.commands.append(cmd)
+
+
+#=======================================================================================================================
+# _InternalCommandForTests
+#=======================================================================================================================
+class _InternalCommandForTests(InternalThreadCommand):
+
+    def __init__(self, thread_id, executed_by):
+        self.thread_id = thread_id
+        self.executed_by = executed_by
+
+    def canBeExecutedBy(self, thread_id):
+        return self.thread_id == '*' or InternalThreadCommand.canBeExecutedBy(self, thread_id)
+
+    def doIt(self, dbg):
+        self.executed_by.append((self.thread_id, GetThreadId(threading.currentThread())))
+
+
+#=======================================================================================================================
+# TestProcessInternalCommands
+#=======================================================================================================================
+class TestProcessInternalCommands(unittest.TestCase):
+
+    def setUp(self):
+        self.debugger = pydevd.PyDB()
+        self.debugger.writer = _ListWriter()
+
+    def testOnlyCommandsForCurrentThread(self):
+        executed_by = []
+        curr_thread_id = GetThreadId(threading.currentThread())
+        self.debugger.postInternalCommand(_InternalCommandForTests('other', executed_by), 'other')
+        self.debugger.postInternalCommand(_InternalCommandForTests(curr_thread_id, executed_by), curr_thread_id)
+        self.debugger.postInternalCommand(_InternalCommandForTests('*', executed_by), '*')
+
+        self.debugger.processInternalCommands()
+        self.assertEqual([(curr_thread_id, curr_thread_id), ('*', curr_thread_id)], executed_by)
+
+        # The command for the other thread is still there (and '*' was executed only once).
+        self.debugger.processInternalCommands()
+        self.assertEqual(2, len(executed_by))
+        self.assertEqual(1, self.debugger.getInternalQueue('other').qsize())
+
+    def testThreadCreatedAndFinished(self):
+        t = threading.currentThread()
+        thread_id = GetThreadId(t)
+        self.debugger.notifyThreadCreated(t)
+        self.debugger.notifyThreadCreated(t)
+        self.debugger.processThreadNotAlive(thread_id)
+        self.debugger.processThreadNotAlive(thread_id)
+
+        self.assertEqual([CMD_THREAD_CREATE, CMD_THREAD_KILL], [cmd.id for cmd in self.debugger.writer.commands])
+
+    def testThreadFinishedWhileUpdatingThreadsAlive(self):
+        finish = threading.Event()
+        finished = threading.Event()
+        exit = threading.Event()
+
+        def run():
+            t = threading.currentThread()
+            self.debugger.notifyThreadCreated(t)
+            pydevd._thread_local_info.thread_and_info = (t, t.additionalInfo)
+            finish.wait()
+            self.debugger.notifyCurrentThreadFinished()  # as done by pydev_monkey right before the thread finishes
+            finished.set()
+            exit.wait()
+
+        t = threading.Thread(target=run)
+        t.start()
+
+        # The thread finishes after being enumerated as alive (but before it's checked in updateThreadsAlive).
+        original_enumerate = pydevd.threadingEnumerate
+        def threadingEnumerate():
+            threads = original_enumerate()
+            finish.set()
+            finished.wait()
+            return threads
+
+        pydevd.threadingEnumerate = threadingEnumerate
+        try:
+            self.debugger.updateThreadsAlive()
+        finally:
+            pydevd.threadingEnumerate = original_enumerate
+            exit.set()
+            t.join()
+
+        thread_id = GetThreadId(t)
+        commands = [(cmd.id, cmd.text) for cmd in self.debugger.writer.commands if thread_id in cmd.text]
+        self.assertEqual([CMD_THREAD_CREATE, CMD_THREAD_KILL], [cmd_id for cmd_id, _text in commands], commands)
+
+        # Once it's not enumerated anymore it's also no longer kept.
+        self.debugger.updateThreadsAlive()
+        self.assertFalse(thread_id in self.debugger._finished_thread_ids)
+        self.assertEqual(2, len([cmd for cmd in self.debugger.writer.commands if thread_id in cmd.text]))
+
+
+if __name__ == '__main__':
+    unittest.main()
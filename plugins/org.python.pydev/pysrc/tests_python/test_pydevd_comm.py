@@ -0,0 +1,181 @@
+import sys
+import os
+sys.path.insert(0, os.path.split(os.path.split(__file__)[0])[0])
+
+import socket
+import struct
+import time
+import unittest
+
+from pydevd_constants import IS_PY3K
+from pydevd_comm import NetCommand, ReaderThread, WriterThread, FRAME_HEADER_FORMAT, FRAME_HEADER_SIZE, \
+    PROTOCOL_FRAMED, CMD_THREAD_CREATE, CMD_VERSION, CMD_EXIT, CMD_GET_REFERRERS, CMD_GET_REFERRERS_CHUNK, \
+    InternalGetReferrers, NetCommandFactory, VERSION_STRING
+import pydevd_referrers
+import pydevd_vars
+
+try:
+    from urllib import unquote_plus
+except ImportError:
+    from urllib.parse import unquote_plus  #@UnresolvedImport
+
+
+def _to_bytes(s):
+    if IS_PY3K:
+        return s.encode('utf-8')
+    return s
+
+
+#=======================================================================================================================
+# _ReaderThreadForTests
+#=======================================================================================================================
+class _ReaderThreadForTests(ReaderThread):
+
+    def __init__(self):
+        ReaderThread.__init__(self, None)
+        self.received = []
+
+    def processCommand(self, cmd_id, seq, text):
+        self.received.append((cmd_id, seq, text))
+        if cmd_id == CMD_VERSION and text == 'FRAMED':
+            self.setProtocol(PROTOCOL_FRAMED)
+
+
+#=======================================================================================================================
+# TestPydevdComm
+#=======================================================================================================================
+class TestPydevdComm(unittest.TestCase):
+
+    def _read_all(self, sock):
+        received = []
+        while True:
+            r = sock.recv(1024)
+            if not r:
+                break
+            received.append(r)
+        return _to_bytes('').join(received)
+
+    def testWriter(self):
+        if not hasattr(socket, 'socketpair'):
+            return
+        write_sock, read_sock = socket.socketpair()
+
+        writer = WriterThread(write_sock)
+        writer.addCommand(NetCommand(CMD_THREAD_CREATE, 2, 'a b'))
+        writer.setProtocolAfterPendingCommands(PROTOCOL_FRAMED)
+        writer.addCommand(NetCommand(CMD_THREAD_CREATE, 4, 'c\td'))
+        writer.addCommand(NetCommand(CMD_EXIT, 6, ''))
+        writer.start()
+        writer.join(5)
+        write_sock.close()
+
+        data = self._read_all(read_sock)
+        read_sock.close()
+
+        line, data = data.split(_to_bytes('\n'), 1)
+        self.assertEqual(_to_bytes('103\t2\ta b'), line)
+
+        cmd_id, seq, size = struct.unpack(FRAME_HEADER_FORMAT, data[:FRAME_HEADER_SIZE])
+        self.assertEqual((103, 4, 3), (cmd_id, seq, size))
+        data = data[FRAME_HEADER_SIZE:]
+        self.assertEqual(_to_bytes('c\td'), data[:size])
+        data = data[size:]
+
+        self.assertEqual((CMD_EXIT, 6, 0), struct.unpack(FRAME_HEADER_FORMAT, data))
+
+    def testReader(self):
+        reader = _ReaderThreadForTests()
+        utf8 = _to_bytes('\xc3\xa1')
+        if IS_PY3K:
+            utf8 = '\xe1'.encode('utf-8')
+
+        data = _to_bytes('111\t1\tfile\tline\n501\t3\tFRAMED\n') + \
+            struct.pack(FRAME_HEADER_FORMAT, 113, 5, 2 + len(utf8)) + _to_bytes('a\n') + utf8
+
+        # Feed it in parts (so, the new line and the frame are split among different chunks).
+        consumed, needed = reader.processCommands(data[:10])
+        self.assertEqual((0, -1), (consumed, needed))
+
+        consumed, needed = reader.processCommands(data[:-1])
+        self.assertEqual(len(data) - FRAME_HEADER_SIZE - 2 - len(utf8), consumed)
+        self.assertEqual(FRAME_HEADER_SIZE + 2 + len(utf8), needed)
+
+        data = data[consumed:]
+        consumed, needed = reader.processCommands(data)
+        self.assertEqual((len(data), FRAME_HEADER_SIZE), (consumed, needed))
+
+        self.assertEqual(3, len(reader.received))
+        self.assertEqual((111, 1, 'file\tline'), reader.received[0])
+        self.assertEqual((501, 3, 'FRAMED'), reader.received[1])
+        self.assertEqual((113, 5, _to_bytes('a\n') + utf8), (reader.received[2][0], reader.received[2][1],
+            reader.received[2][2].encode('utf-8')))
+
+    def testGetReferrers(self):
+        class Writer:
+            def __init__(self):
+                self.commands = []
+            def addCommand(self, cmd):
+                self.commands.append(cmd)
+
+        class Debugger:
+            def __init__(self):
+                self.writer = Writer()
+                self.cmdFactory = NetCommandFactory()
+
+        contained = [1]
+        containers = [[contained] for _i in range(5)]
+        original_chunk_size = pydevd_referrers.REFERRERS_CHUNK_SIZE
+        original_get_variable = pydevd_vars.getVariable
+        pydevd_vars.getVariable = lambda thread_id, frame_id, scope, attrs: contained
+        try:
+            pydevd_referrers.REFERRERS_CHUNK_SIZE = 2
+            dbg = Debugger()
+            InternalGetReferrers(7, 'referrers', 'thread', 'frame', 'FRAME', 'contained').doIt(dbg)
+
+            dbg_path = Debugger()
+            InternalGetReferrers(8, 'path_to_root', 'thread', 'frame', 'FRAME', 'contained').doIt(dbg_path)
+        finally:
+            pydevd_vars.getVariable = original_get_variable
+            pydevd_referrers.REFERRERS_CHUNK_SIZE = original_chunk_size
+
+        # Each chunk in its own message and the last one finishing the command.
+        commands = dbg.writer.commands
+        self.assert_(len(commands) >= 3, commands)
+        self.assertEqual([CMD_GET_REFERRERS_CHUNK] * (len(commands) - 1) + [CMD_GET_REFERRERS],
+            [cmd.id for cmd in commands])
+        self.assertEqual([7] * len(commands), [cmd.seq for cmd in commands])
+        found = 0
+        for cmd in commands:
+            text = unquote_plus(cmd.text)
+            self.assert_(text.startswith('<xml>') and text.endswith('</xml>'), text)
+            found += text.count('found_as="list[0]"')
+        self.assertEqual(5, found, containers)
+
+        self.assertEqual([CMD_GET_REFERRERS], [cmd.id for cmd in dbg_path.writer.commands])
+        self.assert_('Path to root' in unquote_plus(dbg_path.writer.commands[0].text))
+
+    def testVersionTraceBackend(self):
+        import pydevd
+        import pydevd_tracing
+
+        class Writer:
+            def __init__(self):
+                self.commands = []
+            def addCommand(self, cmd):
+                self.commands.append(cmd)
+
+        dbg = pydevd.PyDB()
+        dbg.writer = Writer()
+        dbg.processNetCommand(CMD_VERSION, 1, '1.1\tUNIX\tLINE')
+        dbg.processNetCommand(CMD_VERSION, 3, '1.1\tUNIX\tLINE\tQUOTED')
+        dbg.processNetCommand(CMD_VERSION, 5, '1.1\tUNIX\tLINE\tQUOTED\tTRACE_BACKEND')
+
+        # The answer is only the version unless the trace backend is explicitly requested.
+        self.assertEqual(
+            [(CMD_VERSION, 1, VERSION_STRING), (CMD_VERSION, 3, VERSION_STRING),
+             (CMD_VERSION, 5, VERSION_STRING + '\t' + pydevd_tracing.GetTraceBackend()[0])],
+            [(cmd.id, cmd.seq, cmd.text) for cmd in dbg.writer.commands])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import sys
+import os
+sys.path.insert(0, os.path.split(os.path.split(__file__)[0])[0])
+
+import unittest
+
+import pydevd_resolver
+import pydevd_vars
+import pydevd_xml
+from pydevd_resolver import TOO_LARGE_ATTR
+
+
+#=======================================================================================================================
+# TestResolverPaging
+#=======================================================================================================================
+class TestResolverPaging(unittest.TestCase):
+
+    def testTuplePage(self):
+        lst = list(range(1000))
+        d = pydevd_resolver.tupleResolver.getDictionaryPage(lst, 990, 20)
+        self.assertEqual(1000, d['__len__'])
+        self.assertTrue(TOO_LARGE_ATTR not in d)
+        self.assertEqual(990, d['0990'])
+        self.assertEqual(999, pydevd_resolver.tupleResolver.resolve(lst, '0999'))
+        self.assertEqual(10, len([k for k in d if k.isdigit()]))
+
+        d = pydevd_resolver.tupleResolver.getDictionary(lst)
+        self.assertEqual('0000', sorted(k for k in d if k.isdigit())[0])
+        self.assertEqual(pydevd_resolver.MAX_ITEMS_TO_HANDLE, len([k for k in d if k.isdigit()]))
+        self.assertTrue(TOO_LARGE_ATTR in d)
+
+    def testDictAndSetPage(self):
+        dct = dict((i, str(i)) for i in range(1000))
+        d = pydevd_resolver.dictResolver.getDictionaryPage(dct, 100, 50)
+        self.assertEqual(1000, d['__len__'])
+        values = [v for k, v in d.items() if '(' in k]
+        self.assertEqual(50, len(values))
+        key = [k for k in d if '(' in k][0]
+        self.assertEqual(d[key], pydevd_resolver.dictResolver.resolve(dct, key))
+
+        d = pydevd_resolver.setResolver.getDictionaryPage(set(range(1000)), 0, 10)
+        self.assertEqual(1000, d['__len__'])
+        self.assertEqual(10, len([k for k in d if k not in ('__len__', TOO_LARGE_ATTR)]))
+
+    def testResolveVarWithPage(self):
+        d = pydevd_vars.resolveVar({'lst': list(range(100))}, 'lst', 95, 10)
+        self.assertEqual([95, 96, 97, 98, 99], sorted(d[k] for k in d if k.isdigit()))
+
+    def testBoundedRepr(self):
+        for v in ([1, (2,), {'a': 'b'}, set([1]), frozenset()], (), {}, 'str'):
+            self.assertEqual(repr(v), pydevd_xml.getBoundedRepr(v))
+
+        r = pydevd_xml.getBoundedRepr(list(range(1000000)), 100)
+        self.assertTrue(r.endswith(', ...]'), r)
+        self.assertTrue(len(r) < 120, r)
+
+        # Containers too deep aren't visited and the representation of the other items is truncated.
+        self.assertEqual('[[[[...]]]]', pydevd_xml.getBoundedRepr([[[[0] * 3000000]]]))
+        self.assertEqual("{'a': {'b': {'c': {...}}}}", pydevd_xml.getBoundedRepr({'a': {'b': {'c': {'d': 1}}}}))
+
+        class Big(object):
+            def __repr__(self):
+                return 'x' * 1000000
+        r = pydevd_xml.getBoundedRepr([Big()], 100)
+        self.assertTrue(r.endswith('...]'), r)
+        self.assertTrue(len(r) < 120, r)
+
+        xml = pydevd_xml.varToXML(dict.fromkeys(range(1000000)), 'd')
+        self.assertTrue(' len="1000000"' in xml, xml)
+        self.assertTrue(len(xml) < 5000)
+
+    def testBoundedReprSubclasses(self):
+        import collections
+
+        class OrderedDictWithRepr(collections.OrderedDict):
+            def __repr__(self):
+                raise AssertionError('Should not be called for a big container.')
+
+        d = OrderedDictWithRepr((i, i) for i in range(1000000))
+        r = pydevd_xml.getBoundedRepr(d, 100)
+        self.assertTrue(r.startswith('OrderedDictWithRepr({0: 0, 1: 1, '), r)
+        self.assertTrue(r.endswith(', ...})'), r)
+        self.assertTrue(len(r) < 120, r)
+
+        r = pydevd_xml.getBoundedRepr(collections.OrderedDict((i, i) for i in range(1000000)), 100)
+        self.assertTrue(r.startswith('OrderedDict({0: 0, '), r)
+        self.assertTrue(len(r) < 120, r)
+
+        self.assertEqual("defaultdict({'a': [1]})", pydevd_xml.getBoundedRepr(collections.defaultdict(list, a=[1])))
+        self.assertEqual('OrderedDict()', pydevd_xml.getBoundedRepr(collections.OrderedDict()))
+
+        Point = collections.namedtuple('Point', 'x y')
+        self.assertEqual('Point(x=1, y=2)', pydevd_xml.getBoundedRepr(Point(1, 2)))
+        r = pydevd_xml.getBoundedRepr(Point(1, list(range(1000000))), 100)
+        self.assertTrue(r.startswith('Point(x=1, y=[0, 1, '), r)
+        self.assertTrue(r.endswith(', ...])'), r)
+
+
+if __name__ == '__main__':
+    unittest.main()
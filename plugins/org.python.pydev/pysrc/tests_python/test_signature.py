@@ -0,0 +1,88 @@
+import sys
+import os
+sys.path.insert(0, os.path.split(os.path.split(__file__)[0])[0])
+
+import tempfile
+import unittest
+
+import pydevd_signature
+from pydevd_comm import CMD_SIGNATURE_CALL_TRACE
+
+
+class _Writer:
+
+    def __init__(self):
+        self.commands = []
+
+    def addCommand(self, cmd):
+        self.commands.append(cmd)
+
+
+class _Debugger:
+
+    def __init__(self):
+        self.writer = _Writer()
+
+
+class _Collected:
+
+    def method(self, a, b=None):
+        return sys._getframe()
+
+
+#=======================================================================================================================
+# TestSignature
+#=======================================================================================================================
+class TestSignature(unittest.TestCase):
+
+    def testCollectNewVariantsOnly(self):
+        factory = pydevd_signature.SignatureFactory(max_variants=3)
+        factory.is_in_scope = lambda filename: True
+        obj = _Collected()
+
+        signature = factory.collect(obj.method(1), __file__)
+        self.assertEqual('_Collected.method', signature.name)
+        # Note: no module prefix for classes in __main__ (i.e.: when this file is run directly).
+        collected_name = (__name__ == '__main__' and '_Collected') or '%s._Collected' % (__name__,)
+        int_name, none_name = factory.get_class_name(int), factory.get_class_name(type(None))
+        self.assertEqual(['self:' + collected_name, 'a:' + int_name, 'b:' + none_name], signature.args_str)
+        for _i in range(10):
+            self.assertTrue(factory.collect(obj.method(2), __file__) is None)
+
+        self.assertTrue(factory.collect(obj.method('a', 1), __file__) is not None)
+        self.assertTrue(factory.collect(obj.method('a', 1.0), __file__) is not None)
+        self.assertTrue(factory.collect(obj.method(1.0), __file__) is None) # Over max_variants.
+        self.assertEqual(1, factory.dropped_variants)
+
+        dbg = _Debugger()
+        factory.flush(dbg)
+        self.assertEqual(3, len(dbg.writer.commands))
+        self.assertEqual(CMD_SIGNATURE_CALL_TRACE, dbg.writer.commands[0].id)
+        factory.flush(dbg)
+        self.assertEqual(3, len(dbg.writer.commands))
+
+        fd, profile = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            factory.dump(profile)
+            lines = open(profile).read().splitlines()
+        finally:
+            os.remove(profile)
+        self.assertEqual(3, len(lines))
+        self.assertTrue('%s\t_Collected.method\t11\tself:%s, a:%s, b:%s' % (
+            obj.method(1).f_code.co_filename, collected_name, int_name, none_name) in lines, lines)
+
+    def testNotInScope(self):
+        factory = pydevd_signature.SignatureFactory()
+        scopes = []
+        def is_in_scope(filename):
+            scopes.append(filename)
+            return False
+        factory.is_in_scope = is_in_scope
+        for _i in range(3):
+            self.assertTrue(factory.collect(_Collected().method(1), __file__) is None)
+        self.assertEqual([__file__], scopes)
+
+
+if __name__ == '__main__':
+    unittest.main()
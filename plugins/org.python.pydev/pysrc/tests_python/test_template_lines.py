@@ -0,0 +1,92 @@
+import sys
+import os
+sys.path.insert(0, os.path.split(os.path.split(__file__)[0])[0])
+
+import tempfile
+import unittest
+
+from pydevd_plugins import django_debug, jinja2_debug
+
+
+class _Frame:
+
+    def __init__(self, f_globals, f_lineno):
+        self.f_globals = f_globals
+        self.f_lineno = f_lineno
+
+
+class _Jinja2Template:
+
+    def __init__(self, _debug_info):
+        self._debug_info = _debug_info
+        self.debug_info_accesses = 0
+
+    def _get_debug_info(self):
+        self.debug_info_accesses += 1
+        return [tuple(map(int, x.split('='))) for x in self._debug_info.split('&')]
+
+    debug_info = property(_get_debug_info)
+
+
+#=======================================================================================================================
+# TestTemplateLines
+#=======================================================================================================================
+class TestTemplateLines(unittest.TestCase):
+
+    def testDjangoOffsetToLine(self):
+        text = 'a\nbc\r\nd\re\n\nf'
+        expected = [1, 1, 2, 2, 2, 3, 3, 3, 4, 4, 5, 6, 6]
+        self.assertEqual(expected, [django_debug._offset_to_line_number(text, i) for i in range(len(text) + 1)])
+        self.assertEqual(-1, django_debug._offset_to_line_number(text, len(text) + 1))
+
+    def testDjangoTemplateLinesCached(self):
+        fd, filename = tempfile.mkstemp()
+        os.close(fd)
+        reads = []
+        original_read_file = django_debug._read_file
+        def _read_file(f):
+            reads.append(f)
+            return original_read_file(f)
+        django_debug._read_file = _read_file
+        try:
+            stream = open(filename, 'w')
+            stream.write('line1\n{% block %}\nline3\n')
+            stream.close()
+            for _i in range(5):
+                self.assertEqual(2, django_debug._get_template_offset_line(filename, 6))
+                self.assertEqual(3, django_debug._get_template_offset_line(filename, 18))
+            self.assertEqual(1, len(reads))
+
+            stream = open(filename, 'w')
+            stream.write('\nline1\n{% block %}\nline3\n')
+            stream.close()
+            os.utime(filename, (1, 1))
+            self.assertEqual(3, django_debug._get_template_offset_line(filename, 7))
+            self.assertEqual(2, len(reads))
+        finally:
+            django_debug._read_file = original_read_file
+            os.remove(filename)
+
+    def testDjangoInheritsCached(self):
+        class Node(object):
+            pass
+        class IfNode(Node):
+            pass
+        self.assertTrue(django_debug._inherits(IfNode, 'Node'))
+        self.assertFalse(django_debug._inherits(IfNode, 'BaseContext'))
+        self.assertTrue(django_debug._inherits_cache[(IfNode, ('Node',))])
+
+    def testJinja2TemplateLine(self):
+        template = _Jinja2Template('1=8&3=12&4=12')
+        for _i in range(3):
+            self.assertEqual(1, jinja2_debug._get_jinja2_template_line(_Frame({'__jinja_template__': template}, 8)))
+            self.assertEqual(3, jinja2_debug._get_jinja2_template_line(_Frame({'__jinja_template__': template}, 12)))
+            self.assertEqual(None, jinja2_debug._get_jinja2_template_line(_Frame({'__jinja_template__': template}, 9)))
+        self.assertEqual(1, template.debug_info_accesses)
+
+        self.assertEqual(None, jinja2_debug._get_jinja2_template_line(_Frame({'__jinja_template__': _Jinja2Template('')}, 1)))
+        self.assertEqual(None, jinja2_debug._get_jinja2_template_line(_Frame({}, 1)))
+
+
+if __name__ == '__main__':
+    unittest.main()
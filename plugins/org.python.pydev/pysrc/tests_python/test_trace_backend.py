@@ -0,0 +1,54 @@
+import sys
+import os
+sys.path.insert(0, os.path.split(os.path.split(__file__)[0])[0])
+
+import types
+import unittest
+
+import pydevd_tracing
+from pydevd_frame import PyDBFrame
+
+
+class _CompiledPyDBFrame:
+    pass
+
+
+#=======================================================================================================================
+# TestTraceBackend
+#=======================================================================================================================
+class TestTraceBackend(unittest.TestCase):
+
+    def setUp(self):
+        self._original_stderr = sys.stderr
+        self._original_backend = os.environ.pop('PYDEVD_TRACE_BACKEND', None)
+        from pydev_imports import StringIO
+        sys.stderr = StringIO()
+
+    def tearDown(self):
+        sys.stderr = self._original_stderr
+        sys.modules.pop('pydevd_frame_speedups', None)
+        os.environ.pop('PYDEVD_TRACE_BACKEND', None)
+        if self._original_backend is not None:
+            os.environ['PYDEVD_TRACE_BACKEND'] = self._original_backend
+
+    def _set_compiled(self, source_hash):
+        module = types.ModuleType('pydevd_frame_speedups')
+        module.PyDBFrame = _CompiledPyDBFrame
+        module.PYDEVD_FRAME_SOURCE_HASH = source_hash
+        sys.modules['pydevd_frame_speedups'] = module
+
+    def testCompiledUsed(self):
+        self._set_compiled(pydevd_tracing.GetFrameSourceHash())
+        self.assertEqual((pydevd_tracing.TRACE_BACKEND_CYTHON, _CompiledPyDBFrame), pydevd_tracing._LoadTraceBackend())
+
+        os.environ['PYDEVD_TRACE_BACKEND'] = 'python'
+        self.assertEqual((pydevd_tracing.TRACE_BACKEND_PYTHON, PyDBFrame), pydevd_tracing._LoadTraceBackend())
+
+    def testStaleCompiledNotUsed(self):
+        self._set_compiled('stale')
+        self.assertEqual((pydevd_tracing.TRACE_BACKEND_PYTHON, PyDBFrame), pydevd_tracing._LoadTraceBackend())
+        self.assert_('not built from the current pydevd_frame.py' in sys.stderr.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+'''
+Benchmark for the transport of the notifications of the test runner: sends NOTIFICATIONS notifyStartTest/notifyTest
+pairs (each notifyTest with OUTPUT_SIZE bytes of captured output) through pydev_runfiles_xml_rpc (as done when running
+the tests for the IDE) and measures the wall-clock time until all were received by a server which uses xml-rpc
+(as the IDE does) and by a server which receives them through a persistent socket (see pydev_runfiles_stream).
+
+Usage: python benchmark_notifications.py [notifications]
+'''
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.split(os.path.split(os.path.abspath(__file__))[0])[0])
+
+import pydev_localhost
+import pydev_runfiles_stream
+import pydev_runfiles_xml_rpc
+from pydev_imports import SimpleXMLRPCServer
+
+NOTIFICATIONS = 20000
+OUTPUT_SIZE = 1024
+
+
+class Receiver:
+
+    def __init__(self, expected):
+        self.expected = expected
+        self.received = 0
+        self.finished = threading.Event()
+
+    def notifyCommands(self, commands):
+        for command in commands:
+            self.on_notification(command[0], command[1])
+        return True
+
+    def on_notification(self, method, args):
+        if method == 'notifyTest':
+            self.received += 1
+            if self.received == self.expected:
+                self.finished.set()
+
+
+def _send(notifications, port, stream_port):
+    pydev_runfiles_xml_rpc._ServerHolder.SERVER = None
+    pydev_runfiles_xml_rpc.InitializeServer(port, daemon=True, stream_port=stream_port)
+    output = 'x' * (OUTPUT_SIZE - 1) + '\n'
+    for i in range(notifications):
+        test = 'Test.test%s' % (i,)
+        pydev_runfiles_xml_rpc.notifyStartTest('benchmark_test.py', test)
+        pydev_runfiles_xml_rpc.notifyTest('ok', output, '', 'benchmark_test.py', test, '0.001')
+
+
+def run_xml_rpc(notifications):
+    receiver = Receiver(notifications)
+    server = SimpleXMLRPCServer((pydev_localhost.get_localhost(), 0), logRequests=False)
+    server.register_function(receiver.notifyCommands)
+    server.register_function(lambda *args: True, 'notifyConnected')
+    thread = threading.Thread(target=server.serve_forever)
+    thread.setDaemon(True)
+    thread.start()
+
+    initial_time = time.time()
+    _send(notifications, server.socket.getsockname()[1], None)
+    receiver.finished.wait()
+    elapsed = time.time() - initial_time
+    server.shutdown()
+    return elapsed
+
+
+def run_stream(notifications):
+    receiver = Receiver(notifications)
+    notifications_receiver = pydev_runfiles_stream.NotificationsReceiver(receiver.on_notification)
+    notifications_receiver.start()
+
+    initial_time = time.time()
+    #The xml-rpc port is not used as the connection to the stream port succeeds.
+    _send(notifications, 1, notifications_receiver.port)
+    receiver.finished.wait()
+    return time.time() - initial_time
+
+
+def main():
+    notifications = NOTIFICATIONS
+    if len(sys.argv) > 1:
+        notifications = int(sys.argv[1])
+
+    print('%s tests (with %s bytes of output each)' % (notifications, OUTPUT_SIZE))
+    print('%10s %10s' % ('transport', 'time (s)'))
+    print('%10s %10.2f' % ('xml-rpc', run_xml_rpc(notifications)))
+    print('%10s %10.2f' % ('stream', run_stream(notifications)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+'''
+Benchmark for the scheduling of the tests in pydev_runfiles_parallel: creates synthetic test modules (many fast modules
+and a slow module whose name makes it be found last) and measures the wall-clock time to run them with each
+split_jobs mode, without any history of durations and after a previous run (which is when the batches which should
+take longer are run first and split_jobs=auto is able to create batches with about the same duration).
+
+Afterwards, the test modules are changed to import a dependency which takes HEAVY_IMPORT_CPU_TIME seconds of cpu to be
+imported and the time with a process for each job is compared with --zygote=true (where the modules are imported once
+and the process is then forked for each job).
+
+Usage: python benchmark_parallel.py [jobs]
+'''
+import sys
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+RUNFILES = os.path.join(os.path.split(os.path.split(os.path.abspath(__file__))[0])[0], 'runfiles.py')
+
+FAST_MODULES = 8
+FAST_TESTS_PER_MODULE = 5
+FAST_TEST_DURATION = 0.1
+SLOW_TESTS_DURATIONS = [2.0, 1.5, 0.1, 0.1, 0.1]
+
+SPLITS = ['module', 'tests', 'auto']
+
+HEAVY_IMPORT_CPU_TIME = 0.5
+HEAVY_MODULE = '''
+import time
+try:
+    cpu_time = time.process_time
+except AttributeError:
+    cpu_time = time.clock
+end = cpu_time() + %s
+while cpu_time() < end:
+    pass
+''' % (HEAVY_IMPORT_CPU_TIME,)
+
+
+def _create_module(directory, module_name, durations, imports=()):
+    contents = ['import time', 'import unittest'] + ['import %s' % (imp,) for imp in imports]
+    contents.extend(['', 'class Test(unittest.TestCase):', ''])
+    for i, duration in enumerate(durations):
+        contents.append('    def test%s(self):' % (i,))
+        contents.append('        time.sleep(%s)' % (duration,))
+        contents.append('')
+    f = open(os.path.join(directory, module_name + '.py'), 'w')
+    try:
+        f.write('\n'.join(contents))
+    finally:
+        f.close()
+
+
+def _create_tests(directory, imports=()):
+    for i in range(FAST_MODULES):
+        _create_module(directory, 'fast%s_test' % (i,), [FAST_TEST_DURATION] * FAST_TESTS_PER_MODULE, imports)
+    _create_module(directory, 'z_slow_test', SLOW_TESTS_DURATIONS, imports)
+
+
+def _run(directory, jobs, split, durations_file, zygote=False, pythonpath=None):
+    env = os.environ.copy()
+    env['PYDEV_RUNFILES_DURATIONS_FILE'] = durations_file
+    if pythonpath:
+        env['PYTHONPATH'] = pythonpath
+    args = [sys.executable, RUNFILES, '--verbosity=0', '--jobs=%s' % (jobs,), '--split_jobs=%s' % (split,),
+        '--zygote=%s' % (zygote,), directory]
+    initial_time = time.time()
+    process = subprocess.Popen(args, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    process.communicate()
+    return time.time() - initial_time
+
+
+def main():
+    jobs = 4
+    if len(sys.argv) > 1:
+        jobs = int(sys.argv[1])
+
+    directory = tempfile.mkdtemp()
+    try:
+        tests_dir = os.path.join(directory, 'tests')
+        os.mkdir(tests_dir)
+        _create_tests(tests_dir)
+
+        total = FAST_MODULES * FAST_TESTS_PER_MODULE * FAST_TEST_DURATION + sum(SLOW_TESTS_DURATIONS)
+        print('Jobs: %s -- sum of the durations of the tests: %.2fs (ideal: %.2fs)' % (
+            jobs, total, max(total / jobs, max(SLOW_TESTS_DURATIONS))))
+        print('%10s %18s %18s' % ('split', 'no history (s)', 'with history (s)'))
+        for split in SPLITS:
+            durations_file = os.path.join(directory, 'durations_%s' % (split,))
+            without_history = _run(tests_dir, jobs, split, durations_file)
+            with_history = _run(tests_dir, jobs, split, durations_file)
+            print('%10s %18.2f %18.2f' % (split, without_history, with_history))
+
+        deps_dir = os.path.join(directory, 'deps')
+        os.mkdir(deps_dir)
+        f = open(os.path.join(deps_dir, 'heavy_dependency.py'), 'w')
+        try:
+            f.write(HEAVY_MODULE)
+        finally:
+            f.close()
+        _create_tests(tests_dir, imports=['heavy_dependency'])
+
+        print('')
+        print('Test modules importing a dependency which takes %.2fs of cpu (split_jobs=auto, with history)' % (
+            HEAVY_IMPORT_CPU_TIME,))
+        durations_file = os.path.join(directory, 'durations_auto')
+        for zygote in (False, True):
+            elapsed = _run(tests_dir, jobs, 'auto', durations_file, zygote, deps_dir)
+            print('%10s %18.2f' % ('zygote=%s' % (zygote,), elapsed))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
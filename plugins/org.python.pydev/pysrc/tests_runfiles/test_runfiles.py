@@ -185,6 +185,20 @@ class RunfilesTest(unittest.TestCase):
     def test_finding_modules_from_import_strings(self):
         self.assertEquals(1, len(self.modules) > 0)
 
+    def test_modules_cache_shared_by_runners(self):
+        modules_cache = {}
+        runner = pydev_runfiles.PydevTestRunner(pydev_runfiles.Configuration(files_or_dirs=self.file_dir), modules_cache)
+        modules = runner.find_modules_from_files(self.files)
+        self.assertEquals(len(modules), len(modules_cache))
+
+        # Another runner with the same cache gets the cached modules (in the order of the files asked).
+        runner = pydev_runfiles.PydevTestRunner(pydev_runfiles.Configuration(files_or_dirs=self.file_dir), modules_cache)
+        files = self.files[::-1]
+        modules_cache[files[0]] = (files[0], 'cached', 'cached')
+        modules = runner.find_modules_from_files(files)
+        self.assertEquals((files[0], 'cached', 'cached'), modules[0])
+        self.assertEquals(len(modules_cache), len(modules))
+
     def test_finding_tests_when_no_filter(self):
         # unittest.py will create a TestCase with 0 tests in it
         # since it just imports what is given
@@ -298,7 +312,10 @@ class RunfilesTest(unittest.TestCase):
         )
 
     def test_xml_rpc_communication(self):
+        import pydev_runfiles_parallel
         notifications = []
+        # Durations are recorded as done in pydev_runfiles_parallel.CommunicationThread.notifyTest (never saved).
+        durations = pydev_runfiles_parallel.TestDurations(tempfile.mktemp())
         class Server:
 
             def __init__(self, notifications):
@@ -330,6 +347,7 @@ class RunfilesTest(unittest.TestCase):
                 if error_contents:
                     error_contents = error_contents.splitlines()[-1].strip()
                 self.notifications.append(('notifyTest', cond, captured_output.strip(), error_contents, file, test))
+                durations.AddDuration(file + '|' + test, time)
 
             def notifyTestRunFinished(self, total_time):
                 self.notifications.append(('notifyTestRunFinished',))
@@ -405,6 +423,10 @@ class RunfilesTest(unittest.TestCase):
                 expected,
                 notifications
             )
+
+            # The duration is also available for the failed test.
+            self.assert_(durations.GetDuration(simple_test + '|SampleTest.test_xxxxxx1') is not None)
+            self.assert_(durations.GetDuration(simple_test + '|SampleTest.test_xxxxxx2') is not None)
         finally:
             pydevd_io.EndRedirect()
         b = buf.getvalue()
@@ -413,6 +435,272 @@ class RunfilesTest(unittest.TestCase):
         else:
             self.assert_(b.find('Ran 6 tests in ') != -1, 'Found: ' + b)
 
+    def test_parallel_batches_from_durations(self):
+        import pydev_runfiles_parallel
+        durations_file = tempfile.mktemp()
+        try:
+            durations = pydev_runfiles_parallel.TestDurations(durations_file)
+            durations.AddDuration('slow.py|T.test1', '3.00')
+            durations.AddDuration('slow.py|T.test2', 1.0)
+            durations.AddDuration('fast.py|T.test1', 0.5)
+            durations.Save()
+
+            durations = pydev_runfiles_parallel.TestDurations(durations_file)
+            self.assertEqual(3.0, durations.GetDuration('slow.py|T.test1'))
+            # Unknown test: mean of the module (or the default if the module isn't known).
+            self.assertEqual([2.0, pydev_runfiles_parallel.DEFAULT_TEST_DURATION],
+                durations.EstimateDurations(['slow.py|T.test3', 'new.py|T.test1']))
+
+            test_ids = ['fast.py|T.test1', 'slow.py|T.test2', 'slow.py|T.test1']
+            self.assertEqual([['slow.py|T.test2', 'slow.py|T.test1'], ['fast.py|T.test1']],
+                pydev_runfiles_parallel.CreateBatches(test_ids, 2, 'module', durations))
+            self.assertEqual([['slow.py|T.test1'], ['slow.py|T.test2'], ['fast.py|T.test1']],
+                pydev_runfiles_parallel.CreateBatches(test_ids, 2, 'tests', durations))
+
+            # auto: the slow module is split and all the tests are in some batch.
+            batches = pydev_runfiles_parallel.CreateBatches(test_ids, 2, 'auto', durations)
+            self.assertEqual(['slow.py|T.test1'], batches[0])
+            self.assertEqual(sorted(test_ids), sorted([test_id for batch in batches for test_id in batch]))
+        finally:
+            if os.path.exists(durations_file):
+                os.remove(durations_file)
+
+    def test_paths_trie(self):
+        trie = pydev_runfiles._PathsTrie()
+        for path in ['.a.b', '.a', '.a.bc', '', '.a.b']:
+            trie.add(path)
+        self.assertEqual(['c.d', 'b.c.d', 'a.b.c.d', 'c.d'], trie.get_import_choices('.a.b.c.d'))
+        self.assertEqual(['bc.x', 'x', 'a.bc.x'], trie.get_import_choices('.a.bc.x'))
+        self.assertEqual([], trie.get_import_choices('rel.x'))
+
+    def test_discovery_cache(self):
+        import pydev_runfiles_discovery
+        import shutil
+        import time
+        root = tempfile.mkdtemp()
+        cache_file = tempfile.mktemp()
+        try:
+            def create(path, contents=''):
+                f = open(os.path.join(root, path), 'w')
+                try:
+                    f.write(contents)
+                finally:
+                    f.close()
+            os.mkdir(os.path.join(root, 'pkg'))
+            os.mkdir(os.path.join(root, 'not_pkg'))
+            create('pkg/__init__.py')
+            create('pkg/a_test.py', 'import unittest\nclass ATest(unittest.TestCase):\n    def test_a(self):\n        pass\n')
+            create('not_pkg/b_test.py')
+            create('c_test.py', 'from base import *\n')
+            create('d_test.py', 'import unittest\nclass DTest(unittest.TestCase):\n    def test_d(self):\n        pass\n')
+
+            cache = pydev_runfiles_discovery.DiscoveryCache(cache_file)
+            walked = []
+            for directory, files in cache.Walk(root):
+                walked.extend([os.path.join(directory, f) for f in files])
+            self.assert_(os.path.join(root, 'pkg', 'a_test.py') in walked)
+            self.assert_(os.path.join(root, 'not_pkg', 'b_test.py') not in walked)
+
+            CouldHaveTests = pydev_runfiles_discovery.CouldHaveTests
+            a_tests = cache.GetStaticTests(os.path.join(root, 'pkg', 'a_test.py'))
+            self.assertEqual(['test_a'], a_tests['classes']['ATest'])
+            self.assert_(CouldHaveTests(a_tests, ['ATest.test_a']))
+            self.assert_(not CouldHaveTests(a_tests, ['DTest']))
+            self.assert_(not CouldHaveTests(a_tests, ['ATest.test_b']))
+            self.assert_(CouldHaveTests(cache.GetStaticTests(os.path.join(root, 'c_test.py')), ['DTest']))
+
+            old = time.time() - 10
+            for path in [root, os.path.join(root, 'pkg'), os.path.join(root, 'pkg', 'a_test.py')]:
+                os.utime(path, (old, old))
+            cache = pydev_runfiles_discovery.DiscoveryCache(cache_file)
+            cache.Walk(root)
+            cache.GetStaticTests(os.path.join(root, 'pkg', 'a_test.py'))
+            cache.Save()
+
+            # Unchanged entries are reused in the next run (the changed file is parsed again).
+            cache = pydev_runfiles_discovery.DiscoveryCache(cache_file)
+            cache.directories[root][2].append('cached_test.py')
+            create('pkg/a_test.py', 'import unittest\nclass ATest(unittest.TestCase):\n    def test_b(self):\n        pass\n')
+            os.utime(os.path.join(root, 'pkg', 'a_test.py'), (old, old + 1))
+            self.assert_('cached_test.py' in cache.ListDirectory(root)[0])
+            self.assertEqual(['test_b'], cache.GetStaticTests(os.path.join(root, 'pkg', 'a_test.py'))['classes']['ATest'])
+
+            # With --tests, only the files which may have the tests are imported.
+            os.environ['PYDEV_RUNFILES_DISCOVERY_CACHE'] = cache_file
+            try:
+                runner = pydev_runfiles.PydevTestRunner(pydev_runfiles.Configuration(
+                    files_or_dirs=[root], tests=['DTest'], discovery_cache=True))
+                files = [os.path.basename(f) for f in runner.find_import_files()]
+            finally:
+                del os.environ['PYDEV_RUNFILES_DISCOVERY_CACHE']
+            files.sort()
+            self.assertEqual(['c_test.py', 'd_test.py'], files)
+        finally:
+            shutil.rmtree(root)
+            if os.path.exists(cache_file):
+                os.remove(cache_file)
+
+    def test_affected_tests(self):
+        import pydev_runfiles_affected
+        import shutil
+        root = tempfile.mkdtemp()
+        db_file = tempfile.mktemp()
+        sys.path.insert(0, root)
+        try:
+            def create(name, contents):
+                f = open(os.path.join(root, name), 'w')
+                try:
+                    f.write(contents)
+                finally:
+                    f.close()
+            create('affected_dep.py', 'def dep():\n    return 1\n')
+            create('affected_other.py', 'def other():\n    return 1\n')
+            test_file = os.path.join(root, 'affected_test.py')
+            create('affected_test.py', '')
+            import affected_dep
+            import affected_other
+
+            affected_tests = pydev_runfiles_affected.AffectedTests(db_file)
+            self.assert_(affected_tests.IsStale())
+            if hasattr(sys, 'gettrace') and sys.gettrace() is not None:
+                return # Dependencies are not recorded when something else is tracing (i.e.: coverage).
+
+            affected_tests.StartTest()
+            affected_dep.dep()
+            affected_tests.StopTest(test_file + '|T.test_dep', test_file, True)
+            affected_tests.StartTest()
+            affected_tests.StopTest(test_file + '|T.test_fail', test_file, False)
+            affected_tests.Save()
+
+            affected_tests = pydev_runfiles_affected.AffectedTests(db_file)
+            self.assert_(not affected_tests.IsStale())
+            self.assert_(not affected_tests.IsAffected(test_file + '|T.test_dep'))
+            self.assert_(affected_tests.IsAffected(test_file + '|T.test_fail'))
+            self.assert_(affected_tests.IsAffected(test_file + '|T.test_new'))
+
+            create('affected_other.py', 'def other():\n    return 2\n')
+            affected_tests = pydev_runfiles_affected.AffectedTests(db_file)
+            self.assert_(not affected_tests.IsAffected(test_file + '|T.test_dep'))
+
+            create('affected_dep.py', 'def dep():\n    return 2\n')
+            affected_tests = pydev_runfiles_affected.AffectedTests(db_file)
+            self.assert_(affected_tests.IsAffected(test_file + '|T.test_dep'))
+        finally:
+            sys.path.remove(root)
+            for module_name in ('affected_dep', 'affected_other'):
+                if module_name in sys.modules:
+                    del sys.modules[module_name]
+            shutil.rmtree(root)
+            if os.path.exists(db_file):
+                os.remove(db_file)
+
+    def test_fd_capture(self):
+        import pydev_runfiles_unittest
+        original_stdout, original_stderr = sys.stdout, sys.stderr
+        sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__ # The capture is only used with the real streams.
+        try:
+            available = pydev_runfiles_unittest.IsFdCaptureAvailable()
+        finally:
+            sys.stdout, sys.stderr = original_stdout, original_stderr
+        if not available:
+            return
+
+        notifications = []
+        class Server:
+            def notifyStartTest(self, file, test):
+                pass
+
+            def notifyTest(self, cond, captured_output, error_contents, file, test, time):
+                try:
+                    captured_output = captured_output.data
+                except:
+                    pass
+                if not isinstance(captured_output, str):
+                    captured_output = captured_output.decode('latin1')
+                notifications.append((test, cond, captured_output))
+
+        class FdCaptureTest(unittest.TestCase):
+            def test_fail(self):
+                os.write(1, 'fd level\n'.encode('ascii'))
+                sys.stdout.write('a' * 100)
+                self.fail()
+
+            def test_ok(self):
+                sys.stdout.write('not passed\n')
+
+        suite = unittest.TestSuite([FdCaptureTest('test_fail'), FdCaptureTest('test_ok')])
+        for test in suite._tests:
+            test.__pydev_pyfile__ = 'fd_capture_test.py'
+
+        pydev_runfiles_xml_rpc.SetServer(Server())
+        original_max_output = pydev_runfiles_unittest.MAX_CAPTURED_OUTPUT
+        pydev_runfiles_unittest.MAX_CAPTURED_OUTPUT = 60
+        stream = tempfile.TemporaryFile(mode='w+')
+        sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+        try:
+            runner = pydev_runfiles_unittest.PydevTextTestRunner(stream=stream, verbosity=1, capture='fd')
+            result = runner.run(suite)
+        finally:
+            sys.stdout, sys.stderr = original_stdout, original_stderr
+            pydev_runfiles_unittest.MAX_CAPTURED_OUTPUT = original_max_output
+            pydev_runfiles_xml_rpc.SetServer(None)
+            stream.close()
+
+        self.assertEqual(1, len(result.failures))
+        notifications.sort()
+        self.assertEqual(('FdCaptureTest.test_ok', 'ok', ''), notifications[1])
+        test, cond, captured_output = notifications[0]
+        self.assertEqual(('FdCaptureTest.test_fail', 'fail'), (test, cond))
+        # Only the start and end of the output are kept.
+        self.assert_(captured_output.startswith('fd level\naaa'), captured_output)
+        self.assert_('bytes of output not shown' in captured_output, captured_output)
+        self.assert_(captured_output.endswith('aaa'), captured_output)
+
+    def test_stream_communication(self):
+        import pydev_runfiles_stream
+        notifications = []
+        receiver = pydev_runfiles_stream.NotificationsReceiver(
+            lambda method, args: notifications.append((method, args)))
+        receiver.start()
+
+        writer = pydev_runfiles_stream.ConnectNotificationsWriter(receiver.port)
+        self.assert_(writer is not None)
+        output = pydev_runfiles_xml_rpc._encode_if_needed('out\xe1\n' * 20000)
+        writer.notifyCommands([('notifyStartTest', ('a.py', 'T.test1'))])
+        writer.notifyCommands(0, [
+            ('notifyTest', ('ok', output, '', 'a.py', 'T.test1', '0.50'), {}),
+            ('notifyTestsCollected', (2,)),
+            ('unknownNotification', ()),
+        ])
+        writer.close()
+        receiver.close(5)
+
+        self.assertEqual(3, len(notifications))
+        self.assertEqual(('notifyStartTest', ('a.py', 'T.test1')), notifications[0])
+        method, args = notifications[1]
+        self.assertEqual('notifyTest', method)
+        self.assertEqual(output.data, args[1].data) # Binary contents are kept as Binary.
+        self.assertEqual(('ok', '', 'a.py', 'T.test1', '0.50'), (args[0],) + args[2:])
+        self.assertEqual(('notifyTestsCollected', ('2',)), notifications[2])
+
+    def test_notifications_receiver_only_when_requested(self):
+        import pydev_runfiles_parallel
+        import pydev_runfiles_stream
+        provider = pydev_runfiles_parallel.CommunicationThread(None)
+        provider.start()
+        provider.shutdown()
+        self.assert_(provider.notifications_receiver is None)
+
+        provider = pydev_runfiles_parallel.CommunicationThread(None)
+        provider.start()
+        port = provider.GetNotificationsPort()
+        self.assertEqual(port, provider.GetNotificationsPort())
+        writer = pydev_runfiles_stream.ConnectNotificationsWriter(port)
+        self.assert_(writer is not None)
+        writer.close()
+        provider.shutdown()
+        self.assert_(not provider.notifications_receiver.is_alive())
+
 
 if __name__ == "__main__":
     #this is so that we can run it frem the jython tests -- because we don't actually have an __main__ module